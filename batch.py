@@ -0,0 +1,187 @@
+import asyncio
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Set, Tuple
+
+import conversation
+
+# Prompts processed at the same time. Ollama serializes generation per model unless
+# OLLAMA_NUM_PARALLEL is raised, so higher values mostly overlap retrieval and tools.
+DEFAULT_CONCURRENCY = 4
+# Pending prompts read ahead of the workers; keeps memory flat for very large inputs
+QUEUE_FACTOR = 2
+
+
+def output_path_for(input_path: Path) -> Path:
+    """Default output file: input.jsonl -> input.results.jsonl next to it."""
+    return input_path.with_name(f"{input_path.stem}.results.jsonl")
+
+
+def read_prompts(input_path: Path) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Streams (id, prompt, record) from a JSONL file. Each line is either an object with a
+    'prompt' field (and optionally 'id'; other fields are passed through to the output)
+    or a bare JSON string. Without an 'id' the 1-based line number is used, so ids stay
+    stable across resumed runs as long as the input file isn't reordered.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Warning: Skipping line {line_no} of {input_path.name}: not valid JSON.")
+                continue
+            if isinstance(record, str):
+                record = {"prompt": record}
+            if not isinstance(record, dict) or not str(record.get("prompt", "")).strip():
+                print(f"Warning: Skipping line {line_no} of {input_path.name}: no 'prompt'.")
+                continue
+            yield str(record.get("id", line_no)), str(record["prompt"]), record
+
+
+def completed_ids(output_path: Path, retry_failed: bool = True) -> Set[str]:
+    """
+    Ids already answered in an existing output file; this is the run's checkpoint.
+    Failed records are retried unless retry_failed is False. A torn last line
+    (interrupted write) is ignored and that prompt runs again.
+    """
+    done: Set[str] = set()
+    if not output_path.exists():
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "id" in record and (record.get("status") == "ok" or not retry_failed):
+                done.add(str(record["id"]))
+    return done
+
+
+def _ends_mid_line(path: Path) -> bool:
+    """True if the file's last line has no newline (a write interrupted by a crash)."""
+    try:
+        with open(path, 'rb') as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except OSError:
+        return False
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list (0.0 for an empty one)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_batch(
+    handler: Callable[..., Awaitable[str]],
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float | None = None,
+    retry_failed: bool = True,
+) -> Dict[str, Any]:
+    """
+    Runs every prompt of 'input_path' through 'handler' (main.handle_prompt) with at most
+    'concurrency' in flight, appending one JSON result per line to 'output_path' as each
+    finishes (so results are in completion order). Prompts already answered in the output
+    file are skipped, which makes an interrupted run resumable by simply running it again.
+    Each prompt gets its own conversation context and never asks for clarification.
+    Returns the run statistics.
+    """
+    concurrency = max(1, concurrency)
+    done = completed_ids(output_path, retry_failed)
+    skipped = 0
+    latencies: List[float] = []
+    counts = {"ok": 0, "error": 0}
+    queue: "asyncio.Queue[Tuple[str, str, Dict[str, Any]] | None]" = asyncio.Queue(maxsize=concurrency * QUEUE_FACTOR)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    torn = _ends_mid_line(output_path)
+
+    with open(output_path, 'a', encoding='utf-8') as out:
+        if torn:
+            out.write("\n") # Keep the first new record off the line a crash cut short
+
+        def write_result(result: Dict[str, Any]) -> None:
+            # All writes happen on the event loop thread, so lines never interleave.
+            # Flushing each line makes it the checkpoint for a later resume.
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+
+        async def worker() -> None:
+            while (item := await queue.get()) is not None:
+                item_id, prompt, record = item
+                started = time.perf_counter()
+                result: Dict[str, Any] = {"id": item_id, "prompt": prompt}
+                result.update({k: v for k, v in record.items() if k not in ("id", "prompt")})
+                try:
+                    answer = await asyncio.wait_for(
+                        handler(prompt, context=conversation.ConversationContext(), interactive=False, speak=False),
+                        timeout,
+                    )
+                    result.update(status="ok", answer=answer)
+                except asyncio.TimeoutError:
+                    result.update(status="error", error=f"Timed out after {timeout:g}s")
+                except Exception as e:
+                    result.update(status="error", error=str(e))
+                latency = time.perf_counter() - started
+                result["latency_ms"] = round(latency * 1000, 1)
+                write_result(result)
+                latencies.append(latency)
+                counts[result["status"]] += 1
+                finished = counts["ok"] + counts["error"]
+                print(f"Batch: [{finished}] {item_id} {result['status']} in {latency:.1f}s")
+
+        run_started = time.perf_counter()
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for item in read_prompts(input_path):
+                if item[0] in done:
+                    skipped += 1
+                    continue
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        wall = time.perf_counter() - run_started
+
+    latencies.sort()
+    processed = counts["ok"] + counts["error"]
+    return {
+        "processed": processed,
+        "ok": counts["ok"],
+        "failed": counts["error"],
+        "skipped": skipped,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 2),
+        "throughput_per_min": round(processed / wall * 60, 2) if wall > 0 else 0.0,
+        "p50_s": round(percentile(latencies, 50), 2),
+        "p90_s": round(percentile(latencies, 90), 2),
+        "p99_s": round(percentile(latencies, 99), 2),
+        "max_s": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def format_report(stats: Dict[str, Any], output_path: Path) -> str:
+    return (
+        f"Batch complete: {stats['processed']} prompt(s) processed ({stats['ok']} ok, {stats['failed']} failed), "
+        f"{stats['skipped']} already done and skipped.\n"
+        f"  Wall time {stats['wall_s']:.1f}s at concurrency {stats['concurrency']}: {stats['throughput_per_min']:.1f} prompts/min\n"
+        f"  Latency p50 {stats['p50_s']:.2f}s | p90 {stats['p90_s']:.2f}s | p99 {stats['p99_s']:.2f}s | max {stats['max_s']:.2f}s\n"
+        f"  Results: {output_path}"
+    )
@@ -1,74 +1,296 @@
-from playwright.async_api import async_playwright, Playwright, Browser
+from playwright.async_api import async_playwright, Playwright, Browser, BrowserContext, Page, Error as PlaywrightError
 import asyncio
-from typing import Union # FIX: Added import for Union
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Union # FIX: Added import for Union
+from urllib.parse import urlsplit
 from typing import Dict # FIX: Added import for Dict (used in fill_form)
 
-# Global variables to store the Playwright instance and the browser
-# These will be initialized once and reused.
-_playwright_instance: Union[Playwright, None] = None
-_browser_instance: Union[Browser, None] = None
-
-async def _initialize_playwright_browser():
-    """Initializes the Playwright instance and launches a browser."""
-    global _playwright_instance, _browser_instance
-    if _browser_instance is None:
-        print("Initializing Playwright and launching browser (this may take a moment)...")
-        _playwright_instance = await async_playwright().start()
-        _browser_instance = await _playwright_instance.chromium.launch(headless=True)
-        print("Playwright browser launched.")
-
-async def _close_playwright_browser():
-    """Closes the Playwright browser instance."""
-    global _playwright_instance, _browser_instance
-    if _browser_instance:
-        print("Closing Playwright browser...")
-        await _browser_instance.close()
-        _browser_instance = None
-    if _playwright_instance:
-        await _playwright_instance.stop()
-        _playwright_instance = None
-        print("Playwright instance stopped.")
+import config
+import metrics
 
-async def navigate_to(url: str) -> str:
+# --- Shared browser pool ---
+# One Chromium per process, launched on first use and kept warm; pages are opened in a few
+# long-lived contexts instead of launching a browser per URL (seconds -> milliseconds).
+MAX_PAGES = 4 # Pages open at the same time across the pool; further callers wait
+POOL_CONTEXTS = 2 # Contexts pages are spread over (each has its own cookies and cache)
+CONTEXT_MAX_USES = 50 # Pages per context before it is replaced (bounds cookie/cache/leak growth)
+MEMORY_LIMIT_MB = 1500 # Browser processes' RSS above which the browser is relaunched once idle (needs psutil)
+MEMORY_CHECK_EVERY = 10 # Page releases between memory checks
+
+BROWSER_LAUNCHES = metrics.counter("francine_browser_launches_total", "Chromium launches by the browser pool.")
+BROWSER_RECYCLES = metrics.counter("francine_browser_recycles_total", "Contexts or browsers replaced by the pool, by reason (uses, memory).", ("reason",))
+BROWSER_PAGE_WAIT = metrics.histogram("francine_browser_page_wait_seconds", "Time to get a ready page from the pool (including any launch).")
+BROWSER_PAGES = metrics.gauge("francine_browser_pages_open", "Pages currently open in the browser pool.")
+BROWSER_PHASE_SECONDS = metrics.histogram("francine_browser_phase_seconds", "Page load phases (navigate, selector, extract).", ("phase",))
+BROWSER_BLOCKED = metrics.counter("francine_browser_blocked_requests_total", "Requests aborted by the blocking profile, by resource type.", ("profile", "type"))
+BROWSER_BYTES = metrics.counter("francine_browser_response_bytes_total", "Response bytes received by browser pages (from Content-Length; chunked responses not counted).")
+
+# --- Request blocking profiles (config: browser_block_profile, browser_domain_profiles) ---
+# Text extraction doesn't need what these resource types download; blocking them cuts
+# page load time and bandwidth without changing the DOM text.
+BLOCK_PROFILES = {
+    "full": frozenset(), # Load everything (sites that break without their assets)
+    "lean": frozenset({"image", "media", "font"}),
+    "text": frozenset({"image", "media", "font", "stylesheet"}), # Also blocks third-party scripts
+}
+
+
+def _site(host: str) -> str:
+    """Approximate registrable domain ('www.example.com' -> 'example.com') for first/third-party checks."""
+    return ".".join(host.split(".")[-2:])
+
+
+def profile_for(url: str) -> str:
+    """The blocking profile for a URL: the most specific browser_domain_profiles match, else the default."""
+    settings = config.get()
+    labels = (urlsplit(url).hostname or "").split(".")
+    for i in range(len(labels) - 1): # www.example.com, then example.com
+        profile = settings.browser_domain_profiles.get(".".join(labels[i:]))
+        if profile:
+            return profile
+    return settings.browser_block_profile
+
+
+async def apply_profile(page: Page, url: str, profile: str) -> None:
+    """Aborts the profile's resource types (and, for 'text', third-party scripts) for this page's requests."""
+    blocked = BLOCK_PROFILES.get(profile, BLOCK_PROFILES["lean"])
+    if not blocked:
+        return # No routing at all: every intercepted request costs a driver round trip
+    site = _site(urlsplit(url).hostname or "")
+
+    async def route_request(route) -> None:
+        request = route.request
+        kind = request.resource_type
+        third_party_script = profile == "text" and kind == "script" and _site(urlsplit(request.url).hostname or "") != site
+        if kind in blocked or third_party_script:
+            BROWSER_BLOCKED.inc(profile=profile, type=kind)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", route_request)
+
+
+def _count_response_bytes(response) -> None:
+    length = response.headers.get("content-length")
+    if length and length.isdigit():
+        BROWSER_BYTES.inc(int(length))
+
+
+async def load_page(page: Page, url: str, selector: str | None = None, profile: str | None = None) -> str | None:
+    """
+    Navigates 'page' to 'url' with the URL's blocking profile and the browser_wait setting,
+    timing each phase. With a selector, waits for it (up to 10 s) and returns it, or 'body'
+    if it never appeared. With browser_wait "selector" and a specific selector, navigation
+    returns at the first response and only the selector is waited for.
+    """
+    wait = config.get().browser_wait
+    await apply_profile(page, url, profile or profile_for(url))
+    page.on("response", _count_response_bytes)
+    selector_only = wait == "selector" and selector not in (None, "body")
+    with BROWSER_PHASE_SECONDS.time(phase="navigate"):
+        await page.goto(url, wait_until="commit" if selector_only else ("load" if wait == "load" else "domcontentloaded"))
+    if selector is None:
+        return None
+    with BROWSER_PHASE_SECONDS.time(phase="selector"):
+        try:
+            await page.wait_for_selector(selector, timeout=10000) # 10 seconds timeout
+        except PlaywrightError: # Includes Playwright's TimeoutError
+            print(f"Warning: Selector '{selector}' not found on page {url} within timeout. Trying to get body content.")
+            selector = 'body' # Fallback to body if specific selector fails
+    return selector
+
+
+class _PooledContext:
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.uses = 0 # Pages opened in it so far
+        self.active = 0 # Pages open in it right now
+
+    @property
+    def retired(self) -> bool:
+        return self.uses >= CONTEXT_MAX_USES
+
+
+def _browser_memory_mb() -> float | None:
+    """RSS of this process's child processes (the Playwright driver and Chromium), or None without psutil."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            continue # Exited while we were looking
+    return total / (1024 * 1024)
+
+
+class BrowserPool:
     """
-    Opens a page asynchronously and returns page content using a reusable browser instance.
+    Keeps one headless Chromium and POOL_CONTEXTS contexts warm and hands out pages via
+    'async with POOL.page() as page'. At most MAX_PAGES pages are open at once. A context
+    is closed and replaced after CONTEXT_MAX_USES pages, and the whole browser is relaunched
+    when its memory passes MEMORY_LIMIT_MB and no page is open. Bound to the event loop it
+    was first used on; close() shuts everything down.
     """
-    await _initialize_playwright_browser() # Ensure browser is launched
-    if _browser_instance is None:
-        return "Error: Playwright browser not initialized."
 
+    def __init__(self, max_pages: int = MAX_PAGES, contexts: int = POOL_CONTEXTS):
+        self.max_pages = max_pages
+        self.pool_size = contexts
+        self._playwright: Union[Playwright, None] = None
+        self._browser: Union[Browser, None] = None
+        self._contexts: List[_PooledContext] = []
+        self._lock: asyncio.Lock | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._loop = None
+        self._open_pages = 0
+        self._releases = 0
+        self._relaunch = False # Set when memory is high; done once no page is open
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Playwright objects belong to the loop that created them; a new loop
+            # (e.g. a second asyncio.run) starts a fresh pool
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_pages)
+            self._playwright, self._browser, self._contexts = None, None, []
+            self._open_pages = 0
+
+    async def _ensure_browser(self) -> Browser:
+        if self._browser is None or not self._browser.is_connected():
+            print("Initializing Playwright and launching browser (this may take a moment)...")
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._contexts = []
+            BROWSER_LAUNCHES.inc()
+            print("Playwright browser launched.")
+        return self._browser
+
+    async def _acquire_context(self) -> _PooledContext:
+        async with self._lock:
+            if self._relaunch and self._open_pages == 0:
+                await self._close_browser()
+                self._relaunch = False
+            browser = await self._ensure_browser()
+            live = [c for c in self._contexts if not c.retired]
+            if len(live) < self.pool_size:
+                pooled = _PooledContext(await browser.new_context())
+                self._contexts.append(pooled)
+            else:
+                pooled = min(live, key=lambda c: c.active)
+            pooled.uses += 1
+            pooled.active += 1
+            return pooled
+
+    async def _release_context(self, pooled: _PooledContext) -> None:
+        async with self._lock:
+            pooled.active -= 1
+            if pooled.retired and pooled.active == 0 and pooled in self._contexts:
+                self._contexts.remove(pooled)
+                BROWSER_RECYCLES.inc(reason="uses")
+                try:
+                    await pooled.context.close()
+                except Exception as e:
+                    print(f"Warning: Could not close browser context: {e}")
+            self._releases += 1
+            if self._releases % MEMORY_CHECK_EVERY == 0 and not self._relaunch:
+                used = await asyncio.to_thread(_browser_memory_mb)
+                if used is not None and used > MEMORY_LIMIT_MB:
+                    print(f"Browser pool using {used:.0f} MB (limit {MEMORY_LIMIT_MB}); relaunching the browser when idle.")
+                    BROWSER_RECYCLES.inc(reason="memory")
+                    self._relaunch = True
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """A fresh page in a pooled context; closed (not the browser) when the block exits."""
+        self._bind_loop()
+        started = time.perf_counter()
+        async with self._slots:
+            pooled = await self._acquire_context()
+            try:
+                page = await pooled.context.new_page()
+            except Exception:
+                await self._release_context(pooled)
+                raise
+            BROWSER_PAGE_WAIT.observe(time.perf_counter() - started)
+            self._open_pages += 1
+            BROWSER_PAGES.inc()
+            try:
+                yield page
+            finally:
+                self._open_pages -= 1
+                BROWSER_PAGES.dec()
+                try:
+                    await page.close()
+                except Exception:
+                    pass # Page or browser already gone; the context is still released
+                await self._release_context(pooled)
+
+    async def _close_browser(self) -> None:
+        for pooled in self._contexts:
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+        self._contexts = []
+        if self._browser is not None:
+            print("Closing Playwright browser...")
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"Warning: Could not close the browser cleanly: {e}")
+            self._browser = None
+
+    async def close(self) -> None:
+        """Closes all contexts, the browser and Playwright (safe to call when nothing was launched)."""
+        if self._loop is not asyncio.get_running_loop():
+            return # Never used on this loop; nothing of ours to close here
+        async with self._lock:
+            await self._close_browser()
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+                print("Playwright instance stopped.")
+
+
+POOL = BrowserPool()
+
+
+async def navigate_to(url: str) -> str:
+    """
+    Opens a page asynchronously and returns page content using the shared browser pool.
+    """
     try:
-        page = await _browser_instance.new_page() # Open a new page in the existing browser
-        await page.goto(url, wait_until='domcontentloaded')
-        content = await page.content()
-        await page.close() # Close the page, but keep the browser open
-        return content
+        async with POOL.page() as page:
+            await load_page(page, url)
+            with BROWSER_PHASE_SECONDS.time(phase="extract"):
+                return await page.content()
     except Exception as e:
         print(f"Error navigating to {url}: {e}")
         return f"Error navigating to {url}: {e}"
 
-async def fill_form(url: str, data: Dict) -> None:
+async def fill_form(url: str, data: Dict) -> str:
     """
-    Navigates to a URL asynchronously and fills a form using a reusable browser instance.
+    Navigates to a URL asynchronously and fills a form using the shared browser pool.
     """
-    await _initialize_playwright_browser() # Ensure browser is launched
-    if _browser_instance is None:
-        return "Error: Playwright browser not initialized."
-
     try:
-        page = await _browser_instance.new_page() # Open a new page in the existing browser
-        await page.goto(url, wait_until='domcontentloaded')
-        for selector, value in data.items():
-            await page.fill(selector, value)
-        await page.click('input[type=submit], button[type=submit]')
-        await page.close() # Close the page, but keep the browser open
+        async with POOL.page() as page:
+            await page.goto(url, wait_until='domcontentloaded')
+            for selector, value in data.items():
+                await page.fill(selector, value)
+            await page.click('input[type=submit], button[type=submit]')
         return f"Form submitted successfully on {url}."
     except Exception as e:
         print(f"Error filling form on {url}: {e}")
         return f"Error filling form on {url}: {e}"
 
-# --- NEW: Function to ensure browser is closed on application exit ---
-# This will be called from main.py's cleanup
+# --- Called from main.py's (and the server's) shutdown ---
 async def cleanup_browser():
     """Call this function to ensure the Playwright browser is properly closed."""
-    await _close_playwright_browser()
+    await POOL.close()
@@ -0,0 +1,306 @@
+import queue
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+import config
+import metrics
+import stt
+
+SAMPLE_RATE = stt.SAMPLE_RATE
+FRAME_MS = 30 # webrtcvad accepts 10, 20 or 30 ms frames
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * 2 # int16 mono
+
+RING_SECONDS = 30.0 # Audio kept in the ring buffer
+MAX_UTTERANCE_SECONDS = 25.0 # Longer speech is cut into several utterances (must fit in the ring)
+PREROLL_MS = 300 # Audio before the detected speech start that is kept (soft onsets, first syllable)
+START_WINDOW_FRAMES = 5 # Speech starts when START_TRIGGER_FRAMES of the last START_WINDOW_FRAMES frames are voiced
+START_TRIGGER_FRAMES = 3
+END_SILENCE_MS = 500 # Trailing silence that ends an utterance
+MIN_SPEECH_MS = 250 # Shorter bursts (clicks, coughs) are dropped
+VAD_AGGRESSIVENESS = 3 # 0 (least) to 3 (most)
+UTTERANCE_QUEUE_SIZE = 8
+
+CAPTURE_OVERFLOWS = metrics.counter("francine_voice_capture_overflows_total", "Audio input overflows (frames dropped by the device).")
+
+
+@dataclass
+class Utterance:
+    """A segmented piece of speech, ready for transcription."""
+    audio: np.ndarray # float32, 16 kHz mono, including pre-roll
+    started_at: float # time.monotonic() of the first voiced frame
+    ended_at: float # time.monotonic() when the end of speech was detected
+    overlapped_playback: bool = False # Captured while Francine was speaking (may be her own echo)
+    start_pos: int = 0 # Absolute ring position of audio[0]; identifies the utterance for streaming
+    speech_ended_at: float = 0.0 # time.monotonic() when the last voiced frame was read
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+
+class MicrophoneSource:
+    """Default input device via sounddevice; read_frame() blocks until a frame is available."""
+
+    def __init__(self):
+        self._stream = None
+
+    def open(self) -> None:
+        import sounddevice as sd
+        self._stream = sd.RawInputStream(samplerate=SAMPLE_RATE, channels=1, dtype='int16', blocksize=FRAME_SAMPLES)
+        self._stream.start()
+
+    def read_frame(self) -> bytes | None:
+        data, overflowed = self._stream.read(FRAME_SAMPLES)
+        if overflowed:
+            CAPTURE_OVERFLOWS.inc()
+        return bytes(data)
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class WavFileSource:
+    """
+    Replays WAV files as if they were the microphone, for benchmarks and reproducible tests
+    (no audio device needed). 'speed' 1.0 paces frames in real time, 2.0 twice as fast and
+    0 as fast as possible. Each file is followed by 'gap_seconds' of silence so the VAD
+    ends its utterance. 'spans' records (path, first sample, end sample) per file.
+    """
+
+    def __init__(self, paths, speed: float = 1.0, gap_seconds: float = 1.0):
+        self.paths = [Path(p) for p in paths]
+        self.speed = speed
+        self.gap_seconds = gap_seconds
+        self.spans: List[Tuple[Path, int, int]] = []
+        self._audio = np.zeros(0, dtype=np.int16)
+        self._pos = 0
+        self._started = 0.0
+
+    @staticmethod
+    def load(path: Path) -> np.ndarray:
+        """16 kHz mono int16 samples of a 16-bit PCM WAV file (other rates and stereo are converted)."""
+        with wave.open(str(path), 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+            channels, rate = wav.getnchannels(), wav.getframerate()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        if rate != SAMPLE_RATE:
+            positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples)
+        return samples.astype(np.int16)
+
+    def open(self) -> None:
+        gap = np.zeros(int(self.gap_seconds * SAMPLE_RATE), dtype=np.int16)
+        parts, position = [gap], len(gap) # Leading silence too, so the pre-roll has something to keep
+        for path in self.paths:
+            samples = self.load(path)
+            self.spans.append((path, position, position + len(samples)))
+            parts += [samples, gap]
+            position += len(samples) + len(gap)
+        self._audio = np.concatenate(parts)
+        self._pos = 0
+        self._started = time.monotonic()
+
+    def read_frame(self) -> bytes | None:
+        if self._pos >= len(self._audio):
+            return None
+        if self.speed > 0:
+            due = self._started + self._pos / SAMPLE_RATE / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        frame = self._audio[self._pos:self._pos + FRAME_SAMPLES]
+        self._pos += FRAME_SAMPLES
+        if len(frame) < FRAME_SAMPLES:
+            frame = np.concatenate((frame, np.zeros(FRAME_SAMPLES - len(frame), dtype=np.int16)))
+        return frame.tobytes()
+
+    def close(self) -> None:
+        self._pos = len(self._audio)
+
+    def file_at(self, position: int) -> Path | None:
+        """The file an utterance starting at ring position 'position' (pre-roll included) came from."""
+        for path, start, end in self.spans:
+            if position < end: # Starts in this file or in the silence before it
+                return path
+        return None
+
+
+class AudioRingBuffer:
+    """Fixed-size int16 ring buffer addressed by absolute sample position."""
+
+    def __init__(self, seconds: float = RING_SECONDS):
+        self.capacity = int(seconds * SAMPLE_RATE)
+        self._data = np.zeros(self.capacity, dtype=np.int16)
+        self.written = 0 # Absolute number of samples written so far
+
+    def write(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        if first < n:
+            self._data[:n - first] = samples[first:]
+        self.written += n
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Copy of samples [start, end) (absolute positions), clamped to what is still buffered."""
+        start = max(start, self.written - self.capacity, 0)
+        end = min(end, self.written)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        i, length = start % self.capacity, end - start
+        if i + length <= self.capacity:
+            return self._data[i:i + length].copy()
+        return np.concatenate((self._data[i:], self._data[:length - (self.capacity - i)]))
+
+
+class CaptureThread:
+    """
+    Long-lived capture: one input stream and one VAD for the whole session. Every frame goes
+    into the ring buffer and through the VAD segmenter; finished utterances (with pre-roll)
+    are put on 'utterances'. Speech is captured while a turn is being handled or spoken.
+    """
+
+    def __init__(self, source=None):
+        self.source = source if source is not None else MicrophoneSource()
+        self.ring = AudioRingBuffer()
+        self.utterances: "queue.Queue[Utterance]" = queue.Queue(maxsize=UTTERANCE_QUEUE_SIZE)
+        self.playback = threading.Event() # Set by the TTS side while Francine is speaking
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._speech_lock = threading.Lock()
+        self._speech_from: int | None = None # Ring position of the utterance in progress (with pre-roll)
+        self.error: Exception | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.source.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="francine-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.source.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def next_utterance(self, timeout: float | None = None) -> Utterance | None:
+        """Blocks until an utterance is available (None on timeout)."""
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def current_speech(self) -> "Tuple[int, np.ndarray] | None":
+        """(start_pos, audio so far) of the utterance still being spoken, or None between utterances."""
+        with self._speech_lock:
+            if self._speech_from is None:
+                return None
+            start, end = self._speech_from, self.ring.written
+            return start, stt.pcm16_to_float32(self.ring.read(start, end))
+
+    def _set_speech(self, start: int | None) -> None:
+        with self._speech_lock:
+            self._speech_from = start
+
+    def _emit(self, start: int, end: int, started_at: float, overlapped: bool, speech_ended_at: float) -> None:
+        start = max(start, 0)
+        pcm = self.ring.read(start, end)
+        utterance = Utterance(stt.pcm16_to_float32(pcm), started_at, time.monotonic(), overlapped, start, speech_ended_at)
+        try:
+            self.utterances.put_nowait(utterance)
+        except queue.Full:
+            # Consumer is far behind; drop the oldest so the newest speech is kept
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                pass
+            self.utterances.put_nowait(utterance)
+
+    def _run(self) -> None:
+        import webrtcvad # Using webrtcvad-wheels
+        vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+        preroll = SAMPLE_RATE * PREROLL_MS // 1000
+        end_silence_frames = END_SILENCE_MS // FRAME_MS
+        min_speech = SAMPLE_RATE * MIN_SPEECH_MS // 1000
+        max_utterance = int(MAX_UTTERANCE_SECONDS * SAMPLE_RATE)
+
+        recent: List[bool] = [] # Voiced flags of the last START_WINDOW_FRAMES frames
+        in_speech = False
+        speech_start = 0 # Absolute sample position of the first voiced frame
+        speech_started_at = 0.0
+        silent_frames = 0
+        overlapped = False
+        last_voiced_at = 0.0
+        window_start = 0 # VAD off: start of the current fixed window
+
+        try:
+            while not self._stop.is_set():
+                frame = self.source.read_frame()
+                if frame is None: # Source exhausted (file replay)
+                    break
+                if len(frame) != FRAME_BYTES:
+                    continue
+                samples = np.frombuffer(frame, dtype=np.int16)
+                with self._speech_lock: # current_speech() reads the ring from another thread
+                    self.ring.write(samples)
+                frame_end = self.ring.written
+                settings = config.get()
+
+                if not settings.vad:
+                    # Fixed windows of listen_timeout seconds, like the old non-VAD listen
+                    if frame_end - window_start >= settings.listen_timeout * SAMPLE_RATE:
+                        now = time.monotonic()
+                        self._emit(window_start, frame_end, now, self.playback.is_set(), now)
+                        window_start = frame_end
+                    continue
+                window_start = frame_end
+
+                voiced = vad.is_speech(frame, SAMPLE_RATE)
+                if not in_speech:
+                    recent = (recent + [voiced])[-START_WINDOW_FRAMES:]
+                    if sum(recent) >= START_TRIGGER_FRAMES:
+                        in_speech = True
+                        # The trigger window's first frame is where speech began
+                        speech_start = frame_end - len(recent) * FRAME_SAMPLES
+                        speech_started_at = time.monotonic() - len(recent) * FRAME_MS / 1000
+                        silent_frames = 0
+                        overlapped = self.playback.is_set()
+                        last_voiced_at = time.monotonic()
+                        recent = []
+                        self._set_speech(max(speech_start - preroll, 0))
+                    continue
+
+                overlapped = overlapped or self.playback.is_set()
+                silent_frames = 0 if voiced else silent_frames + 1
+                if voiced:
+                    last_voiced_at = time.monotonic()
+                speech_end = frame_end - silent_frames * FRAME_SAMPLES
+                if silent_frames >= end_silence_frames or frame_end - speech_start >= max_utterance:
+                    in_speech = False
+                    if speech_end - speech_start >= min_speech:
+                        self._emit(speech_start - preroll, speech_end, speech_started_at, overlapped, last_voiced_at)
+                    self._set_speech(None)
+        except Exception as e:
+            self.error = e
+            print(f"Error in audio capture: {e}")
@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# config.json lives next to main.py (see README), independent of the working directory.
+# FRANCINE_CONFIG points somewhere else, e.g. for a second profile.
+CONFIG_PATH = Path(os.getenv("FRANCINE_CONFIG", Path(__file__).resolve().parent / "config.json"))
+
+# Without a file watcher, get() re-checks the file's mtime at most this often
+POLL_INTERVAL = 2.0 # seconds
+
+
+@dataclass(frozen=True)
+class Settings:
+    """All config.json settings with their defaults. Field types double as the validation schema."""
+    speech: bool = False # Start in voice mode and speak responses
+    vad: bool = True # End an utterance on silence instead of after listen_timeout
+    listen_timeout: float = 5.0 # Max seconds to listen if VAD isn't used
+    wake_word: str = "francine"
+    always_on: bool = True # If False, only utterances containing wake_word are handled
+    wake_model: str = "tiny" # Small Whisper model that screens for wake_word before the main model runs
+    barge_in: bool = False # Talking over Francine interrupts her; speech matching what she is saying is still treated as her echo
+    stt_backend: str = "faster-whisper" # "faster-whisper" (CTranslate2) or "openai-whisper"
+    stt_model: str = "base" # Whisper model size: tiny, base, small, ...
+    stt_compute_type: str = "int8" # faster-whisper only: int8, int8_float32, float32
+    stt_threads: int = 0 # faster-whisper CPU threads; 0 lets CTranslate2 decide
+    stt_language: str = "" # e.g. "en" skips language detection; "" detects per utterance
+    stt_partial_seconds: float = 1.0 # Decode partial transcripts every N seconds of speech; 0 waits for the end
+    browser_block_profile: str = "lean" # Requests browser scrapes skip: lean (images, media, fonts), text (+ stylesheets, third-party scripts), full (none)
+    browser_domain_profiles: dict = field(default_factory=dict) # Per-domain overrides, e.g. {"example.com": "full"}
+    browser_wait: str = "domcontentloaded" # Or "selector" (return once a specific selector appears) or "load" (everything)
+
+
+# Settings restricted to a fixed set of values
+CHOICES = {
+    "stt_backend": ("faster-whisper", "openai-whisper"),
+    "stt_compute_type": ("int8", "int8_float32", "int16", "float16", "float32"),
+    "browser_block_profile": ("lean", "text", "full"),
+    "browser_wait": ("domcontentloaded", "selector", "load"),
+}
+
+
+def _coerce(name: str, expected: type, value: Any) -> Any:
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, expected) or (expected is not bool and isinstance(value, bool)):
+        raise TypeError(f"'{name}' must be {expected.__name__}, got {type(value).__name__}")
+    if expected in (int, float) and value < 0:
+        raise ValueError(f"'{name}' must not be negative")
+    if name in CHOICES and value not in CHOICES[name]:
+        raise ValueError(f"'{name}' must be one of {', '.join(CHOICES[name])}")
+    if name == "wake_word":
+        return value.strip().lower() # Compared against lowercased transcripts
+    if name == "browser_domain_profiles":
+        profiles = CHOICES["browser_block_profile"]
+        bad = [f"{k}: {v!r}" for k, v in value.items() if v not in profiles]
+        if bad:
+            raise ValueError(f"'{name}' values must be one of {', '.join(profiles)} ({'; '.join(bad)})")
+        return {str(k).lower(): v for k, v in value.items()} # Matched against lowercased host names
+    return value
+
+
+def parse_settings(data: Any) -> Tuple[Settings, List[str]]:
+    """
+    Validates raw config data against Settings. Invalid or unknown keys are reported and
+    skipped (the default is used), so one typo doesn't discard the rest of the file.
+    Returns (settings, problems).
+    """
+    if not isinstance(data, dict):
+        return Settings(), ["config.json must contain a JSON object"]
+    problems = []
+    types = {f.name: f.type for f in fields(Settings)} # bool, int, float, str or dict
+    values: Dict[str, Any] = {}
+    for key, value in data.items():
+        if key not in types:
+            problems.append(f"unknown setting '{key}' ignored")
+            continue
+        try:
+            values[key] = _coerce(key, types[key], value)
+        except (TypeError, ValueError) as e:
+            problems.append(f"{e}; using default {getattr(Settings(), key)!r}")
+    return replace(Settings(), **values), problems
+
+
+class ConfigStore:
+    """
+    Loads config.json once and serves the parsed Settings from memory. The file is
+    reloaded when it changes: immediately via a watchdog observer (start_watching), or
+    by a throttled mtime check in get() when no observer is running.
+    """
+
+    def __init__(self, path: Path = CONFIG_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._settings: Settings | None = None
+        self._signature: Tuple[int, int] | None = None
+        self._last_check = 0.0
+        self._observer = None
+        self._listeners: List[Callable[[Settings], None]] = []
+
+    def _file_signature(self) -> Tuple[int, int] | None:
+        try:
+            st = self.path.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def get(self) -> Settings:
+        """Current settings; a memory read on the hot path (plus an occasional stat when polling)."""
+        if self._settings is None:
+            self.reload()
+        elif self._observer is None and time.monotonic() - self._last_check >= POLL_INTERVAL:
+            self._last_check = time.monotonic()
+            if self._file_signature() != self._signature:
+                self.reload()
+        return self._settings
+
+    def reload(self) -> Settings:
+        """Re-reads the file. A malformed file keeps the previous settings (defaults on first load)."""
+        with self._lock:
+            signature = self._file_signature()
+            first_load = self._settings is None
+            if first_load or signature != self._signature:
+                settings = self._read(previous=self._settings)
+                changed = settings != self._settings
+                self._settings, self._signature = settings, signature
+                if changed and not first_load:
+                    print(f"Francine: Reloaded settings from {self.path.name}.")
+                    for listener in list(self._listeners):
+                        try:
+                            listener(settings)
+                        except Exception as e:
+                            print(f"Warning: Settings listener failed: {e}")
+            self._last_check = time.monotonic()
+            return self._settings
+
+    def _read(self, previous: Settings | None) -> Settings:
+        if not self.path.exists():
+            return Settings()
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, OSError, UnicodeDecodeError) as e:
+            fallback = "keeping the previous settings" if previous is not None else "using default settings"
+            print(f"Warning: {self.path.name} could not be read ({e}); {fallback}.")
+            return previous if previous is not None else Settings()
+        settings, problems = parse_settings(data)
+        for problem in problems:
+            print(f"Warning: {self.path.name}: {problem}.")
+        return settings
+
+    def subscribe(self, listener: Callable[[Settings], None]) -> None:
+        """Calls 'listener(settings)' (from the watcher thread) whenever the settings change."""
+        self._listeners.append(listener)
+
+    def start_watching(self) -> bool:
+        """
+        Starts a watchdog observer on the config file's directory so edits apply right away.
+        Returns False (and get() keeps polling the mtime) if watchdog isn't available.
+        """
+        if self._observer is not None:
+            return True
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        target = os.path.normcase(str(self.path.resolve()))
+
+        def on_any_event(event) -> None:
+            paths = (getattr(event, "src_path", ""), getattr(event, "dest_path", ""))
+            if any(p and os.path.normcase(os.path.abspath(p)) == target for p in paths):
+                self.reload()
+
+        handler = FileSystemEventHandler()
+        handler.on_any_event = on_any_event
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(handler, str(self.path.resolve().parent), recursive=False)
+            observer.start()
+        except Exception as e:
+            print(f"Warning: Could not watch {self.path.name} for changes ({e}); polling instead.")
+            return False
+        self._observer = observer
+        self.reload() # Catch edits made before the observer started
+        return True
+
+    def stop_watching(self) -> None:
+        observer, self._observer = self._observer, None
+        if observer is not None:
+            observer.stop()
+            observer.join(timeout=2.0)
+
+
+STORE = ConfigStore()
+
+
+def get() -> Settings:
+    """The current settings (see ConfigStore.get)."""
+    return STORE.get()
+
+
+def start_watching() -> bool:
+    return STORE.start_watching()
+
+
+def stop_watching() -> None:
+    STORE.stop_watching()
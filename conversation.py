@@ -0,0 +1,155 @@
+import asyncio
+import json
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+
+import llm
+
+# Rough token estimate (~4 characters per token for English text); cheap and good
+# enough for keeping prompts under a budget without loading a tokenizer.
+CHARS_PER_TOKEN = 4
+
+DEFAULT_HISTORY_TOKENS = 1200 # Budget for verbatim recent turns
+DEFAULT_SUMMARY_TOKENS = 300 # Budget for the rolling summary of older turns
+MAX_TURN_TOKENS = 400 # A single long turn is clipped to this before being stored
+MAX_RETRY_ATTEMPTS_SHOWN = 2 # Only the latest failed attempts are shown on retry
+MAX_FIELD_CHARS = 300 # Clip for args/errors/reasons shown on retry
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the token count of 'text'."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clip(text: str, max_chars: int) -> str:
+    """Clips 'text' to at most 'max_chars' characters."""
+    text = str(text)
+    return text if len(text) <= max_chars else text[: max_chars - 3] + "..."
+
+
+class ConversationContext:
+    """
+    Short-term conversation memory for one session. Recent turns are kept verbatim
+    up to a token budget; older turns are folded into a rolling summary that is
+    generated in the background, so the history block has a bounded size.
+    """
+
+    def __init__(self, history_tokens: int = DEFAULT_HISTORY_TOKENS, summary_tokens: int = DEFAULT_SUMMARY_TOKENS):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self._turns: Deque[Tuple[str, str]] = deque()
+        self._turn_tokens = 0
+        self._to_fold: List[Tuple[str, str]] = []
+        self._folding: List[Tuple[str, str]] = [] # Turns the running summary call is folding in
+        self._summary_task: asyncio.Task | None = None
+
+    @property
+    def turns(self) -> List[Tuple[str, str]]:
+        return list(self._turns)
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        """Records a finished turn and folds the oldest turns once over budget."""
+        max_chars = MAX_TURN_TOKENS * CHARS_PER_TOKEN
+        turn = (clip(user, max_chars), clip(assistant, max_chars))
+        self._turns.append(turn)
+        self._turn_tokens += self._cost(turn)
+
+        while self._turn_tokens > self.history_tokens and len(self._turns) > 1:
+            oldest = self._turns.popleft()
+            self._turn_tokens -= self._cost(oldest)
+            self._to_fold.append(oldest)
+
+        if self._to_fold:
+            self._schedule_summary()
+
+    def render(self) -> str:
+        """Returns the history block for the prompt, or '' if there is no history yet."""
+        pending = self._folding + self._to_fold
+        if not self._turns and not self.summary and not pending:
+            return ""
+        lines = ["--- Conversation So Far ---"]
+        summary = self.summary
+        if pending:
+            # Summary is still being generated; include a clipped stand-in so no turn is lost.
+            summary = self._fallback_summary(summary, pending)
+        if summary:
+            lines.append(f"Summary of earlier conversation: {summary}")
+        for user, assistant in self._turns:
+            lines.append(f"User: {user}")
+            lines.append(f"Francine: {assistant}")
+        lines.append("--- End Conversation ---")
+        return "\n".join(lines)
+
+    def _cost(self, turn: Tuple[str, str]) -> int:
+        return estimate_tokens(turn[0]) + estimate_tokens(turn[1])
+
+    def _fallback_summary(self, summary: str, turns: List[Tuple[str, str]]) -> str:
+        parts = [summary] if summary else []
+        parts.extend(f"User asked: {clip(u, 120)} / Francine: {clip(a, 120)}" for u, a in turns)
+        return clip(" ".join(parts), self.summary_tokens * CHARS_PER_TOKEN)
+
+    def _schedule_summary(self) -> None:
+        if self._summary_task is not None and not self._summary_task.done():
+            return # The running task picks up newly folded turns when it finishes
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. sync callers): fold without an LLM call.
+            self.summary = self._fallback_summary(self.summary, self._to_fold)
+            self._to_fold = []
+            return
+        self._summary_task = loop.create_task(self._summarize())
+
+    async def _summarize(self) -> None:
+        while self._to_fold:
+            # Stays visible to render() (via the fallback) until the new summary is assigned
+            batch = self._folding = self._to_fold
+            self._to_fold = []
+            transcript = "\n".join(f"User: {u}\nFrancine: {a}" for u, a in batch)
+            max_words = max(20, self.summary_tokens * 3 // 4)
+            summary_prompt = (
+                f"Update the running summary of a conversation between a user and Francine. "
+                f"Keep facts, names, decisions and open tasks. Use at most {max_words} words. "
+                "Respond with the summary text only.\n\n"
+                f"Current summary: {self.summary or '(none)'}\n\n"
+                f"New turns:\n{transcript}"
+            )
+            try:
+                new_summary = await llm.ollama_chat(summary_prompt)
+            except Exception:
+                new_summary = ""
+            if not new_summary.strip() or new_summary.startswith("Error:"):
+                self.summary = self._fallback_summary(self.summary, batch)
+            else:
+                self.summary = clip(" ".join(new_summary.split()), self.summary_tokens * CHARS_PER_TOKEN)
+            self._folding = []
+
+
+def format_retry_notes(attempts: List[Dict[str, Any]]) -> str:
+    """
+    Builds the retry block from structured attempt records instead of nesting the
+    previous prompt. Tool-error lines are shown only for the latest attempts, but
+    user clarifications are always kept. Every field is clipped, so the block
+    stays bounded however many retries happen.
+    """
+    if not attempts:
+        return ""
+    lines = ["--- Previous Attempts ---"]
+    first_shown = len(attempts) - MAX_RETRY_ATTEMPTS_SHOWN
+    for index, attempt in enumerate(attempts):
+        if index < first_shown:
+            if attempt.get("clarification"):
+                lines.append(f"- User clarified: {clip(attempt['clarification'], MAX_FIELD_CHARS)}")
+            continue
+        line = f"- Tried '{attempt.get('function', 'unknown')}' with args {clip(json.dumps(attempt.get('args', {}), default=str), MAX_FIELD_CHARS)}"
+        if attempt.get("error"):
+            line += f"; it failed: {clip(attempt['error'], MAX_FIELD_CHARS)}"
+        if attempt.get("reason"):
+            line += f"; retry reason: {clip(attempt['reason'], MAX_FIELD_CHARS)}"
+        lines.append(line)
+        if attempt.get("clarification"):
+            lines.append(f"- User clarified: {clip(attempt['clarification'], MAX_FIELD_CHARS)}")
+    lines.append("Use this to choose a better approach.")
+    lines.append("--- End Previous Attempts ---")
+    return "\n".join(lines)
@@ -0,0 +1,411 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import urllib.robotparser
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import memory
+import metrics
+import web_scrape
+
+# Crawl outputs (JSONL + checkpoint) go next to the other scrape dumps
+CRAWL_DIR = web_scrape.RAW_DIR / "crawls"
+
+DEFAULT_CONCURRENCY = 8 # Pages fetched at the same time across all hosts
+DEFAULT_PER_HOST = 2 # ... and per host
+DEFAULT_DELAY = 0.5 # Minimum seconds between request starts to the same host
+DEFAULT_MAX_PAGES = 200
+MAX_PAGES_LIMIT = 5000 # Hard cap, whatever the caller asks for
+CHECKPOINT_EVERY = 25 # Pages between checkpoint writes
+COMPLETE_TTL = 24 * 3600.0 # A finished crawl is returned as-is for this long, then redone
+MAX_RETRIES = 2 # For 429/503 and network errors
+MAX_BACKOFF = 60.0 # Longest Retry-After (or robots.txt Crawl-delay) honoured, in seconds
+ROBOTS_AGENT = "Francine"
+# Links to these are never fetched: no text to extract
+SKIP_EXTENSIONS = re.compile(
+    r"\.(jpe?g|png|gif|webp|svg|ico|bmp|mp[34]|m4a|wav|avi|mov|webm|zip|gz|tar|rar|7z|exe|msi|dmg|iso|woff2?|ttf|css|js)$",
+    re.IGNORECASE,
+)
+
+CRAWL_PAGES = metrics.counter("francine_crawl_pages_total", "Crawled pages by outcome (ok, empty, error, skipped).", ("outcome",))
+CRAWL_SECONDS = metrics.histogram("francine_crawl_fetch_seconds", "Per-page crawl fetch and extraction time by path (http, browser).", ("path",))
+
+
+def normalize_url(url: str) -> str | None:
+    """Canonical form used for deduplication (no fragment, lowercase host, no default port), or None if not http(s)."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != (80 if scheme == "http" else 443):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def _site(host: str) -> str:
+    """Approximate registrable domain ('docs.example.com' -> 'example.com')."""
+    return ".".join(host.split(":")[0].split(".")[-2:])
+
+
+def _parse_urls(urls: Any) -> List[str]:
+    """Accepts a list of URLs or one string of URLs separated by whitespace or commas."""
+    if isinstance(urls, str):
+        urls = re.split(r"[\s,]+", urls)
+    return [u for u in (urls or []) if isinstance(u, str) and u.strip()]
+
+
+def default_output_path(seeds: List[str]) -> Path:
+    """Same seeds -> same file, so re-running an interrupted crawl resumes it."""
+    digest = hashlib.sha1("\n".join(sorted(seeds)).encode("utf-8")).hexdigest()[:8]
+    host = re.sub(r"[^a-zA-Z0-9]+", "_", urlsplit(seeds[0]).hostname or "crawl")
+    return CRAWL_DIR / f"crawl_{host}_{digest}.jsonl"
+
+
+def _safe_output_path(output: str) -> Path:
+    """
+    Resolves 'output' inside CRAWL_DIR (a fresh crawl truncates it and writes a state file
+    next to it, so it must never name an arbitrary file). Raises ValueError otherwise.
+    """
+    full_path = (CRAWL_DIR / output).resolve()
+    if not full_path.is_relative_to(CRAWL_DIR.resolve()):
+        raise ValueError(f"Access denied: Output '{output}' is outside the crawl directory.")
+    if full_path.suffix != ".jsonl":
+        raise ValueError(f"Crawl output '{output}' must be a .jsonl file.")
+    return full_path
+
+
+class HostPolicy:
+    """Politeness for one host: a concurrency cap, spacing between requests, robots.txt and backoff."""
+
+    def __init__(self, per_host: int, delay: float):
+        self.slots = asyncio.Semaphore(per_host)
+        self.delay = delay
+        self.next_at = 0.0 # Event-loop time before which no request may start
+        self._lock = asyncio.Lock()
+        self._robots: urllib.robotparser.RobotFileParser | None = None
+        self._robots_lock = asyncio.Lock()
+
+    async def wait_turn(self) -> None:
+        async with self._lock: # Request starts are spaced 'delay' apart, in arrival order
+            loop = asyncio.get_running_loop()
+            wait = self.next_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.next_at = max(self.next_at, loop.time()) + self.delay
+
+    def back_off(self, seconds: float) -> None:
+        self.next_at = max(self.next_at, asyncio.get_running_loop().time() + min(seconds, MAX_BACKOFF))
+
+    async def allowed(self, url: str) -> bool:
+        """robots.txt check; the file is fetched once per host (unreachable -> everything allowed)."""
+        async with self._robots_lock:
+            if self._robots is None:
+                parts = urlsplit(url)
+                parser = urllib.robotparser.RobotFileParser()
+                try:
+                    response = await web_scrape._get_client().get(urlunsplit((parts.scheme, parts.netloc, "/robots.txt", "", "")))
+                    if response.status_code in (401, 403):
+                        parser.disallow_all = True
+                    elif response.status_code < 400:
+                        parser.parse(response.text.splitlines())
+                    else:
+                        parser.allow_all = True
+                except Exception:
+                    parser.allow_all = True
+                crawl_delay = parser.crawl_delay(ROBOTS_AGENT) if not (parser.allow_all or parser.disallow_all) else None
+                if crawl_delay:
+                    self.delay = max(self.delay, min(float(crawl_delay), MAX_BACKOFF))
+                self._robots = parser
+        return self._robots.can_fetch(ROBOTS_AGENT, url)
+
+
+class Crawler:
+    """
+    Breadth-first crawl with a shared queue and 'concurrency' workers. URLs are deduplicated
+    after normalization, and each host gets a HostPolicy. Every page's text is appended to
+    one JSONL file as soon as it is extracted. The frontier is checkpointed so an
+    interrupted crawl resumes where it stopped.
+    """
+
+    def __init__(self, seeds: List[str], output: Path, max_depth: int, max_pages: int, allowed_sites: Set[str] | None,
+                 concurrency: int, per_host: int, delay: float, selector: str, respect_robots: bool):
+        self.seeds = seeds
+        self.output = output
+        self.state_path = output.with_suffix(".state.json")
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.allowed_sites = allowed_sites # None: any domain
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.selector = selector
+        self.respect_robots = respect_robots
+        self.hosts: Dict[str, HostPolicy] = {}
+        self.seen: Set[str] = set()
+        self.in_flight: Dict[str, Tuple[int, int]] = {} # url -> (depth, retries)
+        self.queue: "asyncio.Queue[Tuple[str, int, int]]" = asyncio.Queue()
+        self.counts = {"ok": 0, "empty": 0, "error": 0, "skipped": 0}
+        self.written_since_checkpoint = 0
+        self.resumed = False
+        self.finished_at = 0.0 # When an already completed crawl finished (epoch seconds)
+
+    # --- State ---
+    def _done_rows(self) -> Dict[str, Dict[str, Any]]:
+        """url -> row for every page already in the output file."""
+        done = {}
+        try:
+            with open(self.output, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        done[row["url"]] = row
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue # A line cut short by a crash
+        except OSError:
+            pass
+        return done
+
+    def _end_torn_line(self) -> None:
+        """Terminates a last line cut short by a crash, so the next row doesn't continue it."""
+        try:
+            with open(self.output, 'rb+') as f:
+                if f.seek(0, os.SEEK_END) == 0:
+                    return
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        except OSError:
+            pass
+
+    def load(self, resume: bool) -> bool:
+        """Restores an unfinished crawl's frontier. Returns True if the crawl had already completed."""
+        if resume and self.state_path.exists():
+            try:
+                state = json.loads(self.state_path.read_text(encoding='utf-8'))
+            except (OSError, json.JSONDecodeError):
+                state = None
+            if state is not None and state.get("complete") and time.time() - state.get("updated", 0) > COMPLETE_TTL:
+                state = None # Finished long enough ago that the site has likely changed: crawl afresh
+            if state is not None:
+                if state.get("complete"):
+                    self.counts.update(state.get("counts", {}))
+                    self.finished_at = state.get("updated", 0)
+                    return True
+                done = self._done_rows()
+                self._end_torn_line()
+                self.seen = set(state.get("seen", [])) | set(done)
+                for url, depth, retries in state.get("frontier", []):
+                    if url not in done:
+                        self.queue.put_nowait((url, depth, retries))
+                for row in done.values():
+                    outcome = row.get("outcome")
+                    if outcome in self.counts:
+                        self.counts[outcome] += 1
+                    # Pages written after the last checkpoint: their links were never queued there
+                    if row.get("depth", self.max_depth) < self.max_depth:
+                        for link in row.get("links", []):
+                            self._enqueue(link, row["depth"] + 1)
+                self.resumed = True
+                return False
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        self.output.write_text("", encoding='utf-8') # Fresh crawl
+        for url in self.seeds:
+            self._enqueue(url, 0)
+        self.checkpoint() # A crawl killed before its first periodic checkpoint still resumes
+        return False
+
+    def checkpoint(self, complete: bool = False) -> None:
+        frontier = [[url, depth, retries] for url, (depth, retries) in self.in_flight.items()]
+        frontier += [list(item) for item in self.queue._queue] # Not yet taken by a worker
+        state = {
+            "seeds": self.seeds, "complete": complete, "counts": self.counts, "updated": time.time(),
+            "frontier": [] if complete else frontier, "seen": sorted(self.seen),
+        }
+        memory.atomic_write_text(self.state_path, json.dumps(state))
+        self.written_since_checkpoint = 0
+
+    # --- Crawl ---
+    def _enqueue(self, url: str, depth: int) -> None:
+        normalized = normalize_url(url)
+        if normalized is None or normalized in self.seen or len(self.seen) >= self.max_pages:
+            return
+        if SKIP_EXTENSIONS.search(urlsplit(normalized).path):
+            return
+        if self.allowed_sites is not None and _site(urlsplit(normalized).netloc) not in self.allowed_sites:
+            return
+        self.seen.add(normalized)
+        self.queue.put_nowait((normalized, depth, 0))
+
+    def _host(self, url: str) -> HostPolicy:
+        host = urlsplit(url).netloc
+        policy = self.hosts.get(host)
+        if policy is None:
+            policy = self.hosts[host] = HostPolicy(self.per_host, self.delay)
+        return policy
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with open(self.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+        self.written_since_checkpoint += 1
+
+    async def _fetch(self, url: str) -> Tuple[Dict[str, Any], List[str]]:
+        """Fetches one page: HTTP first, the browser when the page needs it. Returns (record fields, links)."""
+        if web_scrape.domain_mode(url) == "browser":
+            text, _, links = await web_scrape._scrape_browser(url, self.selector, with_links=True)
+            return {"path": "browser", "text": text}, links
+        response = await web_scrape._get_client().get(url)
+        fields = {"status": response.status_code, "final_url": str(response.url), "path": "http"}
+        if response.status_code in (429, 503):
+            retry_after = response.headers.get("retry-after", "")
+            raise _RetryLater(float(retry_after) if retry_after.isdigit() else 5.0)
+        content_type = response.headers.get("content-type", "")
+        if "html" not in content_type:
+            if content_type.startswith("text/"):
+                return {**fields, "text": ' '.join(response.text.split())}, []
+            return {**fields, "text": "", "error": f"unsupported content type '{content_type}'"}, []
+        text, found, links = await asyncio.to_thread(web_scrape.parse_page, response.text, self.selector, str(response.url))
+        reason = web_scrape.needs_browser(response, text, found)
+        if reason and not reason.startswith("status_"):
+            fields["path"] = "browser"
+            text, found, rendered_links = await web_scrape._scrape_browser(url, self.selector, with_links=True)
+            links = list(dict.fromkeys(links + rendered_links)) # An SPA's static HTML has few or none
+            if text and found: # As in web_scrape.scrape_text_content
+                web_scrape.remember_domain_mode(url, "browser", reason)
+        elif response.status_code >= 400:
+            fields["error"] = f"HTTP {response.status_code}"
+        return {**fields, "text": text}, links
+
+    async def _process(self, url: str, depth: int, retries: int) -> None:
+        host = self._host(url)
+        if self.respect_robots and not await host.allowed(url):
+            self.counts["skipped"] += 1
+            CRAWL_PAGES.inc(outcome="skipped")
+            self._write({"url": url, "depth": depth, "outcome": "skipped", "error": "disallowed by robots.txt"})
+            return
+        started = time.perf_counter()
+        try:
+            async with host.slots:
+                await host.wait_turn()
+                fields, links = await self._fetch(url)
+        except Exception as e:
+            backoff = e.seconds if isinstance(e, _RetryLater) else 2.0 ** retries
+            if retries < MAX_RETRIES:
+                host.back_off(backoff)
+                self.queue.put_nowait((url, depth, retries + 1))
+                return
+            fields, links = {"error": str(e) or type(e).__name__}, []
+        CRAWL_SECONDS.observe(time.perf_counter() - started, path=fields.get("path", "http"))
+
+        final = normalize_url(fields.get("final_url", url))
+        if final:
+            self.seen.add(final) # Redirect targets aren't fetched again
+        outcome = "error" if "error" in fields else ("ok" if fields.get("text") else "empty")
+        self.counts[outcome] += 1
+        CRAWL_PAGES.inc(outcome=outcome)
+        self._write({
+            "url": url, "depth": depth, "outcome": outcome, **fields, "chars": len(fields.get("text", "")),
+            "links": links, "fetched_at": time.time(), # Links let a resume queue what this page found
+        })
+        if depth < self.max_depth:
+            for link in links:
+                self._enqueue(link, depth + 1)
+
+    async def _worker(self) -> None:
+        while True:
+            url, depth, retries = await self.queue.get()
+            self.in_flight[url] = (depth, retries)
+            try:
+                await self._process(url, depth, retries)
+            except Exception as e:
+                print(f"Warning: Crawl of {url} failed unexpectedly: {e}")
+            # Not reached when cancelled: the URL stays in in_flight and is checkpointed for resume
+            self.in_flight.pop(url, None)
+            self.queue.task_done()
+            if self.written_since_checkpoint >= CHECKPOINT_EVERY:
+                self.checkpoint()
+
+    async def run(self) -> None:
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        complete = False
+        try:
+            await self.queue.join()
+            complete = True
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.checkpoint(complete=complete) # Also on cancellation (e.g. the tool timeout): resume later
+
+
+class _RetryLater(Exception):
+    def __init__(self, seconds: float):
+        super().__init__(f"rate limited; retry after {seconds:g}s")
+        self.seconds = seconds
+
+
+async def crawl(
+    urls: Any = None,
+    seed_url: str = "",
+    max_depth: int | None = None,
+    same_domain: bool = True,
+    domains: Any = None,
+    max_pages: int = DEFAULT_MAX_PAGES,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    per_host: int = DEFAULT_PER_HOST,
+    delay: float = DEFAULT_DELAY,
+    selector: str = 'body',
+    output: str = "",
+    resume: bool = True,
+    respect_robots: bool = True,
+) -> Dict[str, Any]:
+    """
+    Crawls a list of URLs and/or a seed URL, following links up to 'max_depth' (default 0
+    for a URL list, 1 with a seed). With same_domain (or an explicit 'domains' list) only
+    those sites are followed. Text is streamed to one JSONL file ('output', a name inside
+    raw_hits/crawls; default derived from the seeds). An interrupted crawl with the same
+    seeds and output resumes from its checkpoint unless resume=False; a completed one is
+    returned as-is for COMPLETE_TTL, then redone. Returns a summary dict.
+    """
+    seeds = _parse_urls(urls) + _parse_urls(seed_url)
+    seeds = [n for n in dict.fromkeys(normalize_url(u) for u in seeds) if n]
+    if not seeds:
+        return {"error": "No valid http(s) URLs to crawl."}
+    if max_depth is None:
+        max_depth = 1 if seed_url else 0
+    allowed_sites = {_site(d.lower()) for d in _parse_urls(domains)} or None
+    if allowed_sites is None and same_domain:
+        allowed_sites = {_site(urlsplit(u).netloc) for u in seeds}
+    try:
+        output_path = _safe_output_path(output) if output else default_output_path(seeds)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    crawler = Crawler(
+        seeds, output_path, max(0, int(max_depth)), max(1, min(int(max_pages), MAX_PAGES_LIMIT)), allowed_sites,
+        max(1, int(concurrency)), max(1, int(per_host)), max(0.0, float(delay)), selector or 'body', respect_robots,
+    )
+    started = time.perf_counter()
+    if crawler.load(resume):
+        print(f"Crawl already complete: {output_path}")
+        return {"output": str(output_path), "already_complete": True, "finished_at": crawler.finished_at, **crawler.counts}
+    print(f"Crawling {len(seeds)} seed URL(s), depth {crawler.max_depth}, up to {crawler.max_pages} pages -> {output_path}"
+          + (" (resumed)" if crawler.resumed else ""))
+    await crawler.run()
+    return {
+        "output": str(output_path),
+        "pages": sum(crawler.counts.values()),
+        **crawler.counts,
+        "hosts": len(crawler.hosts),
+        "resumed": crawler.resumed,
+        "elapsed_s": round(time.perf_counter() - started, 1),
+    }
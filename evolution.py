@@ -6,6 +6,8 @@ from datetime import datetime
 from typing import List # FIX: Added import for List
 
 import llm
+import insights
+import preferences
 # FIX: Dynamically determine BASE_DIR based on the new BASE_DIR from memory.py
 # Assuming memory.py is imported and its BASE_DIR is the source of truth
 import memory
@@ -14,25 +16,61 @@ MEM_LOG_PATH = memory.MEM_LOG # Use the path defined in memory.py
 CORE_MEMORY_PATH = memory.CORE_MEMORY_PATH # Use the path defined in memory.py
 CONSTITUTION_PATH = BASE_DIR / "constitution.txt" # Constitution is part of BASE_DIR
 FEEDBACK_LOG_PATH = BASE_DIR / "feedback_log.jsonl" # FIX: Changed to .jsonl for appending
+REFLECTION_STATE_PATH = BASE_DIR / "reflection_state.json" # Watermark of memlog bytes already reflected on
 
-async def reflect_on_memory():
+# Reflection only runs once this many new turns have been logged since the watermark
+REFLECTION_MIN_NEW_TURNS = 10
+# Background reflection waits this long before starting so it never competes with the user's first turns
+REFLECTION_START_DELAY = 30.0 # seconds
+
+_reflection_task: asyncio.Task | None = None
+
+
+def _load_reflection_state() -> dict:
+    if REFLECTION_STATE_PATH.exists():
+        try:
+            return json.loads(REFLECTION_STATE_PATH.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, OSError):
+            print("Warning: reflection_state.json is corrupted. Reflecting from the start of the memlog.")
+    return {"offset": 0}
+
+
+def _read_new_interactions(offset: int) -> tuple[str, int, int]:
     """
-    Initiates a reflection process on Francine's memory logs to extract core insights.
-    This runs on startup to update core memory.
+    Reads the memlog from the byte 'offset' watermark to the end.
+    Returns (new_text, new_turn_count, end_offset).
+    """
+    if not MEM_LOG_PATH.exists():
+        return "", 0, 0
+    size = MEM_LOG_PATH.stat().st_size
+    if offset > size: # memlog was truncated or replaced; start over
+        offset = 0
+    with open(MEM_LOG_PATH, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    text = data.decode('utf-8', errors='replace')
+    turns = sum(1 for line in text.splitlines() if line.startswith("USER: "))
+    return text, turns, offset + len(data)
+
+
+async def reflect_on_memory(force: bool = False) -> bool:
+    """
+    Initiates a reflection process on interactions logged since the last reflection
+    to extract core insights. Only runs once REFLECTION_MIN_NEW_TURNS new turns
+    have accumulated (unless 'force' is set). Returns True if core memory was updated.
     """
-    print("Francine: Reflecting on past interactions to update core memory...")
     try:
-        mem_log_content = ""
-        if MEM_LOG_PATH.exists():
-            # FIX: Use asyncio.to_thread for blocking file read
-            mem_log_content = await asyncio.to_thread(MEM_LOG_PATH.read_text, encoding='utf-8')
-            # Read a reasonable amount of recent memory, e.g., last 100 lines
-            lines = mem_log_content.splitlines()
-            mem_log_content = "\n".join(lines[-100:]) # Get last 100 lines
+        # Interactions are written behind; make sure the latest ones are on disk
+        await asyncio.to_thread(memory.flush_writes)
+        state = await asyncio.to_thread(_load_reflection_state)
+        mem_log_content, new_turns, end_offset = await asyncio.to_thread(_read_new_interactions, state.get("offset", 0))
+
+        if not mem_log_content.strip() or (new_turns < REFLECTION_MIN_NEW_TURNS and not force):
+            return False
 
-        if not mem_log_content.strip():
-            print("No recent interactions to reflect on.")
-            return
+        print(f"Francine: Reflecting on {new_turns} new interactions to update core memory...")
+        # Read a reasonable amount of recent memory, e.g., last 100 lines
+        mem_log_content = "\n".join(mem_log_content.splitlines()[-100:])
 
         reflection_prompt = (
             "Based on the following recent interactions, extract 3-5 concise, high-level core insights "
@@ -60,21 +98,65 @@ async def reflect_on_memory():
                 except json.JSONDecodeError:
                     print("Warning: core_memory.json is corrupted. Starting fresh.")
                     
-            combined_insights = list(set(existing_memory.get("core_insights", []) + new_insights))
-            
-            # FIX: Use asyncio.to_thread for blocking file write
-            await asyncio.to_thread(CORE_MEMORY_PATH.write_text, json.dumps({"core_insights": combined_insights, "last_updated": datetime.now().isoformat()}, indent=2), encoding='utf-8')
-            print("Core memory updated successfully.")
+            # Cluster reworded duplicates and keep a capped set of representative insights
+            existing_records = insights.records_from_core_memory(existing_memory)
+            records = await insights.consolidate_insights(existing_records, new_insights)
+            core_memory = {
+                "core_insights": [r["text"] for r in records],
+                "insight_records": records,
+                "last_updated": datetime.now().isoformat(),
+            }
+            await asyncio.to_thread(memory.atomic_write_json, CORE_MEMORY_PATH, core_memory)
+            print(f"Core memory updated successfully ({len(records)} insights kept).")
+
+            # Advance the watermark only after the insights are safely stored
+            state = {"offset": end_offset, "last_run": datetime.now().isoformat(), "turns_processed": state.get("turns_processed", 0) + new_turns}
+            await asyncio.to_thread(memory.atomic_write_json, REFLECTION_STATE_PATH, state)
+            return True
             
         except (json.JSONDecodeError, ValueError) as e:
             print(f"Error parsing LLM reflection response: {e}. Raw response: {llm_response}")
         except Exception as e:
             print(f"Error updating core memory: {e}")
 
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         print(f"Error during memory reflection: {e}")
-    finally:
-        print("Francine: Reflection complete.")
+    return False
+
+
+async def _background_reflection(delay: float) -> None:
+    try:
+        await asyncio.sleep(delay)
+        await reflect_on_memory()
+    except asyncio.CancelledError:
+        pass
+
+
+def schedule_background_reflection(delay: float = REFLECTION_START_DELAY) -> None:
+    """
+    Starts a low-priority reflection task on the running event loop unless one is
+    already pending. Cheap to call after every turn: the task does nothing until
+    enough new turns have accumulated past the watermark.
+    """
+    global _reflection_task
+    if _reflection_task is not None and not _reflection_task.done():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    _reflection_task = loop.create_task(_background_reflection(delay))
+
+
+async def cancel_background_reflection() -> None:
+    """Cancels a pending background reflection (e.g. when the chat loop exits)."""
+    global _reflection_task
+    if _reflection_task is not None and not _reflection_task.done():
+        _reflection_task.cancel()
+        await asyncio.gather(_reflection_task, return_exceptions=True)
+    _reflection_task = None
 
 
 def log_feedback(original_prompt: str, chosen_response: str, all_responses: List[str]):
@@ -83,13 +165,20 @@ def log_feedback(original_prompt: str, chosen_response: str, all_responses: List
         # FIX: Use 'a' mode for append and write JSONL
         with open(FEEDBACK_LOG_PATH, 'a', encoding='utf-8') as f:
             log_entry = {
-                "timestamp": datetime.datetime.now().isoformat(),
+                "timestamp": datetime.now().isoformat(),
                 "original_prompt": original_prompt,
                 "chosen_response": chosen_response,
                 "all_responses": all_responses
             }
+            if chosen_response in all_responses:
+                # Responses are offered in preferences.STYLES order
+                index = all_responses.index(chosen_response)
+                if index < len(preferences.STYLES):
+                    log_entry["chosen_style"] = preferences.STYLES[index]
             f.write(json.dumps(log_entry) + "\n") # Write as JSON Lines
         print("Feedback logged successfully.")
+        # Fold the new record into the compiled style preferences (O(new records))
+        preferences.refresh_style_preferences()
     except Exception as e:
         print(f"Error logging feedback: {e}")
 
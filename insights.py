@@ -0,0 +1,138 @@
+import asyncio
+import math
+import re
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+import llm
+
+# Core memory is capped so indexing it and injecting it into prompts has a fixed cost.
+MAX_CORE_INSIGHTS = 20
+# Cosine similarity above which two insights are treated as rewordings of each other.
+SIMILARITY_THRESHOLD = 0.88
+# Recency half-life used when scoring insights (days).
+RECENCY_HALF_LIFE_DAYS = 30.0
+# Insights whose score decays below this are evicted even if there is room.
+MIN_INSIGHT_SCORE = 0.05
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", " ".join(text.lower().split()))
+
+
+def _parse_time(value: str, default: datetime) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def score_insight(record: Dict, now: datetime | None = None) -> float:
+    """Scores an insight by how often it was reinforced, decayed by time since last seen."""
+    now = now or datetime.now()
+    last_seen = _parse_time(record.get("last_seen"), now)
+    age_days = max(0.0, (now - last_seen).total_seconds() / 86400.0)
+    decay = math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+    return math.log1p(record.get("uses", 1)) * decay
+
+
+def records_from_core_memory(core_memory: Dict) -> List[Dict]:
+    """
+    Returns the insight records stored in core memory. Older files only have the
+    plain 'core_insights' list, so those entries are upgraded to records here.
+    """
+    records = core_memory.get("insight_records")
+    if isinstance(records, list):
+        return [r for r in records if isinstance(r, dict) and r.get("text")]
+    now = core_memory.get("last_updated") or datetime.now().isoformat()
+    return [
+        {"text": text, "uses": 1, "first_seen": now, "last_seen": now}
+        for text in core_memory.get("core_insights", [])
+        if isinstance(text, str) and text.strip()
+    ]
+
+
+async def _embed_all(texts: List[str]) -> List[List[float]]:
+    results = await asyncio.gather(*(llm.ollama_embed(t) for t in texts), return_exceptions=True)
+    return [r if isinstance(r, list) else [] for r in results]
+
+
+def _cluster(embeddings: np.ndarray, order: List[int], threshold: float) -> Dict[int, List[int]]:
+    """
+    Greedy clustering over a cosine similarity matrix. Items are visited in 'order'
+    (best first); each joins the first representative it is similar enough to,
+    otherwise it becomes a new representative.
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.where(norms == 0, 1.0, norms)
+    similarity = unit @ unit.T
+
+    clusters: Dict[int, List[int]] = {}
+    assigned = np.zeros(len(order), dtype=bool)
+    for i in order:
+        if assigned[i]:
+            continue
+        members = [i] + [int(m) for m in np.where((similarity[i] >= threshold) & ~assigned)[0] if m != i]
+        assigned[members] = True
+        clusters[i] = members
+    return clusters
+
+
+async def consolidate_insights(records: List[Dict], new_insights: List[str]) -> List[Dict]:
+    """
+    Merges newly extracted insights into the existing records. Near-duplicates are
+    clustered by embedding similarity and folded into a single representative whose
+    usage count grows; stale insights are evicted and the result is capped at
+    MAX_CORE_INSIGHTS.
+    """
+    now = datetime.now()
+    now_iso = now.isoformat()
+
+    candidates = [dict(r) for r in records]
+    for text in new_insights:
+        if isinstance(text, str) and text.strip():
+            candidates.append({"text": text.strip(), "uses": 1, "first_seen": now_iso, "last_seen": now_iso})
+
+    if not candidates:
+        return []
+
+    # Embed only what is missing; stored records keep their embeddings.
+    missing = [i for i, c in enumerate(candidates) if not c.get("embedding")]
+    if missing:
+        embedded = await _embed_all([candidates[i]["text"] for i in missing])
+        for i, vector in zip(missing, embedded):
+            candidates[i]["embedding"] = vector
+
+    dims = {len(c["embedding"]) for c in candidates if c.get("embedding")}
+    if len(dims) == 1:
+        d = dims.pop()
+        matrix = np.array(
+            [c["embedding"] if c.get("embedding") else [0.0] * d for c in candidates],
+            dtype=np.float32,
+        )
+        order = sorted(range(len(candidates)), key=lambda i: score_insight(candidates[i], now), reverse=True)
+        # Items without an embedding only match themselves (zero vectors have no similarity)
+        clusters = _cluster(matrix, order, SIMILARITY_THRESHOLD)
+    else:
+        # Embeddings unavailable (e.g. Ollama is down): fall back to normalized exact matching.
+        print("Warning: Could not embed insights. Falling back to exact-match deduplication.")
+        by_key: Dict[str, List[int]] = {}
+        for i, c in enumerate(candidates):
+            by_key.setdefault(_normalize_text(c["text"]), []).append(i)
+        clusters = {members[0]: members for members in by_key.values()}
+
+    merged = []
+    for rep, members in clusters.items():
+        record = dict(candidates[rep])
+        record["uses"] = sum(candidates[m].get("uses", 1) for m in members)
+        record["first_seen"] = min(candidates[m].get("first_seen", now_iso) for m in members)
+        record["last_seen"] = max(candidates[m].get("last_seen", now_iso) for m in members)
+        merged.append(record)
+
+    for record in merged:
+        record["score"] = round(score_insight(record, now), 4)
+    merged = [r for r in merged if r["score"] >= MIN_INSIGHT_SCORE]
+    merged.sort(key=lambda r: r["score"], reverse=True)
+    return merged[:MAX_CORE_INSIGHTS]
@@ -1,16 +1,76 @@
+import asyncio
 import httpx # Changed from 'requests' for async operations
 import json
 import os
+import time
+import weakref
+
+import metrics
+import tracing
 
 # OLLAMA_HOST environment variable ensures flexibility, default to localhost
 OLLAMA = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 
-async def ollama_chat(prompt: str, model: str = "gemma3:12b-it-q4_K_M") -> str:
+# Connection pool shared by all requests on an event loop (keep-alive instead of a new client per call)
+MAX_CONNECTIONS = int(os.getenv("FRANCINE_LLM_MAX_CONNECTIONS", "16"))
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Returns the pooled AsyncClient for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            timeout=60.0,
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_client() -> None:
+    """Closes the pooled client of the running event loop. Call before the loop shuts down."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+LLM_SECONDS = metrics.histogram("francine_llm_request_seconds", "Ollama request latency.", ("op", "model"))
+LLM_ERRORS = metrics.counter("francine_llm_errors_total", "Failed Ollama requests.", ("op",))
+
+CHAT_MODEL = "gemma3:12b-it-q4_K_M"
+# Ollama unloads idle models after ~5 minutes; re-warm a little before that
+WARM_INTERVAL = 240.0 # seconds
+_last_warm: dict[str, float] = {}
+
+
+async def warm_up(model: str = CHAT_MODEL) -> None:
+    """
+    Asks Ollama to load the chat model into memory without generating anything, so the
+    first real request of a turn doesn't pay the model load time. Skipped if the model
+    was warmed or used recently.
+    """
+    now = time.monotonic()
+    if now - _last_warm.get(model, float("-inf")) < WARM_INTERVAL:
+        return
+    _last_warm[model] = now
+    try:
+        with tracing.span("llm.warm_up"):
+            r = await _get_client().post(f"{OLLAMA}/api/generate", json={"model": model}, timeout=60.0)
+            r.raise_for_status()
+    except httpx.HTTPError as e:
+        _last_warm.pop(model, None)
+        print(f"Warning: Could not warm up Ollama model '{model}': {e}")
+
+
+async def ollama_chat(prompt: str, model: str = CHAT_MODEL) -> str:
     """
     Sends a prompt to the Ollama chat model asynchronously and returns the response.
-    Uses httpx for non-blocking network requests.
+    Uses the pooled httpx client for non-blocking network requests.
     """
-    async with httpx.AsyncClient() as client: # Use AsyncClient for async requests
+    _last_warm[model] = time.monotonic() # A real request keeps the model loaded too
+    client = _get_client()
+    with tracing.span("llm.chat"), LLM_SECONDS.time(op="chat", model=model):
         try:
             r = await client.post( # Use await for async operations
                 f"{OLLAMA}/api/generate",
@@ -20,18 +80,21 @@ async def ollama_chat(prompt: str, model: str = "gemma3:12b-it-q4_K_M") -> str:
             r.raise_for_status()  # Raise an HTTPStatusError for bad responses (4xx or 5xx)
             return r.json()["response"]
         except httpx.RequestError as e: # Catch httpx specific exceptions
+            LLM_ERRORS.inc(op="chat")
             print(f"Error communicating with Ollama chat API: {e}")
             return f"Error: Could not get a response from the LLM. {e}"
         except json.JSONDecodeError:
+            LLM_ERRORS.inc(op="chat")
             print("Error: Ollama response was not valid JSON.")
             return "Error: Invalid response from LLM."
 
 async def ollama_embed(text: str, model: str = "minilm:latest") -> list[float]:
     """
     Sends text to the Ollama embedding model asynchronously and returns the embedding vector.
-    Uses httpx for non-blocking network requests.
+    Uses the pooled httpx client for non-blocking network requests.
     """
-    async with httpx.AsyncClient() as client: # Use AsyncClient for async requests
+    client = _get_client()
+    with tracing.span("llm.embed"), LLM_SECONDS.time(op="embed", model=model):
         try:
             r = await client.post( # Use await for async operations
                 f"{OLLAMA}/api/embeddings",
@@ -41,8 +104,10 @@ async def ollama_embed(text: str, model: str = "minilm:latest") -> list[float]:
             r.raise_for_status()  # Raise an HTTPStatusError for bad responses (4xx or 5xx)
             return r.json()["embedding"]
         except httpx.RequestError as e: # Catch httpx specific exceptions
+            LLM_ERRORS.inc(op="embed")
             print(f"Error communicating with Ollama embeddings API: {e}")
             return []  # Return empty list on failure
         except json.JSONDecodeError:
+            LLM_ERRORS.inc(op="embed")
             print("Error: Ollama embedding response was not valid JSON.")
             return []
@@ -1,5 +1,8 @@
+import contextlib
 import json
 import os
+import subprocess
+import sys
 import typer
 from pathlib import Path
 from typing import Callable, Awaitable, Dict, Union, List, Any
@@ -7,104 +10,68 @@ import asyncio
 import re
 import threading # For running the scheduler in a background thread
 
-# Import your existing modules directly, assuming they are in the same directory as main.py
+# Import your existing modules directly, assuming they are in the same directory as main.py.
+# Tool modules (osint, ecommerce, docs, web_scrape, file_manager, scheduler, browser) are
+# imported by the tool registry on first use, and voice (Whisper, torch) only when speech
+# is on, so text-mode startup doesn't pay for dependencies it never touches.
 import llm
-import voice
 import memory
 from memory import log_interaction # Specific import from memory
-import osint
-import ecommerce
-import docs
 import rag
-import scheduler # Now contains run_scheduler_in_background
-import web_scrape
-import file_manager
-import browser # Import browser for cleanup_browser
 import debug # For auto_fix
+from debug import auto_fix
+import conversation # Short-term, token-budgeted conversation history
+import preferences # Compiled style preferences from feedback
+import tracing # Per-turn stage timing spans (--trace)
+import tools # Declarative tool registry and executors
+import tool_cache # Persistent TTL cache for idempotent tool results
+import config # config.json, loaded once and reloaded when the file changes
+import metrics # Counters/histograms for `francine stats` and Prometheus
+import profiler # Opt-in per-turn sampling profiler (--profile)
+import batch as batch_runner # JSONL batch runs ('batch' is also the CLI command's name)
+import voice_bench # Replays WAV fixtures through the voice pipeline ('voice-bench')
 
 # --- NEW: Import the evolution module ---
 import evolution # For reflection and constitution updates
 
 app = typer.Typer()
 
-# --- NEW: TOOL_SCHEMA for LLM to understand function parameters ---
-# This provides the LLM with the exact structure of each tool's arguments.
-TOOL_SCHEMA = [
-    {"name": "recon_username", "description": "Performs OSINT on a given username across various platforms.", "parameters": {"type": "object", "properties": {"u": {"type": "string", "description": "The username to perform OSINT on."}}, "required": ["u"]}},
-    {"name": "recon_email", "description": "Performs OSINT on a given email address.", "parameters": {"type": "object", "properties": {"e": {"type": "string", "description": "The email address to perform OSINT on."}}, "required": ["e"]}},
-    {"name": "recon_person", "description": "Performs OSINT on a person given their name and location.", "parameters": {"type": "object", "properties": {"name": {"type": "string", "description": "The person's full name."}, "loc": {"type": "string", "description": "The person's location."}}, "required": ["name", "loc"]}},
-    {"name": "recon_vehicle", "description": "Performs OSINT on a vehicle given its VIN.", "parameters": {"type": "object", "properties": {"vin": {"type": "string", "description": "The Vehicle Identification Number (VIN)."}}, "required": ["vin"]}},
-    {"name": "recon_domain", "description": "Performs OSINT on a domain, including WHOIS and DNS records.", "parameters": {"type": "object", "properties": {"dom": {"type": "string", "description": "The domain name."}}, "required": ["dom"]}},
-    {"name": "recon_ip", "description": "Performs OSINT on an IP address.", "parameters": {"type": "object", "properties": {"ip": {"type": "string", "description": "The IP address."}}, "required": ["ip"]}},
-    {"name": "spiderfoot_scan", "description": "Initiates a SpiderFoot scan and returns the path to the JSON report. (Placeholder)", "parameters": {"type": "object", "properties": {"target": {"type": "string", "description": "The target for the SpiderFoot scan (e.g., domain, IP, username)."}}, "required": ["target"]}},
-    {"name": "product_research_ali", "description": "Searches AliExpress for products based on keywords and returns a list of product details.", "parameters": {"type": "object", "properties": {"kw": {"type": "string", "description": "Keywords for product search."}}, "required": ["kw"]}},
-    {"name": "tiktok_trend_scrape", "description": "Scrapes TikTok for trending videos/data related to a given hashtag.", "parameters": {"type": "object", "properties": {"tag": {"type": "string", "description": "The hashtag to scrape TikTok trends for."}}, "required": ["tag"]}},
-    {"name": "profit_calc", "description": "Calculates potential profit given revenue, cost of goods sold, shipping, and advertising costs.", "parameters": {"type": "object", "properties": {"revenue": {"type": "number", "description": "Total revenue from sales."}, "cogs": {"type": "number", "description": "Cost of Goods Sold."}, "ship": {"type": "number", "description": "Shipping cost."}, "ads": {"type": "number", "description": "Advertising cost."}}, "required": ["revenue", "cogs", "ship", "ads"]}},
-    {"name": "shopify_api_upload", "description": "Uploads product data to Shopify via API and returns the product ID. (Placeholder)", "parameters": {"type": "object", "properties": {"prod_json": {"type": "object", "description": "JSON object representing product data."}}, "required": ["prod_json"]}},
-    {"name": "pdf_read", "description": "Reads text content from a PDF file.", "parameters": {"type": "object", "properties": {"path": {"type": "string", "description": "The path to the PDF file."}}, "required": ["path"]}},
-    {"name": "pdf_autofill", "description": "Autofills specified fields in a PDF form and returns the path to the new PDF.", "parameters": {"type": "object", "properties": {"path": {"type": "string", "description": "The path to the PDF form file."}, "field_dict": {"type": "object", "description": "A dictionary of form field names and their values."}}, "required": ["path", "field_dict"]}},
-    {"name": "pdf_generate", "description": "Generates a PDF from Markdown text and returns the path to the new PDF.", "parameters": {"type": "object", "properties": {"markdown_text": {"type": "string", "description": "The Markdown formatted text to convert to PDF."}}, "required": ["markdown_text"]}},
-    {"name": "rag_query", "description": "Queries the FAISS index for relevant documents and returns a list of (text, score) tuples.", "parameters": {"type": "object", "properties": {"question": {"type": "string", "description": "The question to query the RAG index with."}, "k": {"type": "integer", "description": "The number of top results to retrieve (default 3)."}}, "required": ["question"]}},
-    {"name": "schedule_job", "description": "Schedules a job to run at specified intervals using a cron-like expression. (Non-blocking)", "parameters": {"type": "object", "properties": {"cron_expression": {"type": "string", "description": "A cron-like expression (e.g., 'HH:MM' for daily)."}, "command": {"type": "string", "description": "The shell command to execute."}}, "required": ["cron_expression", "command"]}},
-    {"name": "scrape_text_content", "description": "Navigates to a URL and returns its full text content for general web scraping.", "parameters": {"type": "object", "properties": {"url": {"type": "string", "description": "The URL to scrape."}, "selector": {"type": "string", "description": "CSS selector for the content to scrape (default 'body')."}}, "required": ["url"]}},
-    {"name": "update_constitution", "description": "Adds a new rule to Francine's constitution.", "parameters": {"type": "object", "properties": {"new_rule": {"type": "string", "description": "The new rule to add to the constitution."}}, "required": ["new_rule"]}},
-    {"name": "list_directory_contents", "description": "Lists contents of a directory within Francine's managed files.", "parameters": {"type": "object", "properties": {"path": {"type": "string", "description": "The path to the directory (relative to Francine_Managed_Files)."}}, "required": []}},
-    {"name": "read_text_file", "description": "Reads text content of a file within Francine's managed files.", "parameters": {"type": "object", "properties": {"path": {"type": "string", "description": "The path to the file (relative to Francine_Managed_Files)."}}, "required": ["path"]}},
-    {"name": "write_text_file", "description": "Writes text content to a file within Francine's managed files.", "parameters": {"type": "object", "properties": {"path": {"type": "string", "description": "The path to the file (relative to Francine_Managed_Files)."}, "content": {"type": "string", "description": "The text content to write."}, "overwrite": {"type": "boolean", "description": "Whether to overwrite if file exists (default false)."}}, "required": ["path", "content"]}},
-    {"name": "move_file", "description": "Moves a file within Francine's managed files.", "parameters": {"type": "object", "properties": {"source_path": {"type": "string", "description": "The current path of the file."}, "destination_path": {"type": "string", "description": "The new path for the file."}}, "required": ["source_path", "destination_path"]}},
-    {"name": "delete_file", "description": "Deletes a file or empty directory within Francine's managed files.", "parameters": {"type": "object", "properties": {"path": {"type": "string", "description": "The path to the file or empty directory."}}, "required": ["path"]}},
-    {"name": "create_directory", "description": "Creates a new directory within Francine's managed files.", "parameters": {"type": "object", "properties": {"path": {"type": "string", "description": "The path of the new directory."}}, "required": ["path"]}},
-]
-
-
-# FUNCTION_MAP now maps to async functions where applicable
-# FIX: Corrected type annotation for FUNCTION_MAP
-FUNCTION_MAP: dict[str, Callable[..., Any]] = {
-    "recon_username": osint.recon_username,
-    "recon_email": osint.recon_email,
-    "recon_person": osint.recon_person,
-    "recon_vehicle": osint.recon_vehicle,
-    "recon_domain": osint.recon_domain,
-    "recon_ip": osint.recon_ip,
-    "spiderfoot_scan": osint.spiderfoot_scan,
-    "product_research_ali": ecommerce.product_research_ali,
-    "tiktok_trend_scrape": ecommerce.tiktok_trend_scrape,
-    "profit_calc": ecommerce.profit_calc,
-    "shopify_api_upload": ecommerce.shopify_api_upload,
-    "pdf_read": docs.pdf_read,
-    "pdf_autofill": docs.pdf_autofill,
-    "pdf_generate": docs.pdf_generate,
-    "rag_query": rag.rag_query,
-    "schedule_job": scheduler.schedule_job,
-    "scrape_text_content": web_scrape.scrape_text_content,
-    "update_constitution": evolution.update_constitution,
-    "list_directory_contents": file_manager.list_directory_contents,
-    "read_text_file": file_manager.read_text_file,
-    "write_text_file": file_manager.write_text_file,
-    "move_file": file_file_manager.move_file, # FIX: Corrected typo
-    "delete_file": file_manager.delete_file,
-    "create_directory": file_manager.create_directory,
-}
+# --- Tools are declared in tools.py (schema, async/sync, thread vs process, timeout, formatter) ---
+# TOOL_SCHEMA is derived from the registry for the LLM prompt; tool functions are resolved lazily.
+TOOL_SCHEMA = tools.REGISTRY.schema()
+
+# Serialized once; the schema is static and large enough that dumping it every turn shows up in profiles
+TOOL_SCHEMA_JSON = json.dumps(TOOL_SCHEMA, indent=2)
 
 # FIX: Dynamically determine BASE_DIR based on the new BASE_DIR from memory.py
 # Assuming memory.py is imported and its BASE_DIR is the source of truth
 import memory
 BASE_DIR = memory.BASE_DIR
 
-CONFIG_PATH = Path("./config.json") 
+# Conversation history for the interactive (single-user) session
+CONVERSATION = conversation.ConversationContext()
+
+# Fire-and-forget tasks started by handle_prompt (e.g. LLM warm-up)
+_BACKGROUND_TASKS: set = set()
+
+TURN_SECONDS = metrics.histogram("francine_turn_seconds", "End-to-end handle_prompt latency.")
+TURN_ERRORS = metrics.counter("francine_turn_errors_total", "Turns ended by an unhandled error.")
+TURN_SELF_CORRECTIONS = metrics.counter(
+    "francine_turn_self_corrections_total", "Tool failures handled by reflection, by the chosen action.", ("action",)
+)
+
+
+class TurnError(RuntimeError):
+    """A turn that failed (LLM unreachable, unhandled error). Raised to non-interactive callers
+    instead of returning the apology text, so batch/server runs record it as a failure."""
 
 
 # --- NEW: Helper to speak responses ---
 async def voice_speak(text: str):
     """Speaks text if voice mode is enabled."""
-    if CONFIG_PATH.exists():
-        try:
-            with open(CONFIG_PATH, 'r') as f:
-                cfg = json.load(f)
-                if cfg.get("speech", False):
-                    await asyncio.to_thread(voice.tts_speak, text)
-        except json.JSONDecodeError:
-            pass 
+    if config.get().speech: # In-memory settings; no file read per response
+        import voice # Loaded only once speech is actually used
+        await voice.tts_speak(text) # Queued on the TTS worker thread; returns before playback ends
 
 # --- NEW: Human-in-the-Loop Clarification Function ---
 async def ask_user_for_clarification(question: str) -> str:
@@ -141,7 +108,7 @@ async def reflect_on_tool_failure(tool_name: str, args_used: Dict, error_message
         f"Error Message: {error_message}\n"
         f"Current Plan/Goal: {current_plan}\n"
         f"Relevant Context: {context}\n\n"
-        f"--- TOOL_SCHEMA ---\n{json.dumps(TOOL_SCHEMA, indent=2)}\n--- END TOOL_SCHEMA ---\n"
+        f"--- TOOL_SCHEMA ---\n{TOOL_SCHEMA_JSON}\n--- END TOOL_SCHEMA ---\n"
         "Suggest a new action:"
     )
     reflection_response_str = await llm.ollama_chat(reflection_prompt)
@@ -156,47 +123,183 @@ async def reflect_on_tool_failure(tool_name: str, args_used: Dict, error_message
 
 
 # --- MODIFIED: The core prompt handler now incorporates advanced agent logic ---
-async def handle_prompt(prompt: str, max_retries: int = 2):
+async def _finish_turn(prompt: str, response_text: str, context: conversation.ConversationContext, speak: bool = True, log: bool = True) -> str:
+    """Records a finished turn in the memory log (unless 'log' is off) and conversation history, then speaks it."""
+    with tracing.span("turn.log"):
+        if log:
+            log_interaction(prompt, response_text) # Queued to the background writer
+        context.add_turn(prompt, response_text)
+    if speak:
+        with tracing.span("turn.speak"):
+            await voice_speak(response_text)
+    return response_text
+
+
+async def close_web_clients() -> None:
+    """Closes the scraper's HTTP pool and the shared browser pool, if a tool loaded them (imported on first use)."""
+    web_scrape, browser = sys.modules.get("web_scrape"), sys.modules.get("browser")
+    if web_scrape is not None:
+        await web_scrape.close_client()
+    if browser is not None:
+        await browser.cleanup_browser()
+
+
+def _spawn_background(coro) -> asyncio.Task:
+    """Starts a fire-and-forget task and keeps a reference so it isn't garbage collected mid-flight."""
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+
+async def _retrieve_context(query: str) -> str:
+    with tracing.span("rag.retrieve"):
+        return await rag.get_relevant_context(query)
+
+
+async def _run_tool_plan(prompt: str, plan: List[Dict[str, Any]]) -> str:
+    """Executes a multi-tool plan and asks the LLM once to turn all results into the answer."""
+    print(f"Francine: Running a plan of {len(plan)} tool call(s)...")
+    with tracing.span("tool.plan"):
+        outcomes = await tools.REGISTRY.execute_plan(plan)
+    results_block = tools.format_plan_results(outcomes)
+
+    follow_up_prompt = (
+        "You are Francine, a helpful local AI assistant. You ran the tool calls below for the user's request. "
+        "Using their results, write the final answer to the user in plain text (no JSON). "
+        "Mention any call that failed and where results were saved.\n\n"
+        f"--- Tool Results ---\n{results_block}\n--- End Tool Results ---\n"
+        f"User: {prompt}"
+    )
+    with tracing.span("llm.summarize_plan"):
+        answer = await llm.ollama_chat(follow_up_prompt)
+    if not answer.strip() or answer.startswith("Error:"):
+        return f"Completed {sum(o['ok'] for o in outcomes)}/{len(outcomes)} tool calls:\n{results_block}"
+    return answer.strip()
+
+
+async def handle_prompt(
+    prompt: str,
+    max_retries: int = 2,
+    context: conversation.ConversationContext | None = None,
+    interactive: bool = True,
+    speak: bool = True,
+    on_stage: Callable[[str, float, float], None] | None = None,
+    retrievals: Dict[str, asyncio.Task] | None = None,
+    log: bool = True,
+) -> str:
     """
     Handles a user prompt with advanced agent capabilities:
-    - Dynamic context retrieval.
+    - Dynamic context retrieval, overlapped with LLM warm-up and prompt assembly.
+    - Multi-turn conversation history within a token budget.
     - Tool use with self-correction loops.
     - Human-in-the-loop clarification.
     - Advanced error handling.
+    Every stage is timed; with --trace a waterfall is printed after the turn, and with
+    --profile the turn's stacks are sampled (see profiler.py).
+
+    Non-console callers (HTTP server, batch runner) pass their own 'context', set
+    interactive=False so a clarification request ends the turn with the question
+    instead of blocking on typer.prompt, and speak=False to skip TTS. 'on_stage' is
+    called with (name, start_s, end_s) as each stage finishes. 'retrievals' maps queries to
+    context retrievals already started (voice mode starts one on the stable partial
+    transcript); one matching the prompt is used instead of retrieving again. log=False
+    keeps the turn out of the memory log (benchmarks: RAG and reflection read it). Returns
+    the final answer; with interactive=False a failed turn raises TurnError instead.
     """
-    current_prompt_for_llm = prompt # This prompt gets modified for retries/clarifications
+    trace, token = tracing.start_turn(prompt, on_span=on_stage)
+    try:
+        with TURN_SECONDS.time(), (profiler.profile_turn(prompt) if profiler.ENABLED else contextlib.nullcontext()):
+            return await _handle_prompt_stages(
+                prompt, max_retries, context if context is not None else CONVERSATION, interactive, speak, retrievals or {}, log
+            )
+    finally:
+        tracing.end_turn(trace, token)
+
+
+async def _handle_prompt_stages(
+    prompt: str, max_retries: int, context: conversation.ConversationContext, interactive: bool, speak: bool,
+    prefetched: Dict[str, asyncio.Task], log: bool,
+) -> str:
+    retrieval_query = prompt # Extended with the user's clarification when one is given
+    attempts: List[Dict[str, Any]] = [] # Structured record of failed tool attempts for retries
     current_plan = "Initial user request." # Track the current goal/plan
+
+    # Retrieval starts immediately and is reused across retries (keyed by query);
+    # loading the chat model runs alongside it so the first LLM call doesn't pay for it.
+    retrievals: Dict[str, asyncio.Task] = dict(prefetched)
+    if retrieval_query not in retrievals:
+        retrievals[retrieval_query] = asyncio.create_task(_retrieve_context(retrieval_query))
+    _spawn_background(llm.warm_up())
     
     for retry_count in range(max_retries + 1): # Allow initial attempt + max_retries
         try:
-            # --- Dynamically retrieve relevant context using RAG ---
-            relevant_context = await rag.get_relevant_context(current_prompt_for_llm)
-            
-            # --- Minimalist LLM Instruction ---
-            # Now includes the TOOL_SCHEMA for reliable function calling
-            instruction = (
-                "You are Francine, a helpful local AI assistant. Your primary goal is to fulfill user requests by calling internal functions. "
-                "Respond with JSON like {\"function\":<name>, \"args\":{...}} or {\"function\":\"none\", \"answer\":\"<your_answer>\"}. "
-                "Use the TOOL_SCHEMA below to understand available functions and their parameters.\n\n"
-                f"--- TOOL_SCHEMA ---\n{json.dumps(TOOL_SCHEMA, indent=2)}\n--- END TOOL_SCHEMA ---\n"
-            )
-            
+            if retrieval_query not in retrievals:
+                retrievals[retrieval_query] = asyncio.create_task(_retrieve_context(retrieval_query))
+            await asyncio.sleep(0) # Let retrieval/warm-up send their requests before assembling the prompt
+
+            # --- Assemble everything that doesn't depend on retrieval while it runs ---
+            with tracing.span("prompt.assemble"):
+                # --- Minimalist LLM Instruction ---
+                # Now includes the TOOL_SCHEMA for reliable function calling
+                instruction = (
+                    "You are Francine, a helpful local AI assistant. Your primary goal is to fulfill user requests by calling internal functions. "
+                    "Respond with JSON like {\"function\":<name>, \"args\":{...}} or {\"function\":\"none\", \"answer\":\"<your_answer>\"}. "
+                    "If the request needs several tool calls, respond with {\"plan\":[{\"id\":\"a\", \"function\":<name>, \"args\":{...}, \"depends_on\":[]}, ...]}; "
+                    "calls without dependencies run in parallel, and a string arg may include \"{{<id>}}\" to use an earlier call's result. "
+                    "Use the TOOL_SCHEMA below to understand available functions and their parameters.\n\n"
+                    f"--- TOOL_SCHEMA ---\n{TOOL_SCHEMA_JSON}\n--- END TOOL_SCHEMA ---\n"
+                )
+                extra_sections = []
+
+                # Precompiled from feedback_log.jsonl; a dictionary lookup, no extra LLM call
+                style_directive = preferences.get_style_directive(prompt)
+                if style_directive:
+                    extra_sections.append(style_directive)
+
+                # Recent turns + rolling summary; bounded by the context's token budget
+                history = context.render()
+                if history:
+                    extra_sections.append(history)
+
+                # Retries are described by structured fields, never by nesting the previous prompt
+                retry_notes = conversation.format_retry_notes(attempts)
+                if retry_notes:
+                    extra_sections.append(retry_notes)
+
+            # --- Dynamically retrieved context (RAG), started above ---
+            with tracing.span("rag.wait"):
+                relevant_context = await retrievals[retrieval_query]
             if relevant_context:
                 instruction += f"\n\n{relevant_context}"
+            for section in extra_sections:
+                instruction += f"\n\n{section}"
 
-            final_llm_prompt = f"{instruction}\nUser: {current_prompt_for_llm}"
+            final_llm_prompt = f"{instruction}\nUser: {prompt}"
             
-            analysis = await llm.ollama_chat(final_llm_prompt)
+            with tracing.span("llm.plan"):
+                analysis = await llm.ollama_chat(final_llm_prompt)
+            if analysis.startswith("Error:") and not interactive:
+                raise TurnError(analysis) # No answer at all; don't let it pass as one
             try:
                 parsed = json.loads(analysis)
             except json.JSONDecodeError:
                 # If LLM doesn't return valid JSON, treat it as a direct answer
                 parsed = {"function": "none", "answer": analysis}
 
+            if not isinstance(parsed, dict):
+                parsed = {"function": "none", "answer": analysis}
+
+            # --- Multi-tool plan: run independent calls concurrently, then answer in one follow-up turn ---
+            plan = parsed.get("plan")
+            if isinstance(plan, list) and plan:
+                final_response_text = await _run_tool_plan(prompt, plan)
+                print(final_response_text)
+                return await _finish_turn(prompt, final_response_text, context, speak, log) # Exit handle_prompt, plan completed
+
             func_name = parsed.get("function", "none")
             
-            if func_name and func_name in FUNCTION_MAP:
-                func = FUNCTION_MAP[func_name]
+            if func_name and func_name in tools.REGISTRY:
                 args = parsed.get("args", {})
                 
                 tool_execution_successful = False
@@ -204,24 +307,8 @@ async def handle_prompt(prompt: str, max_retries: int = 2):
                 tool_result_data: Any = None # Raw data returned by the tool
 
                 try:
-                    # Execute the tool based on its type (async vs. sync)
-                    # All functions are now either async or explicitly run in to_thread
-                    if func_name == "profit_calc": # sync, fast, no to_thread needed
-                        tool_result_data = func(**args)
-                    elif func_name == "schedule_job": # sync, blocking, needs to_thread
-                        print("Warning: schedule_job is a blocking function and should be run in a separate process/thread.")
-                        tool_result_data = await asyncio.to_thread(func, **args)
-                    elif func_name in [ # These are sync, blocking, needs to_thread
-                        "recon_username", "recon_email", "recon_person", "recon_vehicle",
-                        "recon_domain", "recon_ip", "spiderfoot_scan",
-                        "product_research_ali", "tiktok_trend_scrape",
-                        "pdf_read", "pdf_autofill", "pdf_generate",
-                        "update_constitution" # evolution function is sync
-                    ]:
-                        tool_result_data = await asyncio.to_thread(func, **args)
-                    else: # All other functions in FUNCTION_MAP are now async
-                        tool_result_data = await func(**args)
-
+                    # The registry runs the tool where its spec says (event loop, thread pool or process pool)
+                    tool_result_data = await tools.REGISTRY.run(func_name, args)
                     tool_execution_successful = True # If we reach here, tool executed without Python error
 
                 except Exception as tool_e:
@@ -232,96 +319,71 @@ async def handle_prompt(prompt: str, max_retries: int = 2):
                 # --- Process Tool Result / Handle Failure ---
                 final_response_text = "" # What Francine will say/log
                 if tool_execution_successful:
-                    # --- NEW: Enhanced result processing based on tool type ---
-                    if func_name in ["recon_username", "recon_email", "recon_person", "recon_vehicle", "recon_domain", "recon_ip", "spiderfoot_scan", "product_research_ali", "tiktok_trend_scrape"]:
-                        if tool_result_data:
-                            dump_path = osint._dump_result(func_name, tool_result_data)
-                            final_response_text = f"Operation completed. Results saved to: {dump_path}"
-                        else:
-                            final_response_text = f"Operation completed, but no results were returned by {func_name}."
-                    elif func_name == "scrape_text_content":
-                        url = args.get('url', 'unknown_url')
-                        if tool_result_data:
-                            clean_url_prefix = url.replace('https://', '').replace('http://', '').split('/')[0].replace('.', '_').replace(':', '_')
-                            prefix = f"web_scrape_{clean_url_prefix}"
-                            dump_path = osint._save_result_to_file(prefix, tool_result_data, extension=".txt")
-                            final_response_text = f"Web scrape completed. Text content saved to: {dump_path}. Snippet: {tool_result_data[:200]}..."
-                        else:
-                            result = f"Web scrape completed for {url}, but no content was returned."
-                    elif func_name in ["pdf_read", "pdf_autofill", "pdf_generate"]:
-                        if func_name == "pdf_read" and isinstance(tool_result_data, str):
-                            prefix = f"pdf_content_{Path(args.get('path', 'unknown')).stem}"
-                            dump_path = osint._save_result_to_file(prefix, tool_result_data, extension=".txt")
-                            final_response_text = f"PDF content read and saved to: {dump_path}. Snippet: {tool_result_data[:200]}..."
-                        elif isinstance(tool_result_data, str) and (tool_result_data.endswith(".pdf") or "generated.pdf" in tool_result_data):
-                            final_response_text = f"Document operation completed. Output file: {tool_result_data}"
-                        else:
-                            final_response_text = f"Document operation completed, but result was unexpected: {tool_result_data}"
-                    elif func_name == "rag_query":
-                        if tool_result_data:
-                            final_response_text = f"RAG query results: {tool_result_data}"
-                        else:
-                            final_response_text = "RAG query completed, but no relevant documents found."
-                    elif func_name == "profit_calc":
-                        final_response_text = f"The calculated value is: {tool_result_data}"
-                    elif func_name == "update_constitution":
-                        final_response_text = str(tool_result_data) # Already a string message
-                    elif func_name in ["list_directory_contents", "read_text_file", "write_text_file", "move_file", "delete_file", "create_directory"]:
-                        final_response_text = str(tool_result_data) # Already a string message
-                    else:
-                        final_response_text = f"Function {func_name} executed. Result: {tool_result_data}"
+                    with tracing.span("tool.format"):
+                        final_response_text = tools.REGISTRY.format_result(func_name, args, tool_result_data)
                     
                     # Tool executed successfully, so we are done with this prompt
-                    log_interaction(prompt, final_response_text)
-                    await voice_speak(final_response_text)
-                    return # Exit handle_prompt after successful tool execution
+                    return await _finish_turn(prompt, final_response_text, context, speak, log) # Exit handle_prompt after successful tool execution
 
                 else: # Tool execution failed (tool_execution_successful is False)
                     print(f"Francine: Attempting to self-correct for '{func_name}' failure (Retry {retry_count+1}/{max_retries})...")
-                    reflection_action = await reflect_on_tool_failure(
-                        func_name, args, tool_error_message, current_plan, relevant_context
-                    )
-
+                    with tracing.span("llm.reflect"):
+                        reflection_action = await reflect_on_tool_failure(
+                            func_name, args, tool_error_message, current_plan, relevant_context
+                        )
+
+                    attempt = {"function": func_name, "args": args, "error": tool_error_message}
+                    action = reflection_action.get("action")
+                    TURN_SELF_CORRECTIONS.inc(action=action if action in ("retry_with_new_args", "ask_user", "give_up") else "invalid")
                     if reflection_action["action"] == "retry_with_new_args":
-                        print(f"Francine: Retrying with new arguments: {reflection_action['args']}")
-                        current_prompt_for_llm = f"User originally asked: '{prompt}'. Previous attempt to use '{func_name}' with args {args} failed: '{tool_error_message}'. Reason for retry: {reflection_action.get('reason', 'LLM suggested retry')}. Now try again based on this. Original prompt for LLM was: '{final_llm_prompt}'" # FIX: Simplified prompt
+                        print(f"Francine: Retrying with new arguments: {reflection_action.get('args')}")
+                        attempt["reason"] = f"{reflection_action.get('reason', 'LLM suggested retry')} (suggested: {reflection_action.get('function', func_name)} with {json.dumps(reflection_action.get('args', {}), default=str)})"
+                        attempts.append(attempt)
                         # Loop will continue to the next retry_count
+                    elif reflection_action["action"] == "ask_user" and not interactive:
+                        # Nobody to ask (server/batch): end the turn with the question so the caller can follow up
+                        final_response_text = f"I need clarification: {reflection_action.get('question', 'Could you rephrase your request?')}"
+                        return await _finish_turn(prompt, final_response_text, context, speak, log)
                     elif reflection_action["action"] == "ask_user":
                         clarification = await ask_user_for_clarification(reflection_action["question"])
-                        current_prompt_for_llm = f"User originally asked: '{prompt}'. My previous attempt failed. User clarified: '{clarification}'. Reason for asking: {reflection_action.get('reason', 'LLM needed clarification')}. Now try again based on this clarification. Original prompt for LLM was: '{final_llm_prompt}'" # FIX: Simplified prompt
+                        attempt["reason"] = reflection_action.get("reason", "LLM needed clarification")
+                        attempt["clarification"] = clarification
+                        attempts.append(attempt)
+                        retrieval_query = f"{prompt} {clarification}"
                         # Loop will continue to the next retry_count
                     elif reflection_action["action"] == "give_up":
                         final_response_text = reflection_action["answer"]
                         print(f"Francine: Giving up on task. Reason: {reflection_action.get('reason', 'LLM gave up')}")
-                        log_interaction(prompt, final_response_text)
-                        await voice_speak(final_response_text)
-                        return # Exit handle_prompt, task given up
+                        return await _finish_turn(prompt, final_response_text, context, speak, log) # Exit handle_prompt, task given up
                     else:
                         # Fallback if reflection itself returns an invalid action
                         final_response_text = f"I encountered an unexpected issue while trying to self-correct for the failure of '{func_name}'. Error: {tool_error_message}. Please try rephrasing your request."
-                        log_interaction(prompt, final_response_text)
-                        await voice_speak(final_response_text)
-                        return # Exit handle_prompt, unrecoverable error
+                        return await _finish_turn(prompt, final_response_text, context, speak, log) # Exit handle_prompt, unrecoverable error
             else: # LLM did not call a function, or func_name was 'none'
                 final_response_text = parsed.get("answer", analysis)
                 print(final_response_text)
-                log_interaction(prompt, final_response_text)
-                await voice_speak(final_response_text)
-                return # Exit handle_prompt, task completed (direct answer)
+                return await _finish_turn(prompt, final_response_text, context, speak, log) # Exit handle_prompt, task completed (direct answer)
 
         except Exception as e:
             auto_fix(e)
+            TURN_ERRORS.inc()
             error_message = f"An unhandled error occurred during prompt processing: {e}. Please try again."
             print(error_message)
-            log_interaction(prompt, f"Unhandled Error: {e}")
-            await voice_speak(error_message)
-            return # Exit handle_prompt, unrecoverable error
+            if log:
+                log_interaction(prompt, f"Unhandled Error: {e}")
+            if not interactive:
+                if isinstance(e, TurnError):
+                    raise
+                raise TurnError(str(e)) from e
+            if speak:
+                await voice_speak(error_message)
+            return error_message # Exit handle_prompt, unrecoverable error
+
 
     # If loop finishes without success after all retries
     final_response_text = f"I'm sorry, I tried to fulfill your request '{prompt}' multiple times but encountered persistent issues. Please try rephrasing your request or check the logs for more details."
     print(final_response_text)
-    log_interaction(prompt, final_response_text)
-    await voice_speak(final_response_text)
+    return await _finish_turn(prompt, final_response_text, context, speak, log)
 
 
 # --- NEW: Feedback Mode Handler (from your provided main.py) ---
@@ -377,71 +439,341 @@ async def handle_feedback_request(prompt: str, core_memory: str, constitution: s
 def main():
     """Main entry point for the Francine application."""
     print("Starting Francine...")
+    # Memory reflection now runs as a background task inside the chat/voice loops
     
-    print("Performing initial reflection on startup to update core memory...")
-    asyncio.run(evolution.reflect_on_memory())
-    
-    speech_mode_enabled = False
-    if CONFIG_PATH.exists():
-        try:
-            with open(CONFIG_PATH, 'r') as f:
-                cfg = json.load(f)
-                speech_mode_enabled = cfg.get("speech", False)
-        except json.JSONDecodeError:
-            print("Francine: Error reading config.json. Defaulting to text chat.")
-    else:
+    # Malformed files and invalid values are reported by the config module (defaults apply)
+    speech_mode_enabled = config.get().speech
+    if not config.CONFIG_PATH.exists():
         print("Francine: config.json not found. Defaulting to text chat.")
 
-    if speech_mode_enabled:
-        print("Francine: Attempting to start in voice mode...")
-        try:
-            asyncio.run(voice_loop_async())
-        except Exception as e:
-            auto_fix(e)
-            print(f"Francine: Voice mode failed to start. Error: {e}")
-            print("Francine is switching to text chat mode.")
+    try:
+        if speech_mode_enabled:
+            print("Francine: Attempting to start in voice mode...")
+            try:
+                asyncio.run(voice_loop_async())
+            except Exception as e:
+                auto_fix(e)
+                print(f"Francine: Voice mode failed to start. Error: {e}")
+                print("Francine is switching to text chat mode.")
+                asyncio.run(main_chat_loop())
+        else:
+            print("Francine: Speech mode is disabled in config.json. Starting in text chat mode.")
             asyncio.run(main_chat_loop())
-    else:
-        print("Francine: Speech mode is disabled in config.json. Starting in text chat mode.")
-        asyncio.run(main_chat_loop())
+    finally:
+        # Make sure queued log lines and the latest profile reach the disk
+        memory.shutdown_writer()
+        tools.REGISTRY.shutdown()
+
+
+# Text-mode startup (importing main and its eager dependencies) should stay under this
+STARTUP_BUDGET_S = 1.0
+
+
+def report_startup_profile(top: int = 15) -> None:
+    """
+    Imports main in a fresh interpreter with '-X importtime' and prints the total import
+    time plus the heaviest modules main pulls in, against STARTUP_BUDGET_S.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=Path(__file__).resolve().parent, capture_output=True, text=True,
+    )
+    entries = [] # (depth, module, self_us, cumulative_us), children listed before their parent
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        self_us, cumulative_us, name = fields
+        try:
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    if result.returncode != 0 or not entries:
+        print(f"Startup profile failed (exit code {result.returncode}):\n{result.stderr[-2000:]}")
+        return
+
+    total_us = next((cum for depth, name, _, cum in entries if depth == 0 and name == "main"), 0)
+    # Direct imports of main are the depth-1 entries between the previous top-level entry and main
+    main_index = max(i for i, (depth, name, _, _) in enumerate(entries) if depth == 0 and name == "main")
+    start = max([i for i, (depth, _, _, _) in enumerate(entries[:main_index]) if depth == 0], default=-1) + 1
+    direct = sorted((e for e in entries[start:main_index] if e[0] == 1), key=lambda e: e[3], reverse=True)
+
+    verdict = "within" if total_us / 1e6 <= STARTUP_BUDGET_S else "OVER"
+    print(f"Startup: importing main took {total_us / 1000:.0f} ms ({verdict} the {STARTUP_BUDGET_S * 1000:.0f} ms budget)")
+    print(f"Heaviest imports of main (cumulative, top {top}):")
+    for _, name, _, cum in direct[:top]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+    heaviest_self = sorted(entries, key=lambda e: e[2], reverse=True)[:5]
+    print("Slowest individual modules (self time): " + ", ".join(f"{name} {self_us / 1000:.0f} ms" for _, name, self_us, _ in heaviest_self))
+
+
+# --- CLI entry point: `python main.py` (no command) starts Francine as before ---
+@app.callback(invoke_without_command=True)
+def cli(
+    ctx: typer.Context,
+    trace: bool = typer.Option(False, "--trace", help="Print a latency waterfall of every turn's stages."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the tool-result cache (always re-run tools)."),
+    startup_profile: bool = typer.Option(False, "--startup-profile", help="Report how long importing Francine takes, per module, and exit."),
+    profile: bool = typer.Option(False, "--profile", help="Sample every turn's stacks; writes collapsed stacks and a report under FrancineData/logs/profiles."),
+    profile_rate: float = typer.Option(profiler.DEFAULT_RATE_HZ, "--profile-rate", help="Samples per second for --profile."),
+    profile_dir: Path = typer.Option(None, "--profile-dir", help="Where --profile writes its files (default: FrancineData/logs/profiles)."),
+):
+    """Francine, your local AI assistant."""
+    if startup_profile:
+        report_startup_profile()
+        raise typer.Exit()
+    tracing.PRINT_WATERFALL = trace
+    if no_cache:
+        tool_cache.BYPASS = True
+    if profile:
+        profiler.configure(profile_rate, profile_dir)
+        print(f"Francine: Profiling every turn at {profile_rate:g} Hz -> {profiler.PROFILER.out_dir}")
+    if ctx.invoked_subcommand not in ("stats", "cache", "voice-bench"): # Benchmarks would skew the live numbers
+        metrics.start_snapshots(ctx.invoked_subcommand or "chat") # Lets `francine stats` read this process's numbers
+    if ctx.invoked_subcommand is None:
+        main()
 
 
 # --- MODIFIED: Existing chat and voice loops ---
 @app.command()
 def chat():
     """Start a text chat with Francine."""
-    asyncio.run(main_chat_loop())
+    try:
+        asyncio.run(main_chat_loop())
+    finally:
+        memory.shutdown_writer()
+        tools.REGISTRY.shutdown()
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Interface to bind. Keep 127.0.0.1 unless the network is trusted."),
+    port: int = typer.Option(8765, help="Port to listen on."),
+    workers: int = typer.Option(None, help="Turns processed concurrently (default: $OLLAMA_NUM_PARALLEL or 2)."),
+    max_queue: int = typer.Option(None, help="Requests allowed to wait for a worker before new ones get HTTP 429."),
+):
+    """Serve Francine over HTTP (streaming NDJSON) and WebSocket for concurrent clients."""
+    import uvicorn # Heavy; only needed for server mode
+    import server
+
+    server.configure(
+        handle_prompt,
+        workers if workers is not None else server.DEFAULT_WORKERS,
+        max_queue if max_queue is not None else server.DEFAULT_MAX_QUEUE,
+    )
+    print(f"Francine: Serving on http://{host}:{port} (POST /v1/chat, WS /v1/ws, GET /health, GET /metrics)")
+    try:
+        uvicorn.run(server.app, host=host, port=port, log_level="info")
+    finally:
+        memory.shutdown_writer()
+        tools.REGISTRY.shutdown()
+
+
+@app.command()
+def batch(
+    input_file: Path = typer.Argument(..., exists=True, dir_okay=False, help="JSONL file: one {\"id\": ..., \"prompt\": ...} object (or a bare string) per line."),
+    output: Path = typer.Option(None, "--output", "-o", help="Results JSONL (default: <input>.results.jsonl). Also the resume checkpoint."),
+    concurrency: int = typer.Option(batch_runner.DEFAULT_CONCURRENCY, "--concurrency", "-c", help="Prompts processed at the same time."),
+    timeout: float = typer.Option(None, help="Per-prompt time limit in seconds."),
+    retry_failed: bool = typer.Option(True, help="On resume, run prompts that failed last time again."),
+):
+    """Run many prompts non-interactively; results stream to a JSONL file and interrupted runs resume."""
+    output_path = output or batch_runner.output_path_for(input_file)
+
+    async def run() -> dict:
+        try:
+            return await batch_runner.run_batch(handle_prompt, input_file, output_path, concurrency, timeout, retry_failed)
+        finally:
+            await close_web_clients()
+            await llm.close_client()
+
+    try:
+        stats = asyncio.run(run())
+        print(batch_runner.format_report(stats, output_path))
+    except KeyboardInterrupt:
+        print(f"\nBatch interrupted. Finished results are in {output_path}; run the same command again to resume.")
+    finally:
+        memory.shutdown_writer()
+        tools.REGISTRY.shutdown()
+
+
+@app.command("voice-bench")
+def voice_bench_command(
+    fixtures: List[Path] = typer.Argument(..., exists=True, help="WAV files (16-bit PCM; one or more utterances each) or folders of them."),
+    speed: float = typer.Option(1.0, help="Replay speed: 1.0 = real time, 0 = as fast as possible."),
+    llm_latency: float = typer.Option(voice_bench.DEFAULT_FIRST_TOKEN_S, "--llm-latency", help="Seconds the stubbed LLM takes to answer."),
+    real_tts: bool = typer.Option(False, "--real-tts", help="Speak replies with pyttsx3 instead of the silent engine (needs an audio device)."),
+    output: Path = typer.Option(None, "--output", "-o", help="Also write the full report as JSON."),
+):
+    """Benchmark the voice pipeline (VAD -> STT -> handle_prompt -> TTS) on recorded WAV files; no microphone or Ollama needed."""
+    paths = [p for f in fixtures for p in (sorted(f.glob("*.wav")) if f.is_dir() else [f])]
+    if not paths:
+        print("No WAV files found.")
+        raise typer.Exit(code=1)
+
+    async def handler(text: str) -> str:
+        # Fixture transcripts and stub replies must not reach the memory log (RAG, reflection)
+        return await handle_prompt(text, context=conversation.ConversationContext(), interactive=False, speak=False, log=False)
+
+    try:
+        report = asyncio.run(voice_bench.run_benchmark(handler, paths, speed, llm_latency, silent_tts=not real_tts))
+    finally:
+        memory.shutdown_writer()
+        tools.REGISTRY.shutdown()
+    print(voice_bench.format_report(report))
+    if output:
+        output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"Report written to {output}")
+
+
+@app.command()
+def stats(
+    prometheus: bool = typer.Option(False, "--prometheus", help="Print Prometheus text format instead of the summary."),
+    output: Path = typer.Option(None, "--output", "-o", help="Write the Prometheus text to this file (e.g. for node_exporter's textfile collector)."),
+    command: str = typer.Option(None, "--command", "-c", help="Show this command's process (chat, serve, batch, voice, ...) instead of the most recent one."),
+):
+    """Show latency histograms and counters from the most recent (or running) Francine session."""
+    snapshot = metrics.load_snapshot(command)
+    if snapshot is None:
+        where = metrics.snapshot_path(command) if command else metrics.LOG_DIR / metrics.SNAPSHOT_GLOB
+        print(f"No metrics recorded yet ({where} not found). Run Francine first.")
+        raise typer.Exit(code=1)
+    others = [snap.get("command") for snap in metrics.list_snapshots() if snap.get("command") != snapshot.get("command")]
+    if others and not prometheus and output is None:
+        print(f"(Also recorded: {', '.join(others)}; pick one with --command.)")
+    if output is not None:
+        memory.atomic_write_text(output, metrics.render_prometheus(snapshot))
+        print(f"Metrics written to {output}")
+    elif prometheus:
+        print(metrics.render_prometheus(snapshot), end="")
+    else:
+        print(metrics.format_stats(snapshot))
+
+
+@app.command("cache")
+def cache_command(clear: bool = typer.Option(False, "--clear", help="Delete all cached tool results and statistics.")):
+    """Show tool-result cache statistics (entries, size, hits/misses per tool)."""
+    if clear:
+        tool_cache.CACHE.clear()
+        print("Tool-result cache cleared.")
+        return
+    totals, per_tool = tool_cache.CACHE.stats()
+    print(f"Tool-result cache: {totals['entries']} entries, {totals['bytes'] / 1024:.1f} KiB of {totals['max_bytes'] / 1024 / 1024:.0f} MiB ({tool_cache.CACHE_PATH})")
+    for tool_name, counts in sorted(per_tool.items()):
+        lookups = counts["hits"] + counts["misses"]
+        hit_rate = counts["hits"] / lookups * 100 if lookups else 0.0
+        print(f"  {tool_name:<24} hits={counts['hits']:<6} misses={counts['misses']:<6} hit_rate={hit_rate:5.1f}% entries={counts['entries']}")
+
 
 async def main_chat_loop():
     """Asynchronous loop for text chat interaction."""
     profile = memory.load_user_profile()
     print("Starting Francine in text chat mode.")
-    while True:
-        user_input = typer.prompt("You")
-        if user_input.lower() in ["exit", "quit", "bye"]:
-            print("Francine: Goodbye!")
-            break
-        await handle_prompt(user_input)
-        profile["last_message"] = user_input
-        memory.save_user_profile(profile)
+    config.start_watching() # Apply config.json edits without a restart
+    await asyncio.to_thread(preferences.refresh_style_preferences)
+    evolution.schedule_background_reflection()
+    try:
+        while True:
+            # typer.prompt blocks; run it in a thread so background tasks keep running
+            user_input = await asyncio.to_thread(typer.prompt, "You")
+            if user_input.lower() in ["exit", "quit", "bye"]:
+                print("Francine: Goodbye!")
+                break
+            await handle_prompt(user_input)
+            profile["last_message"] = user_input
+            memory.save_user_profile(profile) # Queued; written atomically off the event loop
+            evolution.schedule_background_reflection()
+    finally:
+        await evolution.cancel_background_reflection()
+        await close_web_clients()
+        await llm.close_client()
+        config.stop_watching()
+
+# Voice mode starts retrieval on the stable partial transcript once it has this many words
+SPECULATE_MIN_WORDS = 3
+SPECULATE_MIN_COVERAGE = 0.7 # Share of the final transcript's words the speculated prefix must cover
+
+
+def _normalize_query(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def _speculate_retrieval(speculation: Dict[str, asyncio.Task], stable_text: str) -> None:
+    """Starts retrieval for the stable prefix of the utterance being spoken, replacing older guesses."""
+    # In wake word mode partials only start once the wake-word gate has passed (see voice.py)
+    if len(stable_text.split()) < SPECULATE_MIN_WORDS:
+        return
+    for task in speculation.values():
+        task.cancel()
+    speculation.clear()
+    speculation[_normalize_query(stable_text)] = _spawn_background(_retrieve_context(stable_text))
+
+
+def _take_speculation(speculation: Dict[str, asyncio.Task], text: str) -> Dict[str, asyncio.Task]:
+    """
+    The speculative retrieval, as handle_prompt's 'retrievals' for 'text', if its query is a
+    word prefix of the final transcript covering at least SPECULATE_MIN_COVERAGE of its words.
+    The uncommitted tail is usually the last word or two, which rarely changes what is
+    retrieved; a shorter prefix is dropped and the full text is retrieved instead.
+    """
+    final_words = _normalize_query(text).split()
+    reused = None
+    for query, task in speculation.items():
+        words = query.split()
+        if final_words[:len(words)] == words and len(words) >= SPECULATE_MIN_COVERAGE * len(final_words):
+            reused = task
+        else:
+            task.cancel()
+    speculation.clear()
+    return {text: reused} if reused is not None else {}
+
 
 async def voice_loop_async():
     """Main asynchronous loop for voice interaction."""
-    print("Francine: Voice mode active. Listening...")
-    while True:
-        try:
-            text = await asyncio.to_thread(voice.whisper_listen)
-            if text:
-                print(f"You (Voice): {text}")
-                await handle_prompt(text)
-            else:
-                await asyncio.sleep(0.1) # Prevent busy-waiting
-        except Exception as e:
-            auto_fix(e)
-            print(f"Francine: An error occurred in voice mode: {e}. Switching to text chat mode.")
-            await main_chat_loop()
-            break
+    import voice # Whisper and the audio stack load here, not at startup
+    if await asyncio.to_thread(voice.load_model) is None:
+        raise RuntimeError("Whisper model could not be loaded.")
+    config.start_watching() # e.g. wake word or VAD changes apply to the next utterance
+    voice.start_tts() # The speech engine initializes now, not on the first reply
+    # One input stream for the whole session; speech during a turn is queued, not lost
+    await asyncio.to_thread(voice.start_capture)
+    # Partial transcripts arrive on the partials thread; retrieval for them starts on the loop
+    loop = asyncio.get_running_loop()
+    speculation: Dict[str, asyncio.Task] = {}
+    partial_listener = lambda stable_text: loop.call_soon_threadsafe(_speculate_retrieval, speculation, stable_text)
+    voice.PARTIAL_LISTENERS.append(partial_listener)
+    try:
+        print("Francine: Voice mode active. Listening...")
+        await asyncio.to_thread(preferences.refresh_style_preferences)
+        evolution.schedule_background_reflection()
+        while True:
+            try:
+                # Blocks on the utterance queue (no polling); "" after a quiet listen window
+                text = await asyncio.to_thread(voice.whisper_listen)
+                if text:
+                    print(f"You (Voice): {text}")
+                    await handle_prompt(text, retrievals=_take_speculation(speculation, text))
+                    evolution.schedule_background_reflection()
+            except Exception as e:
+                auto_fix(e)
+                voice.stop_capture()
+                print(f"Francine: An error occurred in voice mode: {e}. Switching to text chat mode.")
+                await main_chat_loop()
+                break
+    finally:
+        # Also on Ctrl-C and normal exit, like the chat loop: nothing is left to interpreter teardown
+        voice.PARTIAL_LISTENERS.remove(partial_listener)
+        for task in speculation.values():
+            task.cancel()
+        await asyncio.to_thread(voice.stop_capture) # Joins the capture and partials threads
+        await asyncio.to_thread(voice.stop_tts)
+        await evolution.cancel_background_reflection()
+        await close_web_clients()
+        await llm.close_client()
+        config.stop_watching()
 
 
 if __name__ == "__main__":
-    main()
+    app(prog_name="francine")
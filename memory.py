@@ -1,5 +1,9 @@
 import json
 import os
+import queue
+import threading
+import time
+import atexit
 from pathlib import Path
 
 # Base directory for persistent storage
@@ -12,8 +16,184 @@ PROFILE_PATH = BASE_DIR / "user_profile.json"
 MEM_LOG = BASE_DIR / "memlog.txt"
 CORE_MEMORY_PATH = BASE_DIR / "core_memory.json" # Added core memory path
 
+# Write-behind settings: records are flushed when this many are queued
+# or when the oldest queued record is older than the interval.
+WRITER_MAX_BATCH = 32
+WRITER_FLUSH_INTERVAL = 2.0 # seconds
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Writes text to a temporary file next to 'path' and renames it into place,
+    so a crash mid-write never leaves a truncated file behind.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: Path, data) -> None:
+    """Serializes 'data' as JSON and writes it atomically to 'path'."""
+    atomic_write_text(path, json.dumps(data, indent=2))
+
+
+class _WriteBehindWriter:
+    """
+    Background writer that keeps disk I/O off the interactive path.
+    Log lines are queued and appended in batches; profile saves are coalesced
+    so only the latest profile is written, atomically.
+    """
+
+    def __init__(self, max_batch: int = WRITER_MAX_BATCH, flush_interval: float = WRITER_FLUSH_INTERVAL):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_profile: dict | None = None
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="francine-writer", daemon=True)
+                    self._thread.start()
+
+    def append(self, path: Path, text: str) -> None:
+        """Queues 'text' to be appended to 'path'."""
+        if self._closed:
+            _append_now(path, text)
+            return
+        self._ensure_started()
+        self._queue.put(("append", path, text, None))
+
+    def save_profile(self, data: dict) -> None:
+        """Queues a profile save; only the latest pending profile is written."""
+        if self._closed:
+            atomic_write_json(PROFILE_PATH, data)
+            return
+        with self._lock:
+            self._pending_profile = dict(data)
+        self._ensure_started()
+        self._queue.put(("profile", None, None, None))
+
+    def pending_profile(self) -> dict | None:
+        """Returns a copy of the profile waiting to be written, if any."""
+        with self._lock:
+            return dict(self._pending_profile) if self._pending_profile is not None else None
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Blocks until everything queued so far has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(("flush", None, None, done))
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """Flushes outstanding writes and stops the writer thread."""
+        if self._closed:
+            return
+        self.flush(timeout=10.0)
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(("stop", None, None, None))
+            self._thread.join(timeout=10.0)
+
+    def _run(self) -> None:
+        batch: list[tuple[Path, str]] = []
+        profile_dirty = False
+        waiters: list[threading.Event] = []
+        batch_started = 0.0
+        stop = False
+
+        while not stop:
+            timeout = None
+            if batch or profile_dirty:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - batch_started))
+            try:
+                kind, path, text, event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind = "timeout"
+
+            if kind == "append":
+                if not batch and not profile_dirty:
+                    batch_started = time.monotonic()
+                batch.append((path, text))
+            elif kind == "profile":
+                if not batch and not profile_dirty:
+                    batch_started = time.monotonic()
+                profile_dirty = True
+            elif kind == "flush":
+                waiters.append(event)
+            elif kind == "stop":
+                stop = True
+
+            should_flush = (
+                kind in ("timeout", "flush", "stop")
+                or len(batch) >= self.max_batch
+            )
+            if should_flush:
+                self._write(batch, profile_dirty)
+                batch = []
+                profile_dirty = False
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+
+    def _write(self, batch: list[tuple[Path, str]], profile_dirty: bool) -> None:
+        # Group appends per file so each file is opened once per flush
+        grouped: dict[Path, list[str]] = {}
+        for path, text in batch:
+            grouped.setdefault(path, []).append(text)
+        for path, chunks in grouped.items():
+            _append_now(path, "".join(chunks))
+
+        if profile_dirty:
+            with self._lock:
+                profile = self._pending_profile
+                self._pending_profile = None
+            if profile is not None:
+                try:
+                    atomic_write_json(PROFILE_PATH, profile)
+                except Exception as e:
+                    from debug import auto_fix
+                    auto_fix(e)
+
+
+def _append_now(path: Path, text: str) -> None:
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(text)
+    except Exception as e:
+        from debug import auto_fix
+        auto_fix(e)
+
+
+WRITER = _WriteBehindWriter()
+atexit.register(WRITER.close)
+
+
+def flush_writes(timeout: float | None = None) -> None:
+    """Blocks until all queued log lines and profile saves are on disk."""
+    WRITER.flush(timeout)
+
+
+def shutdown_writer() -> None:
+    """Flushes and stops the background writer. Call on application exit."""
+    WRITER.close()
+
+
 def load_user_profile() -> dict:
-    """Loads the user profile from disk."""
+    """Loads the user profile from disk (or the pending, not yet written copy)."""
+    pending = WRITER.pending_profile()
+    if pending is not None:
+        return pending
     if PROFILE_PATH.exists():
         try:
             with open(PROFILE_PATH, 'r', encoding='utf-8') as f:
@@ -24,21 +204,17 @@ def load_user_profile() -> dict:
     return {}
 
 def save_user_profile(data: dict) -> None:
-    """Saves the user profile to disk."""
-    # BASE_DIR.mkdir(parents=True, exist_ok=True) # Already ensured at module level
+    """Queues the user profile to be saved atomically by the background writer."""
     try:
-        with open(PROFILE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        WRITER.save_profile(data)
     except Exception as e:
         from debug import auto_fix
         auto_fix(e)
 
 def log_interaction(prompt: str, response: str) -> None:
-    """Logs each interaction for RAG and memory purposes."""
-    # BASE_DIR.mkdir(parents=True, exist_ok=True) # Already ensured at module level
+    """Queues each interaction for the memory log (used for RAG and reflection)."""
     try:
-        with open(MEM_LOG, 'a', encoding='utf-8') as f:
-            f.write(f"USER: {prompt}\nAI: {response}\n\n")
+        WRITER.append(MEM_LOG, f"USER: {prompt}\nAI: {response}\n\n")
     except Exception as e:
         from debug import auto_fix
         auto_fix(e)
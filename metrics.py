@@ -0,0 +1,298 @@
+import atexit
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+# FIX: Dynamically determine BASE_DIR based on the new BASE_DIR from memory.py
+# Assuming memory.py is imported and its BASE_DIR is the source of truth
+import memory
+LOG_DIR = memory.BASE_DIR / "logs"
+LOG_DIR.mkdir(parents=True, exist_ok=True)
+# One snapshot file per command (chat, serve, batch, ...), read by `francine stats`
+SNAPSHOT_GLOB = "metrics_snapshot_*.json"
+
+# Seconds between snapshot writes while Francine runs (and once more at exit)
+SNAPSHOT_INTERVAL = 30.0
+
+# Latency buckets in seconds: sub-10ms cache hits up to minute-long LLM calls and scrapes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    if len(labels) != len(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _snapshot_values(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in items]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": self.kind, "help": self.help, "labelnames": list(self.labelnames), "series": self._snapshot_values()}
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (calls, errors, cache hits)."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (queue depth, active turns)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets (plus sum and count); O(log buckets) per observe."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value) # Bucket i counts values <= buckets[i]; last is +Inf
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the block in seconds (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _snapshot_values(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [(key, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}) for key, s in self._values.items()]
+        return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in items]
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    """In-process metrics, keyed by name. Registering an existing name returns the same metric."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}.")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "taken_at": time.time(),
+            "metrics": {m.name: m.snapshot() for m in metrics},
+        }
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# --- Rendering (works on live registries and on persisted snapshots alike) ---
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str], extra: Dict[str, str] | None = None) -> str:
+    merged = dict(labels, **(extra or {}))
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in merged.items()) + "}"
+
+
+def render_prometheus(snapshot: Dict[str, Any] | None = None) -> str:
+    """Prometheus text exposition format (version 0.0.4) of a snapshot (default: this process)."""
+    snapshot = snapshot if snapshot is not None else REGISTRY.snapshot()
+    lines = []
+    for name, metric in sorted(snapshot["metrics"].items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for series in metric["series"]:
+            labels, value = series["labels"], series["value"]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [math.inf], value["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def histogram_quantile(buckets: List[float], counts: List[int], q: float) -> float:
+    """Estimates a quantile from bucket counts by linear interpolation within the bucket (like PromQL)."""
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            lower = buckets[i - 1] if i > 0 else 0.0
+            if i >= len(buckets): # +Inf bucket: the best we can say is "above the last bound"
+                return buckets[-1] if buckets else 0.0
+            return lower + (buckets[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1] if buckets else 0.0
+
+
+def format_stats(snapshot: Dict[str, Any]) -> str:
+    """Human-readable summary of a snapshot for `francine stats`."""
+    taken = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.get("taken_at", 0)))
+    uptime = snapshot.get("taken_at", 0) - snapshot.get("started_at", 0)
+    lines = [f"Metrics of '{snapshot.get('command', 'chat')}' process {snapshot.get('pid')} (snapshot {taken}, uptime {uptime / 60:.1f} min)"]
+    for name, metric in sorted(snapshot["metrics"].items()):
+        if not metric["series"]:
+            continue
+        lines.append(f"{name}  ({metric['help']})")
+        for series in sorted(metric["series"], key=lambda s: sorted(s["labels"].items())):
+            label_text = ", ".join(f"{k}={v}" for k, v in series["labels"].items()) or "-"
+            value = series["value"]
+            if metric["type"] == "histogram":
+                count = value["count"]
+                mean = value["sum"] / count if count else 0.0
+                p50 = histogram_quantile(metric["buckets"], value["counts"], 0.50)
+                p95 = histogram_quantile(metric["buckets"], value["counts"], 0.95)
+                lines.append(f"  {label_text:<40} n={count:<6} mean={mean * 1000:8.1f} ms  p50~{p50 * 1000:8.1f} ms  p95~{p95 * 1000:8.1f} ms")
+            else:
+                lines.append(f"  {label_text:<40} {_format_value(value)}")
+    return "\n".join(lines)
+
+
+# --- Persistence: a periodic snapshot so `francine stats` can read another process's numbers ---
+_snapshot_thread: threading.Thread | None = None
+_snapshot_stop = threading.Event()
+
+
+_snapshot_command = "chat" # Set by start_snapshots()
+
+
+def snapshot_path(command: str) -> Path:
+    return LOG_DIR / f"metrics_snapshot_{command}.json"
+
+
+def save_snapshot() -> None:
+    try:
+        memory.atomic_write_json(snapshot_path(_snapshot_command), {**REGISTRY.snapshot(), "command": _snapshot_command})
+    except Exception as e:
+        print(f"Warning: Could not save metrics snapshot: {e}")
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    """Every command's last snapshot, most recent first."""
+    snapshots = []
+    for path in LOG_DIR.glob(SNAPSHOT_GLOB):
+        try:
+            snapshots.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return sorted(snapshots, key=lambda snap: snap.get("taken_at", 0), reverse=True)
+
+
+def load_snapshot(command: str | None = None) -> Dict[str, Any] | None:
+    """The snapshot of 'command''s process, or the most recent one of any command."""
+    if command is None:
+        snapshots = list_snapshots()
+        return snapshots[0] if snapshots else None
+    try:
+        return json.loads(snapshot_path(command).read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def start_snapshots(command: str = "chat", interval: float = SNAPSHOT_INTERVAL) -> None:
+    """
+    Writes a snapshot every 'interval' seconds from a daemon thread, and once at exit, to
+    the file of 'command', so concurrent chat/serve/batch processes don't overwrite each other.
+    """
+    global _snapshot_thread, _snapshot_command
+    if _snapshot_thread is not None:
+        return
+    _snapshot_command = command
+
+    def run() -> None:
+        while not _snapshot_stop.wait(interval):
+            save_snapshot()
+
+    _snapshot_thread = threading.Thread(target=run, name="francine-metrics", daemon=True)
+    _snapshot_thread.start()
+    atexit.register(save_snapshot)
@@ -88,31 +88,44 @@ def recon_vehicle(vin: str) -> Dict:
 
 
 def recon_domain(dom: str) -> Dict:
-    """Performs OSINT on a domain, including WHOIS and DNS records."""
+    """
+    Performs OSINT on a domain, including WHOIS and DNS records. Lookups that failed (rather
+    than answered "no records") are listed under "error", which keeps the result out of the
+    tool cache.
+    """
+    errors = []
     try:
         w = whois.whois(dom)
-    except Exception:
+    except Exception as e:
         w = {}
+        errors.append(f"whois: {e}")
     dns_records = {}
     try:
         for rtype in ['A', 'MX', 'NS']:
             try:
                 dns_records[rtype] = [str(r) for r in dns.resolver.resolve(dom, rtype)]
-            except Exception:
+            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                dns_records[rtype] = [] # A real answer: there are no such records
+            except Exception as e:
                 dns_records[rtype] = []
-    except Exception:
+                errors.append(f"dns {rtype}: {e}")
+    except Exception as e:
         dns_records = {}
+        errors.append(f"dns: {e}")
     data = {"whois": str(w), "dns": dns_records}
+    if errors:
+        data["error"] = "; ".join(errors)
     return data | {"path": _dump_result(f"domain_{dom}", data)}
 
 
 def recon_ip(ip: str) -> Dict:
-    """Performs OSINT on an IP address."""
+    """Performs OSINT on an IP address. A failed lookup is reported under "error" (not cached)."""
     try:
         r = requests.get(f"http://ip-api.com/json/{ip}")
+        r.raise_for_status()
         info = r.json()
-    except Exception:
-        info = {}
+    except Exception as e:
+        return {"info": {}, "error": str(e), "path": _dump_result(f"ip_{ip}", {})}
     return {"info": info, "path": _dump_result(f"ip_{ip}", info)}
 
 
@@ -0,0 +1,154 @@
+import json
+import re
+import threading
+from typing import Dict
+
+# FIX: Dynamically determine BASE_DIR based on the new BASE_DIR from memory.py
+# Assuming memory.py is imported and its BASE_DIR is the source of truth
+import memory
+BASE_DIR = memory.BASE_DIR
+FEEDBACK_LOG_PATH = BASE_DIR / "feedback_log.jsonl"
+STYLE_PREFS_PATH = BASE_DIR / "style_preferences.json" # Running stats + compiled directives + read offset
+
+# Feedback mode always offers [concise, detailed] in this order (see main.handle_feedback_request)
+STYLES = ("concise", "detailed")
+
+# A directive is only emitted once a topic has this many comparisons...
+MIN_COMPARISONS = 3
+# ...and the smoothed win rate of one style is at least this strong.
+WIN_RATE_THRESHOLD = 0.65
+
+STYLE_DIRECTIVES = {
+    "concise": "Style preference: the user prefers concise, direct answers.",
+    "detailed": "Style preference: the user prefers detailed answers with explanations.",
+}
+
+# Cheap keyword topic clusters; the same classifier runs on feedback prompts and live prompts.
+TOPIC_KEYWORDS = {
+    "osint": ["osint", "recon", "username", "email", "whois", "dns", "domain", "ip", "vin", "vehicle", "person"],
+    "ecommerce": ["product", "aliexpress", "tiktok", "shopify", "profit", "price", "sell", "store", "trend"],
+    "documents": ["pdf", "document", "markdown", "form", "report"],
+    "files": ["file", "folder", "directory", "move", "delete", "rename"],
+    "web": ["url", "website", "scrape", "http", "page", "browse", "crawl"],
+}
+GLOBAL_TOPIC = "all"
+
+_lock = threading.Lock()
+_state: Dict | None = None
+
+
+def classify_topic(text: str) -> str:
+    """Maps a prompt to a coarse topic cluster by keyword overlap ('general' if none match)."""
+    words = set(re.findall(r"[a-z0-9]+", text.lower()))
+    best_topic, best_hits = "general", 0
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        hits = sum(1 for k in keywords if k in words)
+        if hits > best_hits:
+            best_topic, best_hits = topic, hits
+    return best_topic
+
+
+def _empty_state() -> Dict:
+    return {"offset": 0, "topics": {}, "directives": {}}
+
+
+def _load_state() -> Dict:
+    if STYLE_PREFS_PATH.exists():
+        try:
+            state = json.loads(STYLE_PREFS_PATH.read_text(encoding='utf-8'))
+            if isinstance(state, dict) and "offset" in state:
+                return state
+        except (json.JSONDecodeError, OSError):
+            pass
+        print("Warning: style_preferences.json is corrupted. Rebuilding from the feedback log.")
+    return _empty_state()
+
+
+def _chosen_style(record: Dict) -> str | None:
+    style = record.get("chosen_style")
+    if style in STYLES:
+        return style
+    responses = record.get("all_responses") or []
+    chosen = record.get("chosen_response")
+    for style, response in zip(STYLES, responses):
+        if response == chosen:
+            return style
+    return None
+
+
+def _compile_directives(topics: Dict) -> Dict[str, str]:
+    directives = {}
+    for topic, counts in topics.items():
+        total = sum(counts.get(s, 0) for s in STYLES)
+        if total < MIN_COMPARISONS:
+            continue
+        for style in STYLES:
+            # Laplace-smoothed win rate so a couple of votes don't flip the style
+            win_rate = (counts.get(style, 0) + 1) / (total + 2)
+            if win_rate >= WIN_RATE_THRESHOLD:
+                directives[topic] = STYLE_DIRECTIVES[style]
+    return directives
+
+
+def refresh_style_preferences() -> int:
+    """
+    Streams feedback records appended since the stored offset, folds them into the
+    running per-topic win counts and recompiles the style directives.
+    Cost is O(new records). Returns the number of records consumed.
+    """
+    global _state
+    with _lock:
+        state = _state if _state is not None else _load_state()
+        if not FEEDBACK_LOG_PATH.exists():
+            _state = state
+            return 0
+
+        offset = state.get("offset", 0)
+        if offset > FEEDBACK_LOG_PATH.stat().st_size: # Log was truncated; rebuild
+            state = _empty_state()
+            offset = 0
+
+        consumed = 0
+        topics = state.setdefault("topics", {})
+        with open(FEEDBACK_LOG_PATH, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break # Partially written line; pick it up next time
+                offset += len(raw)
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                style = _chosen_style(record)
+                if style is None:
+                    continue
+                for topic in (classify_topic(record.get("original_prompt", "")), GLOBAL_TOPIC):
+                    counts = topics.setdefault(topic, {s: 0 for s in STYLES})
+                    counts[style] = counts.get(style, 0) + 1
+                consumed += 1
+
+        state["offset"] = offset
+        if consumed:
+            state["directives"] = _compile_directives(topics)
+        _state = state
+        if consumed:
+            try:
+                memory.atomic_write_json(STYLE_PREFS_PATH, state)
+            except Exception as e:
+                print(f"Error saving style preferences: {e}")
+        return consumed
+
+
+def get_style_directive(prompt: str) -> str:
+    """
+    Returns the precompiled style directive for the prompt's topic, falling back to
+    the global preference. A dictionary lookup; no file or LLM work per turn.
+    """
+    global _state
+    if _state is None:
+        with _lock:
+            if _state is None:
+                _state = _load_state()
+    directives = _state.get("directives", {})
+    return directives.get(classify_topic(prompt)) or directives.get(GLOBAL_TOPIC, "")
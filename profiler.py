@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+# FIX: Dynamically determine BASE_DIR based on the new BASE_DIR from memory.py
+# Assuming memory.py is imported and its BASE_DIR is the source of truth
+import memory
+DEFAULT_PROFILE_DIR = memory.BASE_DIR / "logs" / "profiles"
+
+# Set by --profile. When False nothing in this module runs: no thread, no sampling.
+ENABLED = False
+DEFAULT_RATE_HZ = 100.0
+MAX_STACK_DEPTH = 128
+
+# Leaf frames that mean "blocked, not running Python": the event loop idling in select,
+# worker threads waiting for work, blocking socket reads, sleeps.
+WAIT_LEAVES = {
+    ("selectors.py", "select"), ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("socket.py", "readinto"), ("ssl.py", "read"), ("ssl.py", "recv_into"),
+    ("subprocess.py", "_wait"), ("subprocess.py", "_communicate"), ("thread.py", "_worker"),
+}
+
+Stack = Tuple[str, ...] # Root first; element 0 is "thread:<name>"
+
+
+def _frame_label(code, cache: Dict) -> str:
+    label = cache.get(code)
+    if label is None:
+        label = f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(";", ":").replace(" ", "_")
+        cache[code] = label
+    return label
+
+
+class TurnProfile:
+    """Samples collected while one turn was running."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.time()
+        self.samples: Counter = Counter()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a daemon thread snapshots every thread's Python stack with
+    sys._current_frames() 'rate' times per second while at least one turn is active.
+    Sees the event loop, the tool thread pool and to_thread workers; not process-pool tools.
+    """
+
+    def __init__(self, rate_hz: float = DEFAULT_RATE_HZ, out_dir: Path = DEFAULT_PROFILE_DIR):
+        self.interval = 1.0 / max(1.0, rate_hz)
+        self.out_dir = Path(out_dir)
+        self._lock = threading.Lock()
+        self._active: set = set()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._labels: Dict = {}
+        self.cumulative: Counter = Counter()
+        self.turns = 0
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                    frames.append(_frame_label(frame.f_code, self._labels))
+                    frame = frame.f_back
+                frames.append(f"thread:{names.get(ident, ident)}")
+                stacks.append(tuple(reversed(frames)))
+            with self._lock:
+                for profile in self._active:
+                    profile.samples.update(stacks)
+
+    def begin(self, label: str) -> TurnProfile:
+        profile = TurnProfile(label)
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="francine-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: TurnProfile) -> None:
+        with self._lock:
+            self._active.discard(profile)
+            thread = self._thread if not self._active else None
+            if thread is not None:
+                self._thread = None
+                self._stop.set()
+            self.cumulative.update(profile.samples)
+            self.turns += 1
+        if thread is not None:
+            thread.join(timeout=1.0)
+
+    def write_turn(self, profile: TurnProfile) -> Path:
+        """Writes the turn's collapsed stacks and refreshes the cumulative files. Returns the turn's file."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^a-zA-Z0-9]+", "_", profile.label)[:40].strip("_") or "turn"
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(profile.started))
+        path = self.out_dir / f"{stamp}_{self.turns:04d}_{slug}.collapsed"
+        memory.atomic_write_text(path, render_collapsed(profile.samples))
+        with self._lock:
+            cumulative = Counter(self.cumulative)
+            turns = self.turns
+        memory.atomic_write_text(self.out_dir / "cumulative.collapsed", render_collapsed(cumulative))
+        memory.atomic_write_text(self.out_dir / "report.txt", render_report(cumulative, turns, self.interval))
+        return path
+
+
+def render_collapsed(samples: Counter) -> str:
+    """Brendan Gregg's collapsed format ('frame;frame;frame count'), readable by flamegraph.pl and speedscope."""
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(samples.items()))
+
+
+def _is_waiting(stack: Stack) -> bool:
+    leaf = stack[-1].rsplit(":", 1) if len(stack) > 1 else ["", ""]
+    return tuple(leaf) in WAIT_LEAVES
+
+
+def wait_share(samples: Counter) -> Dict[str, Tuple[int, int]]:
+    """Per thread: (samples blocked/waiting, total samples)."""
+    shares: Dict[str, Tuple[int, int]] = {}
+    for stack, count in samples.items():
+        waiting, total = shares.get(stack[0], (0, 0))
+        shares[stack[0]] = (waiting + (count if _is_waiting(stack) else 0), total + count)
+    return shares
+
+
+def render_report(samples: Counter, turns: int, interval: float, top: int = 25) -> str:
+    """Cumulative text report: waiting vs running per thread, then the hottest functions."""
+    total = sum(samples.values())
+    lines = [f"Francine sampling profile: {turns} turn(s), {total} samples at {1 / interval:.0f} Hz", ""]
+    lines.append("Per thread (waiting = blocked in select/locks/sockets/sleep; running = executing Python):")
+    for thread, (waiting, count) in sorted(wait_share(samples).items(), key=lambda item: -item[1][1]):
+        lines.append(f"  {thread:<40} {count:>7} samples  waiting {waiting / count * 100:5.1f}%  running {(count - waiting) / count * 100:5.1f}%")
+
+    self_counts: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in samples.items():
+        if _is_waiting(stack):
+            continue
+        self_counts[stack[-1]] += count
+        for frame in set(stack[1:]):
+            inclusive[frame] += count
+    running = sum(self_counts.values()) or 1
+    lines += ["", f"Top {top} functions by self time (running samples only):"]
+    for frame, count in self_counts.most_common(top):
+        lines.append(f"  {count / running * 100:6.2f}%  {count:>7}  {frame}")
+    lines += ["", f"Top {top} functions by inclusive time (running samples only):"]
+    for frame, count in inclusive.most_common(top):
+        lines.append(f"  {count / running * 100:6.2f}%  {count:>7}  {frame}")
+    return "\n".join(lines) + "\n"
+
+
+PROFILER: SamplingProfiler | None = None
+
+
+def configure(rate_hz: float = DEFAULT_RATE_HZ, out_dir: Path | None = None) -> None:
+    """Turns profiling on (--profile) with the given sampling rate and output directory."""
+    global ENABLED, PROFILER
+    PROFILER = SamplingProfiler(rate_hz, out_dir or DEFAULT_PROFILE_DIR)
+    ENABLED = True
+
+
+@contextmanager
+def profile_turn(label: str):
+    """Samples all threads while the block runs and writes the turn's profile afterwards."""
+    profiler = PROFILER
+    profile = profiler.begin(label)
+    try:
+        yield profile
+    finally:
+        profiler.end(profile)
+        try:
+            path = profiler.write_turn(profile)
+            waiting, total = wait_share(profile.samples).get("thread:MainThread", (0, 0))
+            busy = f", event loop waiting {waiting / total * 100:.0f}%" if total else ""
+            print(f"Profile: {sum(profile.samples.values())} samples{busy} -> {path}")
+        except OSError as e:
+            print(f"Warning: Could not write profile: {e}")
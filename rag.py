@@ -1,13 +1,14 @@
 import os
 from pathlib import Path
 from typing import List, Tuple, Union
-import faiss
 import numpy as np
 import glob
 import json
 import asyncio
 
 import llm
+import metrics
+import tracing
 # FIX: Dynamically determine BASE_DIR based on the new BASE_DIR from memory.py
 # Assuming memory.py is imported and its BASE_DIR is the source of truth
 import memory
@@ -21,6 +22,17 @@ CONSTITUTION_PATH = BASE_DIR / "constitution.txt"
 CORE_MEMORY_PATH = BASE_DIR / "core_memory.json"
 MEM_LOG_PATH = BASE_DIR / "memlog.txt" # For reflecting on recent memory
 
+
+RAG_SECONDS = metrics.histogram("francine_rag_seconds", "Retrieval latency by operation.", ("op",))
+RAG_RETRIEVALS = metrics.counter("francine_rag_retrievals_total", "Context retrievals by result (hit, empty, unavailable).", ("result",))
+RAG_INDEX_LOADS = metrics.counter("francine_rag_index_loads_total", "FAISS index (re)loads from disk.")
+
+
+def _faiss():
+    """Imports faiss on first use; it is slow to load and only needed once an index exists."""
+    import faiss
+    return faiss
+
 async def build_rag_index(docs_path: str = "documents_to_index"): # FIX: docs_path is now relative to BASE_DIR
     """
     Builds a FAISS index from text documents, constitution, and core memory insights
@@ -111,6 +123,7 @@ async def build_rag_index(docs_path: str = "documents_to_index"): # FIX: docs_pa
     embeddings_np = np.array(embeddings, dtype=np.float32)
     d = embeddings_np.shape[1]
 
+    faiss = _faiss()
     index = faiss.IndexFlatL2(d)
     index.add(embeddings_np)
 
@@ -124,39 +137,74 @@ async def build_rag_index(docs_path: str = "documents_to_index"): # FIX: docs_pa
     print(f"Document map saved to {DOC_MAP_PATH}")
     print(f"Indexed {len(embeddings)} text chunks.")
 
+# Loaded index + doc map, reused across turns until the files on disk change
+_index_cache: dict = {"mtimes": None, "index": None, "doc_map": None}
+
+
+def _load_index():
+    """Returns (index, doc_map), reading them from disk only when the files have changed."""
+    mtimes = (INDEX_PATH.stat().st_mtime_ns, DOC_MAP_PATH.stat().st_mtime_ns)
+    if _index_cache["mtimes"] != mtimes:
+        RAG_INDEX_LOADS.inc()
+        index = _faiss().read_index(str(INDEX_PATH))
+        with open(DOC_MAP_PATH, 'r', encoding='utf-8') as f:
+            doc_map = json.load(f)
+        _index_cache.update(mtimes=mtimes, index=index, doc_map=doc_map)
+    return _index_cache["index"], _index_cache["doc_map"]
+
+
+async def _load_index_traced():
+    with tracing.span("rag.load_index"), RAG_SECONDS.time(op="load_index"):
+        return await asyncio.to_thread(_load_index)
+
+
+async def rag_query(question: str, k: int = 3) -> List[Tuple[str, float]]:
+    """
+    Queries the FAISS index for the documents most relevant to 'question'.
+    Returns a list of (text, score) tuples, best match first (lower L2 distance is better).
+    """
+    if not INDEX_PATH.exists() or not DOC_MAP_PATH.exists():
+        print("RAG index or document map not found. Cannot run RAG query.")
+        return []
+
+    embedding_list, loaded = await asyncio.gather(
+        llm.ollama_embed(question), _load_index_traced(), return_exceptions=True
+    )
+    if isinstance(loaded, BaseException):
+        print(f"Error loading RAG index or document map: {loaded}")
+        return []
+    index, doc_map = loaded
+
+    if isinstance(embedding_list, BaseException) or not embedding_list:
+        print("Failed to get embedding from Ollama for RAG query.")
+        return []
+
+    embedding = np.array([embedding_list], dtype=np.float32)
+
+    with tracing.span("rag.search"), RAG_SECONDS.time(op="search"):
+        D, I = index.search(embedding, int(k))
+    # doc_map keys are strings from the JSON dump
+    return [(doc_map[str(idx)], float(score)) for idx, score in zip(I[0], D[0]) if str(idx) in doc_map]
+
+
 async def get_relevant_context(query: str, k: int = 3) -> str:
     """
     Queries the FAISS index for relevant contextual information (documents, constitution, core memory).
     Returns a concatenated string of relevant text chunks.
+    The query embedding and the (cached) index load run concurrently.
     """
     if not INDEX_PATH.exists() or not DOC_MAP_PATH.exists():
         print("RAG index or document map not found. Cannot retrieve context.")
+        RAG_RETRIEVALS.inc(result="unavailable")
         return ""
+    with RAG_SECONDS.time(op="retrieve"):
+        context = await _retrieve(query, k)
+    RAG_RETRIEVALS.inc(result="hit" if context else "empty")
+    return context
 
-    try:
-        index = faiss.read_index(str(INDEX_PATH))
-        with open(DOC_MAP_PATH, 'r', encoding='utf-8') as f:
-            doc_map = json.load(f)
-    except Exception as e:
-        print(f"Error loading RAG index or document map: {e}")
-        return ""
-
-    embedding_list = await llm.ollama_embed(query)
-    if not embedding_list:
-        print("Failed to get embedding from Ollama for context query.")
-        return ""
 
-    embedding = np.array([embedding_list], dtype=np.float32)
-
-    D, I = index.search(embedding, k)
-    
-    relevant_chunks = []
-    for idx, score in zip(I[0], D[0]):
-        if idx in doc_map:
-            # Only add if score is above a certain threshold (optional, for relevance)
-            # For now, we'll just add the top K
-            relevant_chunks.append(doc_map[str(idx)]) # doc_map keys are strings from JSON dump
-            
+async def _retrieve(query: str, k: int) -> str:
+    relevant_chunks = [text for text, _ in await rag_query(query, k)]
     if relevant_chunks:
         print(f"Retrieved {len(relevant_chunks)} relevant context chunks.")
         return "\n\n--- Retrieved Context ---\n" + "\n\n".join(relevant_chunks) + "\n--- End Retrieved Context ---"
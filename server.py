@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+import config
+import conversation
+import llm
+import memory
+import metrics
+import tools
+
+# Turns processed at the same time. Defaults to Ollama's own parallelism setting,
+# since the LLM backend is what ultimately bounds throughput.
+DEFAULT_WORKERS = int(os.getenv("OLLAMA_NUM_PARALLEL", "2"))
+# Requests allowed to wait for a worker; beyond this new requests get 429 (backpressure)
+DEFAULT_MAX_QUEUE = 16
+# Sessions idle for longer than this are dropped, and at most MAX_SESSIONS are kept
+SESSION_IDLE_TTL = 30 * 60.0 # seconds
+MAX_SESSIONS = 256
+
+SERVER_REQUESTS = metrics.counter("francine_server_requests_total", "Chat requests by outcome (completed, failed, rejected).", ("outcome",))
+SERVER_LOAD = metrics.gauge("francine_server_load", "Current server load (active turns, queued turns, sessions).", ("kind",))
+
+
+class ChatRequest(BaseModel):
+    prompt: str
+    session_id: str | None = None
+
+
+class AdmissionController:
+    """Bounds concurrent turns and the waiting queue; rejects instead of queueing without limit."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._slots = asyncio.Semaphore(self.workers)
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def try_admit(self) -> bool:
+        """Reserves a queue place; False means the server is saturated."""
+        if self.active + self.waiting >= self.workers + self.max_queue:
+            self.rejected += 1
+            SERVER_REQUESTS.inc(outcome="rejected")
+            return False
+        self.waiting += 1
+        return True
+
+    @asynccontextmanager
+    async def slot(self):
+        """Waits for a worker slot (the caller must have been admitted)."""
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+
+class SessionStore:
+    """Per-session conversation context, so concurrent clients never see each other's history."""
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_sessions: int = MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, session_id: str) -> Dict[str, Any]:
+        self._evict()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = {"context": conversation.ConversationContext(), "lock": asyncio.Lock(), "last_used": time.monotonic()}
+            self._sessions[session_id] = session
+        session["last_used"] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        for sid in [sid for sid, s in self._sessions.items() if s["last_used"] < cutoff and not s["lock"].locked()]:
+            del self._sessions[sid]
+        while len(self._sessions) >= self.max_sessions:
+            oldest = next(iter(self._sessions))
+            if self._sessions[oldest]["lock"].locked():
+                break
+            del self._sessions[oldest]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+ADMISSION = AdmissionController()
+SESSIONS = SessionStore()
+_handler: Callable[..., Awaitable[str]] | None = None
+_started_at = time.time()
+
+
+def configure(handler: Callable[..., Awaitable[str]], workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE) -> None:
+    """Sets the turn handler (main.handle_prompt) and admission limits before the app starts."""
+    global ADMISSION, _handler
+    _handler = handler
+    ADMISSION = AdmissionController(workers, max_queue)
+
+
+async def _run_turn(prompt: str, session_id: str, events: "asyncio.Queue[Dict[str, Any] | None]", state: Dict[str, bool]) -> None:
+    """Runs one turn for a session, pushing stage/answer events onto 'events' (None ends the stream)."""
+    state["started"] = True
+    session = SESSIONS.get(session_id)
+    reached_slot = False # slot() releases the queue place itself once entered
+    try:
+        # Turns of the same session run in order; different sessions run concurrently.
+        # The session lock comes first, so a session's queued turns don't hold worker slots.
+        async with session["lock"]:
+            reached_slot = True
+            async with ADMISSION.slot():
+                await events.put({"event": "started", "session_id": session_id})
+                started = time.perf_counter()
+
+                def on_stage(name: str, start: float, end: float) -> None:
+                    events.put_nowait({"event": "stage", "name": name, "start_ms": round(start * 1000, 1), "duration_ms": round((end - start) * 1000, 1)})
+
+                answer = await _handler(prompt, context=session["context"], interactive=False, speak=False, on_stage=on_stage)
+                ADMISSION.completed += 1
+                SERVER_REQUESTS.inc(outcome="completed")
+                await events.put({"event": "answer", "text": answer, "session_id": session_id, "latency_ms": round((time.perf_counter() - started) * 1000, 1)})
+    except Exception as e:
+        ADMISSION.failed += 1
+        SERVER_REQUESTS.inc(outcome="failed")
+        await events.put({"event": "error", "detail": str(e)})
+    finally:
+        if not reached_slot: # Cancelled while waiting for an earlier turn of the session
+            ADMISSION.waiting -= 1
+        await events.put(None)
+
+
+def _start_turn(prompt: str, session_id: str) -> Tuple[asyncio.Task, "asyncio.Queue[Dict[str, Any] | None]", Dict[str, bool]]:
+    events: "asyncio.Queue[Dict[str, Any] | None]" = asyncio.Queue()
+    state = {"started": False}
+    task = asyncio.create_task(_run_turn(prompt, session_id, events, state))
+    return task, events, state
+
+
+def _cancel_turn(task: asyncio.Task, state: Dict[str, bool]) -> None:
+    """Cancels a turn whose client went away, releasing its queue place."""
+    if task.done():
+        return
+    task.cancel()
+    if not state["started"]:
+        # The coroutine never ran, so its own cleanup won't release the admitted place
+        ADMISSION.waiting -= 1
+
+
+def _admit_or_reject() -> None:
+    if not ADMISSION.try_admit():
+        raise HTTPException(status_code=429, detail="Francine is busy; try again shortly.", headers={"Retry-After": "2"})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    config.start_watching()
+    yield
+    config.stop_watching()
+    # Shutdown: release pooled connections (HTTP and browser) and flush queued writes
+    web_scrape, browser = sys.modules.get("web_scrape"), sys.modules.get("browser") # Loaded by the first scrape, if any
+    if web_scrape is not None:
+        await web_scrape.close_client()
+    if browser is not None:
+        await browser.cleanup_browser()
+    await llm.close_client()
+    tools.REGISTRY.shutdown()
+    memory.flush_writes(timeout=10.0)
+
+
+app = FastAPI(title="Francine", lifespan=lifespan)
+
+
+@app.post("/v1/chat")
+async def chat(request: ChatRequest):
+    """Runs a turn and streams NDJSON events: queued, started, stage..., answer (or error)."""
+    if not request.prompt.strip():
+        raise HTTPException(status_code=400, detail="prompt must not be empty")
+    _admit_or_reject()
+    session_id = request.session_id or uuid.uuid4().hex
+    queued = {"event": "queued", "session_id": session_id, "queue_depth": ADMISSION.waiting}
+    task, events, state = _start_turn(request.prompt, session_id)
+
+    async def stream() -> AsyncIterator[bytes]:
+        try:
+            yield (json.dumps(queued) + "\n").encode("utf-8")
+            while (event := await events.get()) is not None:
+                yield (json.dumps(event) + "\n").encode("utf-8")
+        finally:
+            _cancel_turn(task, state) # No-op if finished; otherwise the client went away
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.websocket("/v1/ws")
+async def chat_ws(websocket: WebSocket):
+    """
+    WebSocket chat: send {"prompt": "..."} messages, receive the same events as /v1/chat.
+    One session per connection (or pass ?session_id=... to resume one).
+    """
+    await websocket.accept()
+    session_id = websocket.query_params.get("session_id") or uuid.uuid4().hex
+    try:
+        while True:
+            message = await websocket.receive_json()
+            prompt = str(message.get("prompt", "")).strip() if isinstance(message, dict) else ""
+            if not prompt:
+                await websocket.send_json({"event": "error", "detail": "prompt must not be empty"})
+                continue
+            if not ADMISSION.try_admit():
+                await websocket.send_json({"event": "rejected", "detail": "Francine is busy; try again shortly.", "retry_after": 2})
+                continue
+            queued = {"event": "queued", "session_id": session_id, "queue_depth": ADMISSION.waiting}
+            task, events, state = _start_turn(prompt, session_id)
+            try:
+                await websocket.send_json(queued)
+                while (event := await events.get()) is not None:
+                    await websocket.send_json(event)
+            finally:
+                _cancel_turn(task, state)
+    except WebSocketDisconnect:
+        pass
+
+
+def _server_stats() -> Dict[str, Any]:
+    return {
+        "uptime_s": round(time.time() - _started_at, 1),
+        "workers": ADMISSION.workers,
+        "max_queue": ADMISSION.max_queue,
+        "active": ADMISSION.active,
+        "queued": ADMISSION.waiting,
+        "completed": ADMISSION.completed,
+        "failed": ADMISSION.failed,
+        "rejected": ADMISSION.rejected,
+        "sessions": len(SESSIONS),
+    }
+
+
+@app.get("/health")
+async def health():
+    """Liveness plus current load; 'saturated' is true when new requests would be rejected."""
+    stats = _server_stats()
+    stats["status"] = "ok"
+    stats["saturated"] = stats["active"] + stats["queued"] >= stats["workers"] + stats["max_queue"]
+    return JSONResponse(stats)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """All Francine metrics (LLM, RAG, tools, cache, server) in Prometheus text format."""
+    SERVER_LOAD.set(ADMISSION.active, kind="active")
+    SERVER_LOAD.set(ADMISSION.waiting, kind="queued")
+    SERVER_LOAD.set(len(SESSIONS), kind="sessions")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
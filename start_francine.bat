@@ -18,8 +18,9 @@ if exist "venv\Scripts\activate.bat" (
 REM Start Francine.
 REM The 'python' command will now use the Python interpreter from the activated virtual environment.
 REM 'main.py' will then check config.json for 'speech' mode.
+REM Any arguments (e.g. --trace, or a command like 'chat') are passed through.
 echo Starting Francine AI assistant...
-python main.py
+python main.py %*
 
 REM Keep the console window open after Francine exits or if an error occurs,
 REM so you can see any messages. Remove if you want the window to close automatically.
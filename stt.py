@@ -0,0 +1,200 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import config
+
+SAMPLE_RATE = 16000 # Whisper models expect 16 kHz mono float32 in [-1, 1]
+MIN_DECODE_SAMPLES = SAMPLE_RATE // 10 # Shorter tails (after the last committed word) aren't worth a decode
+
+
+def pcm16_to_float32(pcm) -> np.ndarray:
+    """Converts int16 PCM (bytes or array) to the float32 buffer the backends take; no temp files."""
+    samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else np.asarray(pcm, dtype=np.int16)
+    return samples.astype(np.float32) / 32768.0
+
+
+@dataclass
+class Word:
+    """A decoded word with its time span in seconds from the start of the decoded audio."""
+    text: str # As decoded, including Whisper's leading space
+    start: float
+    end: float
+
+
+class STTBackend(ABC):
+    """Speech-to-text over an in-memory 16 kHz mono float32 buffer."""
+    name = ""
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray) -> str:
+        ...
+
+    @abstractmethod
+    def transcribe_words(self, audio: np.ndarray, prompt: str = "") -> List[Word]:
+        """Word-level decode for streaming; 'prompt' is the already committed text, for continuity."""
+
+
+class OpenAIWhisperBackend(STTBackend):
+    """The reference openai-whisper implementation (PyTorch)."""
+    name = "openai-whisper"
+
+    def __init__(self, model_size: str = "base", language: str = ""):
+        import whisper
+        self.model = whisper.load_model(model_size)
+        self.language = language or None
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        # fp16 is GPU-only; asking for it on CPU just prints a warning per call
+        result = self.model.transcribe(audio, fp16=False, language=self.language)
+        return result.get('text', '').strip()
+
+    def transcribe_words(self, audio: np.ndarray, prompt: str = "") -> List[Word]:
+        result = self.model.transcribe(
+            audio, fp16=False, language=self.language, word_timestamps=True,
+            initial_prompt=prompt or None, condition_on_previous_text=False,
+        )
+        return [Word(w['word'], w['start'], w['end']) for segment in result.get('segments', []) for w in segment.get('words', [])]
+
+
+class FasterWhisperBackend(STTBackend):
+    """faster-whisper (CTranslate2): int8 quantized inference, several times faster than openai-whisper on CPU."""
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = "base", compute_type: str = "int8", cpu_threads: int = 0, language: str = ""):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+        self.language = language or None
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        # Greedy decoding (beam_size=1) for latency; segments is a generator, so decoding happens here
+        segments, _ = self.model.transcribe(audio, beam_size=1, language=self.language, condition_on_previous_text=False)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def transcribe_words(self, audio: np.ndarray, prompt: str = "") -> List[Word]:
+        segments, _ = self.model.transcribe(
+            audio, beam_size=1, language=self.language, word_timestamps=True,
+            initial_prompt=prompt or None, condition_on_previous_text=False,
+        )
+        return [Word(w.word, w.start, w.end) for segment in segments for w in (segment.words or [])]
+
+
+def create_backend(settings: config.Settings, model_size: str | None = None) -> STTBackend:
+    """
+    Builds the configured backend (with 'model_size' instead of stt_model if given), falling
+    back to openai-whisper if faster-whisper isn't installed.
+    """
+    model_size = model_size or settings.stt_model
+    if settings.stt_backend == "faster-whisper":
+        try:
+            return FasterWhisperBackend(model_size, settings.stt_compute_type, settings.stt_threads, settings.stt_language)
+        except ImportError:
+            print("Warning: faster-whisper is not installed. Falling back to openai-whisper.")
+    return OpenAIWhisperBackend(model_size, settings.stt_language)
+
+
+_lock = threading.Lock()
+_backends: Dict[Tuple, STTBackend] = {} # By _settings_key; the main model and the wake-word model
+
+
+def _settings_key(settings: config.Settings, model_size: str) -> Tuple:
+    return (settings.stt_backend, model_size, settings.stt_compute_type, settings.stt_threads, settings.stt_language)
+
+
+def get_backend(model_size: str | None = None) -> STTBackend:
+    """
+    The loaded backend for the current settings (and 'model_size', default stt_model),
+    created on first use and rebuilt when the STT settings in config.json change. Raises
+    if no backend can be loaded.
+    """
+    settings = config.get()
+    model_size = model_size or settings.stt_model
+    key = _settings_key(settings, model_size)
+    backend = _backends.get(key)
+    if backend is not None:
+        return backend
+    with _lock:
+        if key not in _backends:
+            current = {_settings_key(settings, settings.stt_model), _settings_key(settings, settings.wake_model)}
+            for stale in set(_backends) - current: # Models for settings that have since changed
+                del _backends[stale]
+            _backends[key] = create_backend(settings, model_size)
+            print(f"Francine: Speech-to-text ready ({_backends[key].name}, model '{model_size}').")
+        return _backends[key]
+
+
+def transcribe(audio: np.ndarray) -> str:
+    """Transcribes a float32 buffer with the configured backend."""
+    return get_backend().transcribe(audio)
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def join_words(words: List[Word]) -> str:
+    return "".join(w.text for w in words).strip()
+
+
+class StreamingTranscript:
+    """
+    Incremental transcription of one growing utterance (LocalAgreement-2): every update()
+    decodes only the audio after the committed words, and words that two consecutive
+    hypotheses agree on are committed. finish() then decodes just the uncommitted tail,
+    so the final text costs about one chunk of decoding instead of the whole utterance.
+    """
+
+    def __init__(self, backend: STTBackend):
+        self.backend = backend
+        self.committed: List[Word] = []
+        self.offset = 0.0 # Seconds of audio covered by the committed words
+        self.decoded_samples = 0 # Utterance length at the last update
+        self.decode_seconds = 0.0 # Time spent in update() decodes so far (for real-time factor)
+        self._pending: List[Word] = [] # Previous hypothesis after the committed words
+
+    @property
+    def stable_text(self) -> str:
+        return join_words(self.committed)
+
+    @property
+    def text(self) -> str:
+        """Committed words followed by the latest uncommitted hypothesis."""
+        return join_words(self.committed + self._pending)
+
+    def _decode(self, audio: np.ndarray) -> List[Word]:
+        tail = audio[int(self.offset * SAMPLE_RATE):]
+        if len(tail) < MIN_DECODE_SAMPLES:
+            return []
+        words = self.backend.transcribe_words(tail, prompt=self.stable_text)
+        return [Word(w.text, w.start + self.offset, w.end + self.offset) for w in words]
+
+    def update(self, audio: np.ndarray) -> str:
+        """Decodes the utterance so far (float32, from its first sample). Returns the stable text."""
+        t0 = time.perf_counter()
+        hypothesis = self._decode(audio)
+        self.decode_seconds += time.perf_counter() - t0
+        self.decoded_samples = len(audio)
+        agreed = 0
+        while (agreed < len(hypothesis) and agreed < len(self._pending)
+               and _normalize(hypothesis[agreed].text) == _normalize(self._pending[agreed].text)):
+            agreed += 1
+        if agreed:
+            self.committed += hypothesis[:agreed]
+            # Cut between the last committed word and the next one, so neither is clipped
+            cut = hypothesis[agreed - 1].end
+            if agreed < len(hypothesis) and hypothesis[agreed].start > cut:
+                cut = (cut + hypothesis[agreed].start) / 2
+            self.offset = cut
+        self._pending = hypothesis[agreed:]
+        return self.stable_text
+
+    def finish(self, audio: np.ndarray) -> str:
+        """Final text for the complete utterance: committed words plus a decode of the tail."""
+        if not self.committed:
+            return self.backend.transcribe(audio) # Nothing gained by word timestamps
+        return join_words(self.committed + self._decode(audio))
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple
+
+# FIX: Dynamically determine BASE_DIR based on the new BASE_DIR from memory.py
+# Assuming memory.py is imported and its BASE_DIR is the source of truth
+import memory
+import metrics
+CACHE_DIR = memory.BASE_DIR / "cache"
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_PATH = CACHE_DIR / "tool_cache.sqlite3"
+
+# Total size of cached results kept on disk; least recently used entries are evicted beyond this
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# Results larger than this are never cached
+MAX_ENTRY_BYTES = 4 * 1024 * 1024
+
+# Set by --no-cache (or FRANCINE_NO_CACHE=1) to skip cache reads and writes entirely
+BYPASS = os.getenv("FRANCINE_NO_CACHE", "").lower() in ("1", "true", "yes")
+
+MISS = object() # Sentinel returned by ToolResultCache.get when there is no usable entry
+
+CACHE_LOOKUPS = metrics.counter("francine_tool_cache_lookups_total", "Tool-result cache lookups by result (hit, miss).", ("tool", "result"))
+
+
+def make_key(tool: str, args: Dict[str, Any], file_args: Iterable[str] = ()) -> str:
+    """
+    Canonical cache key for a call: tool name + args serialized with sorted keys.
+    For arguments naming files (e.g. pdf_read's 'path'), the file's size and mtime
+    are folded in so an edited file is not served from cache.
+    """
+    canonical = {"tool": tool, "args": args}
+    stamps = {}
+    for name in file_args:
+        value = args.get(name)
+        if isinstance(value, str):
+            try:
+                st = Path(value).stat()
+                stamps[name] = [st.st_size, st.st_mtime_ns]
+            except OSError:
+                stamps[name] = None
+    if stamps:
+        canonical["files"] = stamps
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """
+    Size-bounded on-disk (SQLite) cache of tool results with a per-entry TTL and LRU eviction.
+    Results are stored as JSON, so only JSON-serializable results are cached.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.session_hits: Dict[str, int] = {}
+        self.session_misses: Dict[str, int] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, tool TEXT NOT NULL, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, expires REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (tool TEXT PRIMARY KEY, hits INTEGER NOT NULL, misses INTEGER NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, tool: str) -> Any:
+        """Returns the cached result, or MISS if absent or expired."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            hit = row is not None and row[1] > now
+            if hit:
+                db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            elif row is not None:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            db.execute(
+                "INSERT INTO stats (tool, hits, misses) VALUES (?, ?, ?) "
+                "ON CONFLICT(tool) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+                (tool, int(hit), int(not hit)),
+            )
+            db.commit()
+        counter = self.session_hits if hit else self.session_misses
+        counter[tool] = counter.get(tool, 0) + 1
+        CACHE_LOOKUPS.inc(tool=tool, result="hit" if hit else "miss")
+        return json.loads(row[0]) if hit else MISS
+
+    def put(self, key: str, tool: str, value: Any, ttl: float) -> bool:
+        """Stores 'value' for 'ttl' seconds. Returns False if it can't be cached."""
+        try:
+            blob = json.dumps(value)
+        except (TypeError, ValueError):
+            return False
+        size = len(blob.encode("utf-8"))
+        if size > MAX_ENTRY_BYTES:
+            return False
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, tool, value, size, expires, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool, blob, size, now + ttl, now),
+            )
+            self._evict(db, now)
+            db.commit()
+        return True
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM entries")
+            db.execute("DELETE FROM stats")
+            db.commit()
+
+    def stats(self) -> Tuple[Dict[str, Any], Dict[str, Dict[str, int]]]:
+        """Returns (totals, per-tool {'hits', 'misses', 'entries'}) across all sessions."""
+        with self._lock:
+            db = self._db()
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            per_tool: Dict[str, Dict[str, int]] = {
+                tool: {"hits": hits, "misses": misses, "entries": 0}
+                for tool, hits, misses in db.execute("SELECT tool, hits, misses FROM stats")
+            }
+            for tool, count in db.execute("SELECT tool, COUNT(*) FROM entries GROUP BY tool"):
+                per_tool.setdefault(tool, {"hits": 0, "misses": 0, "entries": 0})["entries"] = count
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}, per_tool
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+CACHE = ToolResultCache()
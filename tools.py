@@ -0,0 +1,624 @@
+import asyncio
+import functools
+import importlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import metrics
+import tracing
+import tool_cache
+
+# Where a sync tool runs: "inline" on the event loop (only for trivial, non-blocking work),
+# "io" in the bounded thread pool, "cpu" in the process pool (keeps the GIL free for the loop).
+TOOL_KINDS = ("inline", "io", "cpu")
+
+MAX_IO_WORKERS = 8
+MAX_CPU_WORKERS = 2
+
+# Multi-tool plans: cap on calls per plan and on calls running at the same time
+MAX_PLAN_CALLS = 8
+MAX_PLAN_CONCURRENCY = 4
+
+TOOL_SECONDS = metrics.histogram("francine_tool_seconds", "Tool execution time (cache hits excluded).", ("tool",))
+TOOL_CALLS = metrics.counter("francine_tool_calls_total", "Tool calls by outcome (ok, error, timeout, cached).", ("tool", "outcome"))
+
+
+_resolved: Dict[str, Callable[..., Any]] = {}
+
+
+def resolve_target(target: str) -> Callable[..., Any]:
+    """
+    Imports and returns the function named by a "module:function" target.
+    Tool modules (and their heavy dependencies) are only loaded when a tool is first used.
+    """
+    func = _resolved.get(target)
+    if func is None:
+        module_name, _, func_name = target.partition(":")
+        if not module_name or not func_name:
+            raise ValueError(f"Tool target '{target}' must look like 'module:function'.")
+        func = getattr(importlib.import_module(module_name), func_name)
+        _resolved[target] = func
+    return func
+
+
+# --- Result formatters: turn a tool's raw result into what Francine says/logs ---
+def _format_default(name: str, args: Dict, result: Any) -> str:
+    return f"Function {name} executed. Result: {result}"
+
+
+def _format_message(name: str, args: Dict, result: Any) -> str:
+    return str(result) # Already a string message
+
+
+def _format_saved_results(name: str, args: Dict, result: Any) -> str:
+    if result:
+        import osint
+        dump_path = osint._dump_result(name, result)
+        return f"Operation completed. Results saved to: {dump_path}"
+    return f"Operation completed, but no results were returned by {name}."
+
+
+def _format_scrape(name: str, args: Dict, result: Any) -> str:
+    url = args.get('url', 'unknown_url')
+    if result:
+        import osint
+        clean_url_prefix = url.replace('https://', '').replace('http://', '').split('/')[0].replace('.', '_').replace(':', '_')
+        dump_path = osint._save_result_to_file(f"web_scrape_{clean_url_prefix}", result, extension=".txt")
+        return f"Web scrape completed. Text content saved to: {dump_path}. Snippet: {result[:200]}..."
+    return f"Web scrape completed for {url}, but no content was returned."
+
+
+def _format_crawl(name: str, args: Dict, result: Any) -> str:
+    if not isinstance(result, dict) or isinstance(result.get("error"), str): # Otherwise 'error' is a page count
+        return f"Crawl failed: {result.get('error') if isinstance(result, dict) else result}"
+    if result.get("already_complete"):
+        finished = time.strftime("%Y-%m-%d %H:%M", time.localtime(result.get("finished_at", 0)))
+        return f"That crawl already completed at {finished}. Output: {result['output']} (call again with resume=false to crawl afresh)"
+    return (f"Crawl finished: {result['pages']} page(s) ({result['ok']} with text, {result['empty']} empty, "
+            f"{result['error']} failed, {result['skipped']} disallowed) in {result['elapsed_s']}s. Output: {result['output']}")
+
+
+def _format_document(name: str, args: Dict, result: Any) -> str:
+    if name == "pdf_read" and isinstance(result, str):
+        import osint
+        prefix = f"pdf_content_{Path(args.get('path', 'unknown')).stem}"
+        dump_path = osint._save_result_to_file(prefix, result, extension=".txt")
+        return f"PDF content read and saved to: {dump_path}. Snippet: {result[:200]}..."
+    if isinstance(result, str) and (result.endswith(".pdf") or "generated.pdf" in result):
+        return f"Document operation completed. Output file: {result}"
+    return f"Document operation completed, but result was unexpected: {result}"
+
+
+def _format_rag(name: str, args: Dict, result: Any) -> str:
+    if result:
+        return f"RAG query results: {result}"
+    return "RAG query completed, but no relevant documents found."
+
+
+def _format_calculation(name: str, args: Dict, result: Any) -> str:
+    return f"The calculated value is: {result}"
+
+
+def _format_scheduled(name: str, args: Dict, result: Any) -> str:
+    return f"Job scheduled: '{args.get('command')}' to run daily at {args.get('cron_expression')}."
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Declares a tool: its LLM-facing schema and how it must be executed."""
+    name: str
+    func: str # "module:function", imported on first call (see resolve_target)
+    description: str
+    parameters: Dict[str, Any] = field(default_factory=lambda: {"type": "object", "properties": {}, "required": []})
+    is_async: bool = False # Coroutine function; awaited on the event loop
+    kind: str = "io" # For sync tools: "inline", "io" or "cpu" (see TOOL_KINDS)
+    timeout: float | None = 60.0 # Seconds; None for no limit
+    idempotent: bool = False # Same args -> same effect; safe to repeat
+    cacheable: bool = False # Result may be reused for identical args
+    cache_ttl: float = 3600.0 # Seconds a cached result stays valid (cacheable tools only)
+    cache_key_files: tuple = () # Args naming files whose size/mtime must be part of the cache key
+    formatter: Callable[[str, Dict, Any], str] = _format_default
+
+    def __post_init__(self):
+        if self.kind not in TOOL_KINDS:
+            raise ValueError(f"Tool '{self.name}' has unknown kind '{self.kind}'. Expected one of {TOOL_KINDS}.")
+
+    def resolve(self) -> Callable[..., Any]:
+        return resolve_target(self.func)
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "parameters": self.parameters}
+
+
+class ToolRegistry:
+    """Holds the tool specs and routes each call to the event loop, thread pool or process pool."""
+
+    def __init__(self, max_io_workers: int = MAX_IO_WORKERS, max_cpu_workers: int = MAX_CPU_WORKERS):
+        self._tools: Dict[str, ToolSpec] = {}
+        self._max_io_workers = max_io_workers
+        self._max_cpu_workers = max_cpu_workers
+        self._thread_pool: ThreadPoolExecutor | None = None
+        self._process_pool: ProcessPoolExecutor | None = None
+
+    def register(self, spec: ToolSpec) -> ToolSpec:
+        if spec.name in self._tools:
+            raise ValueError(f"Tool '{spec.name}' is already registered.")
+        self._tools[spec.name] = spec
+        return spec
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def get(self, name: str) -> ToolSpec:
+        return self._tools[name]
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def schema(self) -> List[Dict[str, Any]]:
+        return [spec.schema for spec in self._tools.values()]
+
+    def function_map(self) -> Dict[str, Callable[..., Any]]:
+        """Resolved functions by tool name. Imports every tool module; avoid on startup paths."""
+        return {name: spec.resolve() for name, spec in self._tools.items()}
+
+    async def run(self, name: str, args: Dict[str, Any], use_cache: bool = True) -> Any:
+        """
+        Executes tool 'name' with 'args' where its spec says it belongs, enforcing its timeout.
+        Cacheable tools are served from the persistent result cache when possible
+        (skipped when 'use_cache' is False or the cache is bypassed with --no-cache).
+        """
+        spec = self._tools[name]
+        cache_key = None
+        if spec.cacheable and use_cache and not tool_cache.BYPASS:
+            cache_key = tool_cache.make_key(name, args, spec.cache_key_files)
+            with tracing.span(f"cache.{name}"):
+                cached = await asyncio.to_thread(tool_cache.CACHE.get, cache_key, name)
+            if cached is not tool_cache.MISS:
+                print(f"Francine: Using cached result for '{name}'.")
+                TOOL_CALLS.inc(tool=name, outcome="cached")
+                return cached
+
+        outcome = "error"
+        with tracing.span(f"tool.{name}"), TOOL_SECONDS.time(tool=name):
+            try:
+                call = self._invoke(spec, args)
+                if spec.timeout is None:
+                    result = await call
+                else:
+                    try:
+                        result = await asyncio.wait_for(call, spec.timeout)
+                    except asyncio.TimeoutError:
+                        outcome = "timeout"
+                        raise TimeoutError(f"Tool '{name}' timed out after {spec.timeout:g}s.") from None
+                outcome = "ok"
+            finally:
+                TOOL_CALLS.inc(tool=name, outcome=outcome)
+
+        # Empty results are usually transient failures (tools swallow their own errors), and some
+        # tools report a failed lookup under an "error" key; don't pin either
+        if cache_key is not None and result and not (isinstance(result, dict) and result.get("error")):
+            await asyncio.to_thread(tool_cache.CACHE.put, cache_key, name, result, spec.cache_ttl)
+        return result
+
+    def format_result(self, name: str, args: Dict[str, Any], result: Any) -> str:
+        return self._tools[name].formatter(name, args, result)
+
+    async def _invoke(self, spec: ToolSpec, args: Dict[str, Any]) -> Any:
+        func = _resolved.get(spec.func)
+        if func is None: # First use: import the tool's module off the event loop
+            func = await asyncio.to_thread(resolve_target, spec.func)
+        if spec.is_async:
+            return await func(**args)
+        if spec.kind == "inline":
+            return func(**args)
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, **args)
+        if spec.kind == "cpu":
+            try:
+                return await loop.run_in_executor(self._get_process_pool(), call)
+            except BrokenProcessPool as e:
+                print(f"Warning: Process pool failed for '{spec.name}' ({e}). Running it in a thread instead.")
+                self._process_pool = None
+        return await loop.run_in_executor(self._get_thread_pool(), call)
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self._max_io_workers, thread_name_prefix="francine-tool")
+        return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self._max_cpu_workers)
+        return self._process_pool
+
+    async def execute_plan(self, calls: List[Dict[str, Any]], max_concurrency: int = MAX_PLAN_CONCURRENCY) -> List[Dict[str, Any]]:
+        """
+        Runs a plan of tool calls, each {"id", "function", "args", "depends_on": [ids]}.
+        Independent calls run concurrently (at most 'max_concurrency' at once); a call
+        starts once all of its dependencies have finished. A string argument may contain
+        "{{<id>}}" to insert a dependency's raw result. Returns one record per call, in
+        plan order: {"id", "function", "args", "ok", "result" + "raw" | "error"}.
+        """
+        steps = _normalize_plan(calls)
+        by_id = {step["id"]: step for step in steps}
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        done = {step["id"]: asyncio.Event() for step in steps}
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        problem = _plan_problem(steps, self)
+        if problem:
+            return [dict(step, ok=False, error=problem) for step in steps]
+
+        async def run_step(step: Dict[str, Any]) -> None:
+            try:
+                for dep in step["depends_on"]:
+                    await done[dep].wait()
+                failed = [dep for dep in step["depends_on"] if not outcomes[dep]["ok"]]
+                if failed:
+                    outcomes[step["id"]] = dict(step, ok=False, error=f"Skipped: dependency {', '.join(failed)} failed.")
+                    return
+                args = _substitute_results(step["args"], {dep: _result_text(outcomes[dep]["raw"]) for dep in step["depends_on"]})
+                async with semaphore:
+                    try:
+                        raw = await self.run(step["function"], args)
+                        outcomes[step["id"]] = dict(step, args=args, ok=True, raw=raw, result=self.format_result(step["function"], args, raw))
+                    except Exception as e:
+                        outcomes[step["id"]] = dict(step, args=args, ok=False, error=str(e))
+            finally:
+                done[step["id"]].set()
+
+        await asyncio.gather(*(run_step(step) for step in by_id.values()))
+        return [outcomes[step["id"]] for step in steps]
+
+    def shutdown(self) -> None:
+        """Stops the worker pools. Call on application exit."""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        tool_cache.CACHE.close()
+
+
+def _normalize_plan(calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    steps = []
+    for i, call in enumerate(calls[:MAX_PLAN_CALLS]):
+        if not isinstance(call, dict):
+            call = {}
+        depends_on = call.get("depends_on") or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        steps.append({
+            "id": str(call.get("id") or f"step{i + 1}"),
+            "function": call.get("function", ""),
+            "args": call.get("args") if isinstance(call.get("args"), dict) else {},
+            "depends_on": [str(d) for d in depends_on],
+        })
+    return steps
+
+
+def _plan_problem(steps: List[Dict[str, Any]], registry: "ToolRegistry") -> str:
+    """Returns a description of what makes the plan unrunnable, or '' if it is valid."""
+    ids = [step["id"] for step in steps]
+    if len(set(ids)) != len(ids):
+        return "Plan has duplicate step ids."
+    for step in steps:
+        if step["function"] not in registry:
+            return f"Plan step '{step['id']}' uses unknown function '{step['function']}'."
+        missing = [d for d in step["depends_on"] if d not in ids]
+        if missing:
+            return f"Plan step '{step['id']}' depends on unknown step(s): {', '.join(missing)}."
+    # Cycle check (Kahn's algorithm)
+    remaining = {step["id"]: set(step["depends_on"]) for step in steps}
+    while remaining:
+        ready = [sid for sid, deps in remaining.items() if not deps]
+        if not ready:
+            return f"Plan has circular dependencies between: {', '.join(remaining)}."
+        for sid in ready:
+            del remaining[sid]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return ""
+
+
+def _result_text(raw: Any) -> str:
+    if isinstance(raw, str):
+        return raw
+    try:
+        return json.dumps(raw, default=str)
+    except (TypeError, ValueError):
+        return str(raw)
+
+
+def _substitute_results(args: Dict[str, Any], results: Dict[str, str]) -> Dict[str, Any]:
+    if not results:
+        return args
+    def substitute(value):
+        if isinstance(value, str):
+            for dep_id, text in results.items():
+                value = value.replace("{{" + dep_id + "}}", text)
+            return value
+        if isinstance(value, dict):
+            return {k: substitute(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [substitute(v) for v in value]
+        return value
+    return substitute(args)
+
+
+def format_plan_results(outcomes: List[Dict[str, Any]], max_chars_per_result: int = 1500) -> str:
+    """Renders plan outcomes as a compact block for the follow-up LLM turn."""
+    lines = []
+    for outcome in outcomes:
+        header = f"[{outcome['id']}] {outcome['function']}({json.dumps(outcome['args'], default=str)[:200]})"
+        if outcome["ok"]:
+            text = outcome["result"]
+            if len(text) > max_chars_per_result:
+                text = text[: max_chars_per_result - 3] + "..."
+            lines.append(f"{header} -> {text}")
+        else:
+            lines.append(f"{header} -> FAILED: {outcome['error']}")
+    return "\n".join(lines)
+
+
+REGISTRY = ToolRegistry()
+
+# --- Tool declarations. New tools only need an entry here to get the right concurrency. ---
+REGISTRY.register(ToolSpec(
+    name="recon_username",
+    func="osint:recon_username",
+    description="Performs OSINT on a given username across various platforms.",
+    parameters={"type": "object", "properties": {"u": {"type": "string", "description": "The username to perform OSINT on."}}, "required": ["u"]},
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=86400.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="recon_email",
+    func="osint:recon_email",
+    description="Performs OSINT on a given email address.",
+    parameters={"type": "object", "properties": {"e": {"type": "string", "description": "The email address to perform OSINT on."}}, "required": ["e"]},
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=86400.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="recon_person",
+    func="osint:recon_person",
+    description="Performs OSINT on a person given their name and location.",
+    parameters={"type": "object", "properties": {"name": {"type": "string", "description": "The person's full name."}, "loc": {"type": "string", "description": "The person's location."}}, "required": ["name", "loc"]},
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=86400.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="recon_vehicle",
+    func="osint:recon_vehicle",
+    description="Performs OSINT on a vehicle given its VIN.",
+    parameters={"type": "object", "properties": {"vin": {"type": "string", "description": "The Vehicle Identification Number (VIN)."}}, "required": ["vin"]},
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=86400.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="recon_domain",
+    func="osint:recon_domain",
+    description="Performs OSINT on a domain, including WHOIS and DNS records.",
+    parameters={"type": "object", "properties": {"dom": {"type": "string", "description": "The domain name."}}, "required": ["dom"]},
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=21600.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="recon_ip",
+    func="osint:recon_ip",
+    description="Performs OSINT on an IP address.",
+    parameters={"type": "object", "properties": {"ip": {"type": "string", "description": "The IP address."}}, "required": ["ip"]},
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=86400.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="spiderfoot_scan",
+    func="osint:spiderfoot_scan",
+    description="Initiates a SpiderFoot scan and returns the path to the JSON report. (Placeholder)",
+    parameters={"type": "object", "properties": {"target": {"type": "string", "description": "The target for the SpiderFoot scan (e.g., domain, IP, username)."}}, "required": ["target"]},
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="product_research_ali",
+    func="ecommerce:product_research_ali",
+    description="Searches AliExpress for products based on keywords and returns a list of product details.",
+    parameters={"type": "object", "properties": {"kw": {"type": "string", "description": "Keywords for product search."}}, "required": ["kw"]},
+    timeout=30.0,
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=3600.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="tiktok_trend_scrape",
+    func="ecommerce:tiktok_trend_scrape",
+    description="Scrapes TikTok for trending videos/data related to a given hashtag.",
+    parameters={"type": "object", "properties": {"tag": {"type": "string", "description": "The hashtag to scrape TikTok trends for."}}, "required": ["tag"]},
+    timeout=30.0,
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=3600.0,
+    formatter=_format_saved_results,
+))
+REGISTRY.register(ToolSpec(
+    name="profit_calc",
+    func="ecommerce:profit_calc",
+    description="Calculates potential profit given revenue, cost of goods sold, shipping, and advertising costs.",
+    parameters={"type": "object", "properties": {"revenue": {"type": "number", "description": "Total revenue from sales."}, "cogs": {"type": "number", "description": "Cost of Goods Sold."}, "ship": {"type": "number", "description": "Shipping cost."}, "ads": {"type": "number", "description": "Advertising cost."}}, "required": ["revenue", "cogs", "ship", "ads"]},
+    kind="inline",
+    timeout=None,
+    idempotent=True,
+    formatter=_format_calculation,
+))
+REGISTRY.register(ToolSpec(
+    name="shopify_api_upload",
+    func="ecommerce:shopify_api_upload",
+    description="Uploads product data to Shopify via API and returns the product ID. (Placeholder)",
+    parameters={"type": "object", "properties": {"prod_json": {"type": "object", "description": "JSON object representing product data."}}, "required": ["prod_json"]},
+    kind="inline",
+    timeout=None,
+))
+REGISTRY.register(ToolSpec(
+    name="pdf_read",
+    func="docs:pdf_read",
+    description="Reads text content from a PDF file.",
+    parameters={"type": "object", "properties": {"path": {"type": "string", "description": "The path to the PDF file."}}, "required": ["path"]},
+    kind="cpu",
+    timeout=120.0,
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=604800.0,
+    cache_key_files=("path",),
+    formatter=_format_document,
+))
+REGISTRY.register(ToolSpec(
+    name="pdf_autofill",
+    func="docs:pdf_autofill",
+    description="Autofills specified fields in a PDF form and returns the path to the new PDF.",
+    parameters={"type": "object", "properties": {"path": {"type": "string", "description": "The path to the PDF form file."}, "field_dict": {"type": "object", "description": "A dictionary of form field names and their values."}}, "required": ["path", "field_dict"]},
+    timeout=120.0,
+    formatter=_format_document,
+))
+REGISTRY.register(ToolSpec(
+    name="pdf_generate",
+    func="docs:pdf_generate",
+    description="Generates a PDF from Markdown text and returns the path to the new PDF.",
+    parameters={"type": "object", "properties": {"markdown_text": {"type": "string", "description": "The Markdown formatted text to convert to PDF."}}, "required": ["markdown_text"]},
+    kind="cpu",
+    timeout=120.0,
+    formatter=_format_document,
+))
+REGISTRY.register(ToolSpec(
+    name="rag_query",
+    func="rag:rag_query",
+    description="Queries the FAISS index for relevant documents and returns a list of (text, score) tuples.",
+    parameters={"type": "object", "properties": {"question": {"type": "string", "description": "The question to query the RAG index with."}, "k": {"type": "integer", "description": "The number of top results to retrieve (default 3)."}}, "required": ["question"]},
+    is_async=True,
+    idempotent=True,
+    formatter=_format_rag,
+))
+REGISTRY.register(ToolSpec(
+    name="schedule_job",
+    func="scheduler:schedule_job",
+    description="Schedules a job to run at specified intervals using a cron-like expression. (Non-blocking)",
+    parameters={"type": "object", "properties": {"cron_expression": {"type": "string", "description": "A cron-like expression (e.g., 'HH:MM' for daily)."}, "command": {"type": "string", "description": "The shell command to execute."}}, "required": ["cron_expression", "command"]},
+    kind="inline",
+    timeout=None,
+    formatter=_format_scheduled,
+))
+REGISTRY.register(ToolSpec(
+    name="scrape_text_content",
+    func="web_scrape:scrape_text_content",
+    description="Navigates to a URL and returns its full text content for general web scraping.",
+    parameters={"type": "object", "properties": {"url": {"type": "string", "description": "The URL to scrape."}, "selector": {"type": "string", "description": "CSS selector for the content to scrape (default 'body')."}}, "required": ["url"]},
+    is_async=True,
+    timeout=90.0,
+    idempotent=True,
+    cacheable=True,
+    cache_ttl=3600.0,
+    formatter=_format_scrape,
+))
+REGISTRY.register(ToolSpec(
+    name="crawl_urls",
+    func="crawler:crawl",
+    description="Crawls a list of URLs and/or a seed URL (following links up to max_depth) politely and concurrently, streaming page text to a JSONL file. Re-running the same crawl resumes it.",
+    parameters={"type": "object", "properties": {
+        "urls": {"type": "array", "items": {"type": "string"}, "description": "URLs to fetch."},
+        "seed_url": {"type": "string", "description": "URL to start following links from."},
+        "max_depth": {"type": "integer", "description": "Link depth to follow (default 0 for a URL list, 1 with a seed)."},
+        "same_domain": {"type": "boolean", "description": "Only follow links on the seeds' domains (default true)."},
+        "max_pages": {"type": "integer", "description": "Maximum pages to fetch (default 200)."},
+        "output": {"type": "string", "description": "JSONL file name, relative to raw_hits/crawls (default derived from the seeds)."},
+        "resume": {"type": "boolean", "description": "Continue an interrupted crawl or return a completed one from the last day (default true); false crawls afresh."},
+    }, "required": []},
+    is_async=True,
+    timeout=1800.0, # Interrupted crawls checkpoint and resume on the next call
+    formatter=_format_crawl,
+))
+REGISTRY.register(ToolSpec(
+    name="update_constitution",
+    func="evolution:update_constitution",
+    description="Adds a new rule to Francine's constitution.",
+    parameters={"type": "object", "properties": {"new_rule": {"type": "string", "description": "The new rule to add to the constitution."}}, "required": ["new_rule"]},
+    is_async=True,
+    timeout=30.0,
+    formatter=_format_message,
+))
+REGISTRY.register(ToolSpec(
+    name="list_directory_contents",
+    func="file_manager:list_directory_contents",
+    description="Lists contents of a directory within Francine's managed files.",
+    parameters={"type": "object", "properties": {"path": {"type": "string", "description": "The path to the directory (relative to Francine_Managed_Files)."}}, "required": []},
+    is_async=True,
+    timeout=30.0,
+    idempotent=True,
+    formatter=_format_message,
+))
+REGISTRY.register(ToolSpec(
+    name="read_text_file",
+    func="file_manager:read_text_file",
+    description="Reads text content of a file within Francine's managed files.",
+    parameters={"type": "object", "properties": {"path": {"type": "string", "description": "The path to the file (relative to Francine_Managed_Files)."}}, "required": ["path"]},
+    is_async=True,
+    timeout=30.0,
+    idempotent=True,
+    formatter=_format_message,
+))
+REGISTRY.register(ToolSpec(
+    name="write_text_file",
+    func="file_manager:write_text_file",
+    description="Writes text content to a file within Francine's managed files.",
+    parameters={"type": "object", "properties": {"path": {"type": "string", "description": "The path to the file (relative to Francine_Managed_Files)."}, "content": {"type": "string", "description": "The text content to write."}, "overwrite": {"type": "boolean", "description": "Whether to overwrite if file exists (default false)."}}, "required": ["path", "content"]},
+    is_async=True,
+    timeout=30.0,
+    formatter=_format_message,
+))
+REGISTRY.register(ToolSpec(
+    name="move_file",
+    func="file_manager:move_file",
+    description="Moves a file within Francine's managed files.",
+    parameters={"type": "object", "properties": {"source_path": {"type": "string", "description": "The current path of the file."}, "destination_path": {"type": "string", "description": "The new path for the file."}}, "required": ["source_path", "destination_path"]},
+    is_async=True,
+    timeout=30.0,
+    formatter=_format_message,
+))
+REGISTRY.register(ToolSpec(
+    name="delete_file",
+    func="file_manager:delete_file",
+    description="Deletes a file or empty directory within Francine's managed files.",
+    parameters={"type": "object", "properties": {"path": {"type": "string", "description": "The path to the file or empty directory."}}, "required": ["path"]},
+    is_async=True,
+    timeout=30.0,
+    formatter=_format_message,
+))
+REGISTRY.register(ToolSpec(
+    name="create_directory",
+    func="file_manager:create_directory",
+    description="Creates a new directory within Francine's managed files.",
+    parameters={"type": "object", "properties": {"path": {"type": "string", "description": "The path of the new directory."}}, "required": ["path"]},
+    is_async=True,
+    timeout=30.0,
+    formatter=_format_message,
+))
@@ -0,0 +1,82 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Tuple
+
+# When True, handle_prompt prints a waterfall of its stage spans after every turn (--trace)
+PRINT_WATERFALL = False
+
+_current_trace: contextvars.ContextVar["TurnTrace | None"] = contextvars.ContextVar("francine_trace", default=None)
+
+
+class TurnTrace:
+    """Collects timing spans for the stages of a single turn."""
+
+    def __init__(self, label: str, on_span: Callable[[str, float, float], None] | None = None):
+        self.label = label
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = [] # (name, start offset s, end offset s)
+        self.on_span = on_span # Optional listener, e.g. to stream stage timings to a client
+
+    def add(self, name: str, start: float, end: float) -> None:
+        """Records a span given absolute perf_counter() start/end times."""
+        span = (name, start - self.start, end - self.start)
+        self.spans.append(span)
+        if self.on_span is not None:
+            try:
+                self.on_span(*span)
+            except Exception:
+                pass # A broken listener must never break the turn
+
+    @contextmanager
+    def span(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, t0, time.perf_counter())
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def render_waterfall(self, width: int = 48) -> str:
+        """Renders the spans as a text waterfall, one bar per span on a shared timeline."""
+        total = max([end for _, _, end in self.spans] + [self.elapsed, 1e-6])
+        name_width = max([len(name) for name, _, _ in self.spans] + [5])
+        label = self.label if len(self.label) <= 60 else self.label[:57] + "..."
+        lines = [f"--- Turn trace: {label!r} ({total * 1000:.0f} ms) ---"]
+        for name, start, end in sorted(self.spans, key=lambda s: s[1]):
+            first = int(start / total * width)
+            last = max(first + 1, int(round(end / total * width)))
+            bar = " " * first + "#" * (last - first)
+            lines.append(f"{name:<{name_width}} |{bar:<{width}}| {start * 1000:7.1f} ms +{(end - start) * 1000:7.1f} ms")
+        return "\n".join(lines)
+
+
+def start_turn(label: str, on_span: Callable[[str, float, float], None] | None = None) -> Tuple[TurnTrace, contextvars.Token]:
+    """Creates a trace for a turn and makes it current for the running task (and its children)."""
+    trace = TurnTrace(label, on_span)
+    return trace, _current_trace.set(trace)
+
+
+def end_turn(trace: TurnTrace, token: contextvars.Token) -> None:
+    """Detaches the turn's trace and prints its waterfall when --trace is on."""
+    _current_trace.reset(token)
+    if PRINT_WATERFALL:
+        print(trace.render_waterfall())
+
+
+def current() -> "TurnTrace | None":
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """Times a stage on the current turn's trace; a no-op outside a traced turn."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
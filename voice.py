@@ -1,134 +1,482 @@
-import tempfile
-import sounddevice as sd
-import numpy as np
-import soundfile as sf
-import whisper
-import pyttsx3
 import asyncio
-import json
-from pathlib import Path
+import difflib
+import queue
+import re
+import threading
 import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List
 
-# NEW: Import webrtcvad
-import webrtcvad # Using webrtcvad-wheels
+import config
+import metrics
+import stt
 
-# Load config for voice settings
-CONFIG_PATH = Path("./config.json")
-CONFIG = {}
-if CONFIG_PATH.exists():
-    try:
-        with open(CONFIG_PATH, 'r') as f:
-            CONFIG = json.load(f)
-    except json.JSONDecodeError:
-        print("Warning: config.json is corrupted. Using default voice settings.")
+if TYPE_CHECKING: # Annotations only; capture (numpy, webrtcvad) is imported when voice mode starts
+    import capture
+    import numpy as np
 
-# Voice configuration settings
-VAD_ENABLED = CONFIG.get("vad", True)
-LISTEN_TIMEOUT = CONFIG.get("listen_timeout", 5.0) # Max seconds to listen if VAD isn't used
-WAKE_WORD = CONFIG.get("wake_word", "francine").lower() # Ensure lowercase for comparison
-ALWAYS_ON = CONFIG.get("always_on", True) # Default to always on if not specified
+# sounddevice, the STT models (whisper/torch, faster-whisper), pyttsx3 and webrtcvad are
+# imported on first use: they take seconds to load and text mode never needs them.
 
-# Load Whisper model once globally for efficiency.
-try:
-    MODEL = whisper.load_model('base') # 'base' is a good balance for speed/accuracy
-except Exception as e:
-    print(f"CRITICAL ERROR: Failed to load Whisper model: {e}. Please ensure 'base' model is downloaded.")
-    MODEL = None
+# Voice settings (vad, listen_timeout, wake_word, always_on) come from config.get() on
+# every listen/frame, so edits to config.json apply to the next utterance without a restart.
 
+VOICE_SECONDS = metrics.histogram(
+    "francine_voice_seconds",
+    "Voice pipeline timings by stage (capture = utterance length, partial, transcribe, endpoint_to_text, tts).",
+    ("stage",),
+)
+VOICE_UTTERANCES = metrics.counter("francine_voice_utterances_total", "Listen attempts by result (speech, silence, echo, no_wake_word, error).", ("result",))
 
-def whisper_listen() -> str:
+def load_model() -> "stt.STTBackend | None":
     """
-    Listens for audio input and converts it to text using Whisper.
-    Supports VAD and wake word detection based on config.
+    Loads the configured speech-to-text backend (see stt.py and the stt_* settings) and
+    returns it, or None if it can't be loaded. Voice mode calls this at startup so the
+    first utterance doesn't wait for the model.
     """
-    if MODEL is None:
-        print("Whisper model not loaded. Cannot perform speech-to-text.")
-        return ""
-
-    fs = 16000 # Sample rate
-    frame_duration = 30 # ms per frame for VAD
-    frame_size = int(fs * frame_duration / 1000) # Bytes per frame for VAD
-
-    # VAD instance
-    vad_detector = webrtcvad.Vad(3) # Aggressiveness: 0 (least) to 3 (most)
-
-    print("Listening...")
-    frames = []
-    silent_frames = 0
-    
-    # Use a non-blocking stream for VAD
-    with sd.RawInputStream(samplerate=fs, channels=1, dtype='int16', blocksize=frame_size) as stream:
-        start_time = time.time()
-        while True:
-            data, overflowed = stream.read(frame_size)
-            if overflowed:
-                print("Warning: Audio input buffer overflowed!")
-            
-            # Ensure frame data is correct size for VAD
-            if len(data) < frame_size: # Not enough data for a full frame
-                time.sleep(0.001) # Small sleep to prevent busy-waiting
+    try:
+        settings = config.get()
+        if not settings.always_on and settings.wake_word:
+            stt.get_backend(settings.wake_model) # The wake-word gate's model, loaded up front too
+        return stt.get_backend()
+    except Exception as e:
+        model = config.get().stt_model
+        print(f"CRITICAL ERROR: Failed to load the speech-to-text model: {e}. Please ensure the '{model}' model is downloaded.")
+        return None
+
+
+# Persistent microphone capture (see capture.py), started with voice mode
+CAPTURE: "capture.CaptureThread | None" = None
+
+# Wake-word gate: with always_on off, the small wake_model transcribes only the first
+# WAKE_WINDOW_SECONDS of an utterance, and the main model runs only if the wake word was
+# heard there. Background chatter then costs one tiny decode of two seconds at most.
+WAKE_WINDOW_SECONDS = 2.0 # Includes the pre-roll; long enough for "hey Francine"
+WAKE_MATCH_RATIO = 0.75 # Fuzzy match: the tiny model often misspells names ("Francene")
+_wake_results: Dict[int, bool] = {} # Gate decisions by Utterance.start_pos, made during partials
+
+
+def _wake_word_span(text: str, wake_word: str, max_words: int = 3) -> "tuple | None":
+    """(first, last) word indices in 'text' that best match 'wake_word', or None below WAKE_MATCH_RATIO."""
+    words = [re.sub(r"[^\w]", "", w.lower()) for w in text.split()]
+    target = wake_word.replace(" ", "")
+    best, span = 0.0, None
+    for first in range(len(words)):
+        for last in range(first, min(first + max_words, len(words))):
+            ratio = difflib.SequenceMatcher(None, "".join(words[first:last + 1]), target).ratio()
+            if ratio > best:
+                best, span = ratio, (first, last)
+    return span if best >= WAKE_MATCH_RATIO else None
+
+
+def wake_word_gate(audio: "np.ndarray") -> bool:
+    """True if the wake word is heard in the first WAKE_WINDOW_SECONDS of the utterance (wake_model)."""
+    settings = config.get()
+    window = audio[:int(WAKE_WINDOW_SECONDS * stt.SAMPLE_RATE)]
+    with VOICE_SECONDS.time(stage="wake_gate"):
+        heard = stt.get_backend(settings.wake_model).transcribe(window)
+    return _wake_word_span(heard, settings.wake_word) is not None
+
+
+def _strip_wake_word(text: str) -> str:
+    """Removes the wake word (and anything before it, e.g. "hey") from a transcript."""
+    span = _wake_word_span(text, config.get().wake_word) # Already lowercased
+    if span is None:
+        return text
+    return " ".join(text.split()[span[1] + 1:]).lstrip(" ,.!?")
+
+
+def _gated() -> bool:
+    settings = config.get()
+    return not settings.always_on and bool(settings.wake_word)
+
+
+# Partial transcription of the utterance in progress (stt.StreamingTranscript, one per
+# utterance, keyed by Utterance.start_pos). Listeners get the stable prefix whenever it
+# grows, from the partials thread, e.g. to start retrieval before the user has finished.
+PARTIAL_LISTENERS: List[Callable[[str], None]] = []
+PARTIAL_POLL_SECONDS = 0.1
+_stt_lock = threading.Lock() # Partials and final decodes share the model; one decode at a time
+_streams: Dict[int, "stt.StreamingTranscript"] = {}
+_partials_stop = threading.Event()
+_partials_thread: threading.Thread | None = None
+
+
+def _partials_loop(capture_thread: "capture.CaptureThread") -> None:
+    while not _partials_stop.wait(PARTIAL_POLL_SECONDS):
+        interval = config.get().stt_partial_seconds
+        speech = capture_thread.current_speech() if interval > 0 else None
+        if speech is None:
+            continue
+        start_pos, audio = speech
+        with _stt_lock:
+            if _gated():
+                if start_pos not in _wake_results:
+                    if len(audio) < WAKE_WINDOW_SECONDS * stt.SAMPLE_RATE:
+                        continue # Decide once the window is complete; short utterances are gated at the end
+                    try:
+                        _wake_results[start_pos] = wake_word_gate(audio)
+                    except Exception:
+                        continue # whisper_listen gates (and reports errors) instead
+                    for old in sorted(_wake_results)[:-4]:
+                        del _wake_results[old]
+                if not _wake_results[start_pos]:
+                    continue # No wake word: don't spend the main model on this utterance
+            stream = _streams.get(start_pos)
+            if stream is None:
+                try:
+                    stream = _streams[start_pos] = stt.StreamingTranscript(stt.get_backend())
+                except Exception:
+                    continue # whisper_listen reports model problems
+                for old in sorted(_streams)[:-4]: # Keep the streams of the few queued utterances only
+                    del _streams[old]
+            if len(audio) - stream.decoded_samples < interval * stt.SAMPLE_RATE:
                 continue
+            before = stream.stable_text
+            try:
+                with VOICE_SECONDS.time(stage="partial"):
+                    stable = stream.update(audio)
+            except Exception as e:
+                print(f"Warning: Partial transcription failed, transcribing whole utterances instead: {e}")
+                _streams.clear()
+                return
+        if stable != before:
+            if capture_thread.playback.is_set():
+                if _is_echo(stable, time.monotonic() - len(audio) / stt.SAMPLE_RATE):
+                    continue # Francine hearing herself: neither a barge-in nor worth speculating on
+                if len(stable.split()) >= BARGE_IN_MIN_WORDS:
+                    barge_in()
+            if _gated():
+                stable = _strip_wake_word(stable) # As the final transcript will be
+            for listener in list(PARTIAL_LISTENERS):
+                try:
+                    listener(stable)
+                except Exception as e:
+                    print(f"Warning: Partial transcript listener failed: {e}")
 
-            is_speech = vad_detector.is_speech(data.tobytes(), fs)
-            
-            if is_speech:
-                frames.append(data)
-                silent_frames = 0
-            elif len(frames) > 0: # If we have started recording, count silent frames
-                silent_frames += 1
-            
-            # Stop condition: silence after speech, or timeout
-            # 0.5 seconds of silence (approx 16 frames for 30ms frames)
-            if VAD_ENABLED and len(frames) > 0 and silent_frames > (fs / frame_size * 0.5):
-                print("Detected end of speech (VAD).")
-                break
-            
-            if not VAD_ENABLED and (time.time() - start_time > LISTEN_TIMEOUT):
-                print(f"Listening timeout ({LISTEN_TIMEOUT}s) reached.")
-                break
-            
-            if VAD_ENABLED and (time.time() - start_time > LISTEN_TIMEOUT * 2) and len(frames) == 0: # Max listen time if only silence
-                print(f"Max listen time ({LISTEN_TIMEOUT*2}s) reached with no speech.")
-                return "" # Return empty if no speech detected at all
 
-            # Small sleep to prevent busy-waiting if loop is very tight
-            time.sleep(0.001) # Keep this small sleep to prevent high CPU usage in tight loop
+def start_capture(source=None) -> "capture.CaptureThread":
+    """Starts the long-lived capture thread (idempotent). 'source' defaults to the microphone."""
+    global CAPTURE, _partials_thread
+    if CAPTURE is None:
+        import capture
+        CAPTURE = capture.CaptureThread(source)
+        CAPTURE.start()
+        _partials_stop.clear()
+        _partials_thread = threading.Thread(target=_partials_loop, args=(CAPTURE,), name="francine-partials", daemon=True)
+        _partials_thread.start()
+    return CAPTURE
 
-    if not frames:
-        return ""
 
-    audio_data = np.frombuffer(b''.join(frames), dtype='int16')
-    
-    with tempfile.NamedTemporaryFile(suffix='.wav', delete=True) as f:
-        try:
-            sf.write(f.name, audio_data, fs)
-            result_text = MODEL.transcribe(f.name).get('text', '').strip()
-            
-            # Basic wake word detection (if enabled and not always_on)
-            if not ALWAYS_ON and WAKE_WORD and WAKE_WORD in result_text.lower():
-                print(f"Wake word '{WAKE_WORD}' detected.")
-                return result_text.lower().replace(WAKE_WORD, '').strip() # Remove wake word
-            elif not ALWAYS_ON and WAKE_WORD and WAKE_WORD not in result_text.lower():
+def stop_capture() -> None:
+    global CAPTURE, _partials_thread
+    if CAPTURE is not None:
+        _partials_stop.set()
+        if _partials_thread is not None:
+            _partials_thread.join(timeout=5.0)
+            _partials_thread = None
+        CAPTURE.stop()
+        CAPTURE = None
+        _streams.clear()
+        _wake_results.clear()
+
+
+@dataclass
+class Heard:
+    """Outcome of one listen: the text to handle ("" if none) and how it was obtained."""
+    text: str
+    result: str # speech, silence, echo, no_wake_word or error (as in VOICE_UTTERANCES)
+    utterance: "capture.Utterance | None" = None
+    decode_seconds: float = 0.0 # Main-model decoding spent on the utterance (partials + final)
+    text_at: float = 0.0 # time.monotonic() when the final text was ready
+
+
+def listen(timeout: float | None = None) -> Heard:
+    """
+    Takes the next utterance from the persistent capture thread (starting it on first use)
+    and transcribes it. Waits up to 'timeout' (default twice listen_timeout) for speech.
+    Supports wake word detection based on config.
+    """
+    model = load_model()
+    if model is None:
+        print("Whisper model not loaded. Cannot perform speech-to-text.")
+        return Heard("", "error")
+    capture_thread = start_capture()
+    if capture_thread.error is not None:
+        raise RuntimeError(f"Audio capture stopped: {capture_thread.error}")
+
+    settings = config.get()
+    wake_word = settings.wake_word
+
+    utterance = capture_thread.next_utterance(timeout=settings.listen_timeout * 2 if timeout is None else timeout)
+    if utterance is None:
+        VOICE_UTTERANCES.inc(result="silence")
+        return Heard("", "silence") # No speech detected in this window
+    if utterance.overlapped_playback and not settings.barge_in:
+        print("Ignoring audio captured while Francine was speaking (likely her own voice).")
+        VOICE_UTTERANCES.inc(result="echo")
+        return Heard("", "echo", utterance)
+    VOICE_SECONDS.observe(utterance.duration, stage="capture")
+
+    try:
+        # Wake word mode (always_on off): the cheap gate decides before the main model runs
+        if _gated():
+            with _stt_lock:
+                heard = _wake_results.pop(utterance.start_pos, None)
+                if heard is None:
+                    heard = wake_word_gate(utterance.audio)
+            if not heard:
+                _streams.pop(utterance.start_pos, None)
                 print("Wake word not detected. Ignoring input.")
-                return "" # Ignore if wake word not present in non-always-on mode
-            
-            return result_text
-        except Exception as e:
-            print(f"Error during audio transcription: {e}. Check Whisper model and audio file.")
-            return ""
+                VOICE_UTTERANCES.inc(result="no_wake_word")
+                return Heard("", "no_wake_word", utterance) # Ignore if wake word not present in non-always-on mode
+
+        # With partials, only the tail after the committed words is decoded here
+        with _stt_lock, VOICE_SECONDS.time(stage="transcribe"):
+            stream = _streams.pop(utterance.start_pos, None)
+            t0 = time.perf_counter()
+            if stream is not None:
+                result_text = stream.finish(utterance.audio)
+            else:
+                result_text = model.transcribe(utterance.audio) # float32 straight from the ring buffer
+            decode_seconds = time.perf_counter() - t0 + (stream.decode_seconds if stream is not None else 0.0)
+        text_at = time.monotonic()
+        VOICE_SECONDS.observe(text_at - utterance.ended_at, stage="endpoint_to_text")
+        if utterance.overlapped_playback: # Only reached with barge_in on
+            if _is_echo(result_text, utterance.started_at):
+                print("Ignoring audio captured while Francine was speaking (it matches what she said).")
+                VOICE_UTTERANCES.inc(result="echo")
+                return Heard("", "echo", utterance, decode_seconds, text_at)
+            barge_in() # Already done by the partials if they saw enough words
 
+        if _gated():
+            print(f"Wake word '{wake_word}' detected.")
+            result_text = _strip_wake_word(result_text)
+        
+        VOICE_UTTERANCES.inc(result="speech")
+        return Heard(result_text, "speech", utterance, decode_seconds, text_at)
+    except Exception as e:
+        VOICE_UTTERANCES.inc(result="error")
+        print(f"Error during audio transcription: {e}. Check the speech-to-text model.")
+        return Heard("", "error", utterance)
 
-async def tts_speak(txt: str) -> None:
+
+def whisper_listen() -> str:
     """
-    Converts text to speech using pyttsx3 and plays it.
-    This function is blocking and will be run in a separate thread via asyncio.to_thread.
+    Returns the text of the next utterance, or "" if there was none within twice
+    listen_timeout (or it was ignored), so the caller's loop keeps running. See listen().
     """
-    def _speak_blocking(text_to_speak):
+    return listen().text
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits a reply into sentences (and lines) so the first can play while the rest wait."""
+    return [part.strip() for part in re.split(r"(?<=[.!?])\s+|\n+", text) if part.strip()]
+
+
+def _pyttsx3_engine():
+    import pyttsx3
+    return pyttsx3.init()
+
+
+class SilentEngine:
+    """pyttsx3 stand-in that fires the same callbacks without producing audio (headless benchmarks)."""
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable]] = {}
+        self._queue: List[str] = []
+        self._stopped = False
+
+    def connect(self, topic: str, callback: Callable) -> None:
+        self._callbacks.setdefault(topic, []).append(callback)
+
+    def _fire(self, topic: str, *args) -> None:
+        for callback in self._callbacks.get(topic, []):
+            callback(*args)
+
+    def say(self, text: str) -> None:
+        self._queue.append(text)
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def runAndWait(self) -> None:
+        while self._queue:
+            text = self._queue.pop(0)
+            self._stopped = False
+            self._fire('started-utterance', None)
+            location = 0
+            for word in text.split():
+                self._fire('started-word', None, location, len(word))
+                if self._stopped:
+                    self._queue.clear()
+                    return
+                location += len(word) + 1
+
+
+class TTSWorker:
+    """
+    One pyttsx3 engine on a dedicated thread, speaking sentences from a queue. Engine
+    startup is paid once per session instead of once per reply, say() returns at once so
+    listening continues while Francine speaks, and cancel() stops the current sentence
+    (at the next word) and drops the queued ones, e.g. when the user starts talking.
+    """
+
+    def __init__(self, engine_factory: Callable | None = None):
+        self.engine_factory = engine_factory or _pyttsx3_engine # e.g. SilentEngine without an audio device
+        self.first_audio_at = 0.0 # time.monotonic() when the last reply's first sentence started playing
+        self.sentences: "queue.Queue[tuple | None]" = queue.Queue() # (generation, sentence, queued_at) or None to stop
+        self.idle = threading.Event() # Set when nothing is queued or playing
+        self.idle.set()
+        self._generation = 0 # Bumped by cancel(); sentences queued before it are dropped
+        self._current: tuple | None = None # Item being spoken
+        self.spoken: "deque[tuple]" = deque(maxlen=8) # (sentence, ended_at) of the last sentences played
+        self._engine = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="francine-tts", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self.cancel()
+        self.sentences.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    @property
+    def speaking(self) -> bool:
+        return not self.idle.is_set()
+
+    def say(self, text: str) -> None:
+        sentences = split_sentences(text)
+        if not sentences:
+            return
+        self.idle.clear()
+        queued_at = time.monotonic() # Time to first audio is measured from the reply's first sentence
+        for i, sentence in enumerate(sentences):
+            self.sentences.put((self._generation, sentence, queued_at if i == 0 else None))
+
+    def cancel(self) -> None:
+        self._generation += 1
+        try:
+            while True:
+                self.sentences.get_nowait()
+        except queue.Empty:
+            pass
+        if self._current is None:
+            self.idle.set() # Otherwise the worker sets it once the interrupted sentence stops
+
+    def said_since(self, since: float) -> List[str]:
+        """The sentence playing now and those that finished after 'since' (time.monotonic())."""
+        current = self._current
+        said = [sentence for sentence, ended_at in list(self.spoken) if ended_at >= since]
+        return said + ([current[1]] if current is not None else [])
+
+    def _on_started(self, name) -> None:
+        queued_at = self._current[2] if self._current is not None else None
+        if queued_at is not None:
+            self.first_audio_at = time.monotonic()
+            VOICE_SECONDS.observe(self.first_audio_at - queued_at, stage="tts_first_audio")
+
+    def _on_word(self, name, location, length) -> None:
+        if self._current is not None and self._current[0] != self._generation: # Cancelled mid-sentence
+            self._engine.stop()
+
+    def _run(self) -> None:
         try:
-            engine = pyttsx3.init()
-            engine.say(text_to_speak)
-            engine.runAndWait()
+            self._engine = self.engine_factory()
+            self._engine.connect('started-utterance', self._on_started)
+            self._engine.connect('started-word', self._on_word)
         except Exception as e:
             print(f"Error during text-to-speech: {e}. Check pyttsx3 installation and audio output.")
+            self._thread = None
+            self.idle.set()
+            return
+        while True:
+            item = self.sentences.get()
+            if item is None:
+                break
+            if item[0] != self._generation:
+                continue
+            self._current = item
+            self.idle.clear() # A say() racing the previous sentence's end may have seen it idle
+            capture_thread = CAPTURE
+            if capture_thread is not None:
+                capture_thread.playback.set() # Speech captured now may be our own voice
+            try:
+                with VOICE_SECONDS.time(stage="tts"):
+                    self._engine.say(item[1])
+                    self._engine.runAndWait()
+            except Exception as e:
+                print(f"Error during text-to-speech: {e}. Check pyttsx3 installation and audio output.")
+            finally:
+                self.spoken.append((item[1], time.monotonic()))
+                self._current = None
+                if self.sentences.empty():
+                    if capture_thread is not None:
+                        capture_thread.playback.clear()
+                    self.idle.set()
+        self._engine = None
+
+
+TTS: TTSWorker | None = None
+
+
+def start_tts(engine_factory: Callable | None = None) -> TTSWorker:
+    """Starts the TTS worker (idempotent); voice mode calls this at startup so the engine is ready."""
+    global TTS
+    if TTS is None:
+        TTS = TTSWorker(engine_factory)
+        TTS.start()
+    return TTS
+
+
+def stop_tts() -> None:
+    global TTS
+    if TTS is not None:
+        TTS.stop()
+        TTS = None
+
 
-    await asyncio.to_thread(_speak_blocking, txt)
+# Barge-in (barge_in setting): speech over Francine's voice interrupts her only once its
+# transcript shows it isn't her own voice coming back through the microphone.
+ECHO_MATCH_RATIO = 0.6 # Share of heard words that were in what she said for it to count as echo
+ECHO_TAIL_SECONDS = 1.0 # Sentences that ended this long before the speech started still count (room echo, VAD onset)
+BARGE_IN_MIN_WORDS = 2 # Stable partial words needed before interrupting mid-utterance
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in (re.sub(r"[^\w]", "", w.lower()) for w in text.split()) if w]
+
+
+def _is_echo(text: str, since: float) -> bool:
+    """True if 'text' (heard from 'since' on) is mostly words Francine was saying at the time."""
+    heard = _words(text)
+    if not heard:
+        return True # Nothing intelligible over her voice
+    if TTS is None:
+        return False
+    said = set(_words(" ".join(TTS.said_since(since - ECHO_TAIL_SECONDS))))
+    return sum(word in said for word in heard) / len(heard) >= ECHO_MATCH_RATIO
+
+
+def barge_in() -> None:
+    """The user talking over Francine stops her (barge_in setting)."""
+    if TTS is not None and TTS.speaking and config.get().barge_in:
+        print("Francine: (interrupted)")
+        TTS.cancel()
+
+
+async def tts_speak(txt: str, wait: bool = False) -> None:
+    """
+    Queues text on the TTS worker, sentence by sentence, and returns without waiting for
+    playback unless 'wait' is set (then until it finishes or is interrupted).
+    """
+    worker = start_tts()
+    worker.say(txt)
+    if wait:
+        await asyncio.to_thread(worker.idle.wait)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+import llm
+from batch import percentile
+
+# Replies from the stubbed LLM; long enough to split into several TTS sentences
+DEFAULT_REPLY = "This is a benchmark reply. It has a second sentence. And a short third one."
+DEFAULT_FIRST_TOKEN_S = 0.3 # Stubbed LLM latency, roughly a warm local model's time to first token
+IDLE_WAIT_S = 0.5 # How long each listen waits before checking whether the replay has finished
+
+# Latency columns: name -> description (all in seconds, wall clock)
+METRICS = {
+    "eos_to_text_s": "end of speech -> final text (VAD endpoint + STT)",
+    "text_to_first_token_s": "final text -> first LLM token (retrieval, prompt assembly, stub latency)",
+    "eos_to_first_audio_s": "end of speech -> first TTS audio",
+    "rtf": "real-time factor (main-model decode time / utterance length)",
+}
+
+
+@contextmanager
+def stubbed_llm(first_token_s: float, reply: str, marks: Dict[str, Any]):
+    """
+    Replaces the Ollama calls with a fixed-latency fake answering 'reply', so the benchmark
+    measures the voice pipeline rather than the model (and runs without an Ollama server).
+    The first chat call of a turn records marks['first_token_at'].
+    """
+    originals = (llm.ollama_chat, llm.ollama_embed, llm.warm_up)
+
+    async def chat(prompt: str, model: str = llm.CHAT_MODEL) -> str:
+        await asyncio.sleep(first_token_s)
+        if marks.get("first_token_at") is None:
+            marks["first_token_at"] = time.monotonic()
+        return json.dumps({"function": "none", "answer": reply})
+
+    async def embed(text: str, model: str = "minilm:latest") -> list[float]:
+        return []
+
+    async def warm_up(model: str = llm.CHAT_MODEL) -> None:
+        return None
+
+    llm.ollama_chat, llm.ollama_embed, llm.warm_up = chat, embed, warm_up
+    try:
+        yield
+    finally:
+        llm.ollama_chat, llm.ollama_embed, llm.warm_up = originals
+
+
+async def run_benchmark(
+    handler: Callable[[str], Awaitable[str]],
+    paths: List[Path],
+    speed: float = 1.0,
+    first_token_s: float = DEFAULT_FIRST_TOKEN_S,
+    silent_tts: bool = True,
+    reply: str = DEFAULT_REPLY,
+) -> Dict[str, Any]:
+    """
+    Replays WAV fixtures through capture (VAD) -> STT -> 'handler' (handle_prompt against the
+    stubbed LLM) -> TTS and times every utterance. With silent_tts no audio device is
+    needed. Latencies are wall clock, so use speed 1.0 for figures comparable to live use;
+    faster replay also shortens the VAD's end-of-speech silence.
+    """
+    import capture
+    import voice
+
+    if await asyncio.to_thread(voice.load_model) is None:
+        raise RuntimeError("Speech-to-text model could not be loaded.")
+    source = capture.WavFileSource(paths, speed)
+    marks: Dict[str, Any] = {}
+    rows: List[Dict[str, Any]] = []
+    ignored = 0
+    tts = voice.start_tts(voice.SilentEngine if silent_tts else None)
+    capture_thread = await asyncio.to_thread(voice.start_capture, source)
+    started = time.monotonic()
+    try:
+        with stubbed_llm(first_token_s, reply, marks):
+            while True:
+                heard = await asyncio.to_thread(voice.listen, IDLE_WAIT_S)
+                if heard.utterance is None:
+                    if heard.result == "error" or (not capture_thread.running and capture_thread.utterances.empty()):
+                        break # Replay finished (or STT is unavailable)
+                    continue
+                utterance = heard.utterance
+                fixture = source.file_at(utterance.start_pos)
+                if not heard.text:
+                    ignored += 1
+                    print(f"  {fixture.name if fixture else '?'}: ignored ({heard.result})")
+                    continue
+
+                marks["first_token_at"] = None
+                tts.first_audio_at = 0.0
+                answer = await handler(heard.text)
+                await voice.tts_speak(answer, wait=True)
+                row = {
+                    "file": fixture.name if fixture else "",
+                    "text": heard.text,
+                    "audio_s": round(utterance.duration, 3),
+                    "eos_to_text_s": heard.text_at - utterance.speech_ended_at,
+                    "text_to_first_token_s": marks["first_token_at"] - heard.text_at if marks["first_token_at"] else None,
+                    "eos_to_first_audio_s": tts.first_audio_at - utterance.speech_ended_at if tts.first_audio_at else None,
+                    "rtf": heard.decode_seconds / utterance.duration if utterance.duration else None,
+                }
+                rows.append(row)
+                print(f"  {row['file']}: {heard.text!r}")
+    finally:
+        voice.stop_capture()
+        voice.stop_tts()
+        if capture_thread.error is not None:
+            print(f"Warning: Audio replay failed: {capture_thread.error}")
+
+    summary = {}
+    for name in METRICS:
+        values = sorted(row[name] for row in rows if row[name] is not None)
+        summary[name] = {"p50": percentile(values, 50), "p90": percentile(values, 90), "max": values[-1] if values else 0.0}
+    return {
+        "fixtures": [str(p) for p in paths],
+        "speed": speed,
+        "stub_first_token_s": first_token_s,
+        "tts": "silent" if silent_tts else "pyttsx3",
+        "wall_s": time.monotonic() - started,
+        "utterances": rows,
+        "ignored": ignored,
+        "summary": summary,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    rows = report["utterances"]
+    lines = [
+        f"Voice benchmark: {len(rows)} utterance(s) from {len(report['fixtures'])} file(s), {report['ignored']} ignored, "
+        f"replay speed {report['speed']:g}x, stub LLM {report['stub_first_token_s'] * 1000:.0f} ms, {report['tts']} TTS, "
+        f"{report['wall_s']:.1f}s wall",
+        "",
+        f"  {'file':<24} {'audio':>6} {'eos->text':>10} {'text->tok':>10} {'eos->audio':>11} {'RTF':>6}",
+    ]
+
+    def cell(value, width, fmt="{:.3f}"):
+        return f"{fmt.format(value) if value is not None else '-':>{width}}"
+
+    for row in rows:
+        lines.append(
+            f"  {row['file'][:24]:<24} {cell(row['audio_s'], 6, '{:.1f}')} {cell(row['eos_to_text_s'], 10)} "
+            f"{cell(row['text_to_first_token_s'], 10)} {cell(row['eos_to_first_audio_s'], 11)} {cell(row['rtf'], 6, '{:.2f}')}"
+        )
+    lines.append("")
+    for name, description in METRICS.items():
+        stats = report["summary"][name]
+        lines.append(f"  {description}: p50 {stats['p50']:.3f} | p90 {stats['p90']:.3f} | max {stats['max']:.3f}")
+    return "\n".join(lines)
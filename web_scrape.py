@@ -1,46 +1,240 @@
-from playwright.async_api import async_playwright, Error as PlaywrightError # FIX: Import Error as PlaywrightError
 from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+import asyncio
+import json
 import os
+import re
+import time
+import weakref
+
+import httpx
+from bs4 import BeautifulSoup
 
 # FIX: Dynamically determine RAW_DIR based on the new BASE_DIR from memory.py
 # Assuming memory.py is imported and its BASE_DIR is the source of truth
 import memory
 RAW_DIR = memory.BASE_DIR / "raw_hits"
 RAW_DIR.mkdir(parents=True, exist_ok=True) # Ensure this directory exists
+# Per-domain fetch decisions ("http" or "browser"), kept across restarts
+DOMAIN_MODES_PATH = memory.BASE_DIR / "scrape_domains.json"
 
-async def scrape_text_content(url: str, selector: str = 'body') -> str:
+import metrics
+SCRAPE_SECONDS = metrics.histogram("francine_scrape_seconds", "Page scrape latency by fetch path (http, browser) and outcome (ok, empty, error, escalated).", ("path", "outcome"))
+SCRAPE_CHARS = metrics.counter("francine_scrape_chars_total", "Characters of text extracted by scrapes.", ("path",))
+SCRAPE_ESCALATIONS = metrics.counter("francine_scrape_escalations_total", "HTTP fetches handed to the browser, by reason.", ("reason",))
+
+# --- HTTP-first fetching ---
+# Most pages are static: a pooled GET plus parsing costs milliseconds, while a browser page
+# costs a renderer process. The browser (browser.POOL) is used only when the HTTP result
+# looks like it needs JavaScript; that decision is remembered per domain.
+HTTP_TIMEOUT = 15.0 # seconds
+MAX_HTTP_CONNECTIONS = 16
+MIN_STATIC_CHARS = 200 # Less visible text than this from a script-heavy page means client-side rendering
+DOMAIN_MODE_TTL = 7 * 24 * 3600.0 # Re-probe a "browser" domain with HTTP after a week
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+# Non-HTML bodies returned as they are: a browser would only show the same text
+TEXT_CONTENT_TYPES = {"application/json", "application/xml", "application/javascript", "application/x-ndjson"}
+BOT_CHALLENGE_STATUSES = {403, 429, 503} # Often Cloudflare-style checks that a real browser passes
+SPA_ROOT = re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>', re.IGNORECASE)
+NEEDS_JS_TEXT = re.compile(r"(enable|requires?) javascript|javascript (is )?(disabled|required)", re.IGNORECASE)
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Returns the pooled AsyncClient for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_HTTP_CONNECTIONS, max_keepalive_connections=MAX_HTTP_CONNECTIONS),
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5"},
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_client() -> None:
+    """Closes the pooled client of the running event loop. Call before the loop shuts down."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# domain -> {"mode": "http" | "browser", "reason": str, "updated": epoch seconds}
+_domain_modes: dict | None = None
+
+
+def _load_domain_modes() -> dict:
+    global _domain_modes
+    if _domain_modes is None:
+        try:
+            with open(DOMAIN_MODES_PATH, 'r', encoding='utf-8') as f:
+                _domain_modes = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            _domain_modes = {}
+    return _domain_modes
+
+
+def domain_mode(url: str) -> str:
+    """The remembered fetch path for the URL's domain ("http" unless it needed the browser recently)."""
+    entry = _load_domain_modes().get(urlsplit(url).hostname or "")
+    if entry and entry.get("mode") == "browser" and time.time() - entry.get("updated", 0) < DOMAIN_MODE_TTL:
+        return "browser"
+    return "http"
+
+
+def remember_domain_mode(url: str, mode: str, reason: str = "") -> None:
+    domain = urlsplit(url).hostname or ""
+    modes = _load_domain_modes()
+    if not domain or (modes.get(domain, {}).get("mode") == mode and mode == "http"):
+        return # Nothing new to write for the common case
+    modes[domain] = {"mode": mode, "reason": reason, "updated": time.time()}
+    try:
+        memory.atomic_write_text(DOMAIN_MODES_PATH, json.dumps(modes, indent=2))
+    except OSError as e:
+        print(f"Warning: Could not save scrape domain modes: {e}")
+
+
+def parse_page(html: str, selector: str = 'body', base_url: str | None = None) -> tuple:
     """
-    Navigates to a URL, waits for a specified selector (defaulting to the entire body),
-    and returns its full text content. Designed for general web scraping of readable text.
+    Parses HTML with lxml and returns (text, selector_found, links) for the CSS selector,
+    with scripts, styles and other non-visible elements removed and whitespace collapsed.
+    'links' are the page's absolute http(s) link targets when 'base_url' is given, else [].
     """
-    print(f"Scraping text content from: {url} using selector: {selector}")
-    try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True) # Run headless browser
-            page = await browser.new_page()
-            await page.goto(url, wait_until='domcontentloaded') # Wait for DOM to be loaded
-            
-            # Wait for the specific selector to be present
-            try:
-                await page.wait_for_selector(selector, timeout=10000) # 10 seconds timeout
-            except PlaywrightError as e: # FIX: Use PlaywrightError
-                print(f"Warning: Selector '{selector}' not found on page {url} within timeout. Trying to get body content.")
-                selector = 'body' # Fallback to body if specific selector fails
+    soup = BeautifulSoup(html, "lxml")
+    for element in soup(["script", "style", "noscript", "template", "svg"]):
+        element.decompose()
+    links = []
+    if base_url is not None:
+        for anchor in soup.find_all("a", href=True):
+            target = urljoin(base_url, anchor["href"].strip())
+            if target.startswith(("http://", "https://")):
+                links.append(target)
+    nodes = soup.select(selector)
+    if not nodes:
+        return "", False, links
+    return ' '.join(" ".join(node.get_text(" ") for node in nodes).split()), True, links
+
+
+def extract_text(html: str, selector: str = 'body') -> tuple:
+    """(text, selector_found) of the selector's visible text; see parse_page."""
+    text, found, _ = parse_page(html, selector)
+    return text, found
+
+
+def needs_browser(response: httpx.Response, text: str, selector_found: bool) -> str:
+    """Why the HTTP result looks incomplete without JavaScript ("" if it looks fine)."""
+    if response.status_code in BOT_CHALLENGE_STATUSES:
+        return f"status_{response.status_code}"
+    if response.status_code >= 400:
+        return "" # A real error; the browser would get the same page
+    if not selector_found:
+        return "selector_missing" # Possibly rendered client-side
+    if len(text) < MIN_STATIC_CHARS:
+        html = response.text
+        if SPA_ROOT.search(html):
+            return "spa_root"
+        if NEEDS_JS_TEXT.search(html):
+            return "noscript_notice"
+        if html.lower().count("<script") >= 3:
+            return "script_heavy"
+    return ""
+
+
+def _is_text_type(content_type: str) -> bool:
+    """Non-HTML types whose body is already the text (plain text, JSON, XML feeds)."""
+    if "html" in content_type:
+        return False
+    return content_type.startswith("text/") or content_type in TEXT_CONTENT_TYPES or content_type.endswith(("+json", "+xml"))
+
+
+async def _scrape_http(url: str, selector: str) -> tuple:
+    """Returns (text, escalation_reason). A non-empty reason means: retry in the browser."""
+    response = await _get_client().get(url)
+    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+    if _is_text_type(content_type):
+        return ' '.join(response.text.split()), "" # Plain text, JSON, XML feeds: nothing to render
+    if "html" not in content_type:
+        return "", "not_html" # Let the browser deal with whatever this is
+    text, found = await asyncio.to_thread(extract_text, response.text, selector) # lxml parse off the loop
+    reason = needs_browser(response, text, found)
+    if not reason and response.status_code >= 400:
+        raise httpx.HTTPStatusError(f"HTTP {response.status_code} for {url}", request=response.request, response=response)
+    return text, reason
+
 
+async def _scrape_browser(url: str, selector: str, with_links: bool = False) -> tuple:
+    """
+    Returns (text, selector_found, links); without the selector the text is the page body's.
+    With 'with_links', 'links' are the rendered page's absolute http(s) link targets (as in
+    parse_page), else [].
+    """
+    import browser # Shared browser pool: pages, not browser launches, per URL
+    links = []
+    async with browser.POOL.page() as page:
+        # Images, media and fonts are blocked (see browser.BLOCK_PROFILES); the DOM text is the same
+        used = await browser.load_page(page, url, selector)
+        with browser.BROWSER_PHASE_SECONDS.time(phase="extract"):
             # Get all text content within the specified selector
-            content = await page.locator(selector).all_text_contents()
-            
-            await browser.close()
-            
-            if content:
-                # Join all text content into a single string, remove excessive whitespace
-                full_text = "\n".join(content)
-                # Basic cleanup: replace multiple newlines/spaces with single ones
-                full_text = ' '.join(full_text.split())
-                return full_text
-            else:
+            content = await page.locator(used).all_text_contents()
+            if with_links: # Client-rendered pages have their links only in the DOM
+                hrefs = await page.eval_on_selector_all("a[href]", "els => els.map(e => e.href)")
+                links = [href for href in hrefs if isinstance(href, str) and href.startswith(("http://", "https://"))]
+    # Join all text content into a single string; basic cleanup of multiple newlines/spaces
+    return ' '.join("\n".join(content).split()), used == selector, links
+
+
+async def scrape_text_content(url: str, selector: str = 'body') -> str:
+    """
+    Fetches a URL and returns the full text content of the specified selector (defaulting
+    to the entire body). Designed for general web scraping of readable text. Tries a plain
+    HTTP fetch first and uses the headless browser only for pages that need JavaScript
+    (remembered per domain).
+    """
+    print(f"Scraping text content from: {url} using selector: {selector}")
+    reason = "" # Why the HTTP path handed over to the browser
+    if domain_mode(url) == "http":
+        started = time.perf_counter()
+        try:
+            text, reason = await _scrape_http(url, selector)
+        except httpx.HTTPStatusError as e:
+            # A real error page (404, 500, ...); the browser would get the same page
+            print(f"Error during web scraping {url}: {e}")
+            SCRAPE_SECONDS.observe(time.perf_counter() - started, path="http", outcome="error")
+            return ""
+        except Exception as e:
+            text, reason = "", "http_error"
+            print(f"HTTP fetch of {url} failed ({e}); trying the browser.")
+        if not reason:
+            SCRAPE_SECONDS.observe(time.perf_counter() - started, path="http", outcome="ok" if text else "empty")
+            SCRAPE_CHARS.inc(len(text), path="http")
+            remember_domain_mode(url, "http")
+            if not text:
                 print(f"No text content found for selector '{selector}' on {url}.")
-                return ""
+            return text
+        SCRAPE_SECONDS.observe(time.perf_counter() - started, path="http", outcome="escalated")
+        SCRAPE_ESCALATIONS.inc(reason=reason)
+        print(f"Page needs a browser ({reason}); rendering {url} in Chromium.")
+
+    started = time.perf_counter()
+    try:
+        full_text, found, _ = await _scrape_browser(url, selector)
     except Exception as e:
         print(f"Error during web scraping {url}: {e}")
+        SCRAPE_SECONDS.observe(time.perf_counter() - started, path="browser", outcome="error")
         return ""
+    # Network errors say nothing about the page, a content type belongs to the URL rather than
+    # the domain, and a selector the browser can't find either is a wrong selector, not a page
+    # that needs JavaScript
+    if full_text and found and reason not in ("", "http_error", "not_html"):
+        remember_domain_mode(url, "browser", reason) # Skip HTTP for this domain next time
+    if full_text:
+        SCRAPE_SECONDS.observe(time.perf_counter() - started, path="browser", outcome="ok")
+        SCRAPE_CHARS.inc(len(full_text), path="browser")
+        return full_text
+    print(f"No text content found for selector '{selector}' on {url}.")
+    SCRAPE_SECONDS.observe(time.perf_counter() - started, path="browser", outcome="empty")
+    return ""